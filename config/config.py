@@ -19,13 +19,48 @@ class Config:
 
     # Model Settings
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')  # torch, or onnx (ONNX Runtime on CPU)
+    EMBEDDING_WARMUP = os.getenv('EMBEDDING_WARMUP', 'background')  # eager, background or lazy model loading
+    ONNX_MODELS_DIR = os.path.join(MODELS_DIR, 'onnx')  # Exported EMBEDDING_MODEL, created on first use
+    ONNX_QUANTIZE = os.getenv('ONNX_QUANTIZE', 'false').lower() == 'true'  # Run the int8-quantized export
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 10000))  # 0 disables the query embedding cache
+    QUERY_CACHE_PERSIST = os.getenv('QUERY_CACHE_PERSIST', 'false').lower() == 'true'
+    QUERY_CACHE_PATH = os.path.join(MODELS_DIR, 'query_embedding_cache.npz')
+    QUERY_CACHE_DTYPE = os.getenv('QUERY_CACHE_DTYPE', 'float32')  # float32, float16, int8
+    CHUNK_CACHE_ENABLED = os.getenv('CHUNK_CACHE_ENABLED', 'true').lower() == 'true'  # Reuse chunk embeddings across builds
+    CHUNK_CACHE_PATH = os.path.join(MODELS_DIR, 'chunk_embedding_cache.bin')
+    CHUNK_CACHE_DTYPE = os.getenv('CHUNK_CACHE_DTYPE', 'float32')  # float32, float16, int8
     CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 1500))
     CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 150))
 
+    # Ingestion Settings
+    LOADER_WORKERS = int(os.getenv('LOADER_WORKERS', 1))
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 50))
+    INDEX_BATCH_SIZE = int(os.getenv('INDEX_BATCH_SIZE', 512))
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 32))  # Texts per model forward pass
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', 1))  # Processes with their own model copy (1 = in-process)
+    EMBEDDING_THREADS_PER_WORKER = int(os.getenv('EMBEDDING_THREADS_PER_WORKER', 0))  # 0 = cores / workers
+
     # FAISS Settings
     FAISS_INDEX_PATH = os.path.join(VECTOR_DB_DIR, 'faiss_index.bin')
-    METADATA_PATH = os.path.join(VECTOR_DB_DIR, 'faiss_metadata.json')
+    METADATA_PATH = os.path.join(VECTOR_DB_DIR, 'faiss_metadata.bin')
     DOCUMENT_MAPPING_PATH = os.path.join(VECTOR_DB_DIR, 'document_mapping.json')
+    MANIFEST_PATH = os.path.join(VECTOR_DB_DIR, 'index_manifest.json')
+    SHARDS_DIR = os.path.join(VECTOR_DB_DIR, 'shards')
+    COLLECTIONS_DIR = os.path.join(VECTOR_DB_DIR, 'collections')  # Indexes of named collections, one directory each
+    COLLECTIONS_DATA_DIR = os.path.join(DATA_DIR, 'collections')  # Source documents of named collections
+    FAISS_INDEX_TYPE = os.getenv('FAISS_INDEX_TYPE', 'flat')  # flat, ivf_flat, ivf_pq, hnsw
+    FAISS_METRIC = os.getenv('FAISS_METRIC', 'l2')  # l2, or cosine (inner product over normalized embeddings)
+    IVF_NLIST = int(os.getenv('IVF_NLIST', 1024))
+    IVF_NPROBE = int(os.getenv('IVF_NPROBE', 16))
+    PQ_M = int(os.getenv('PQ_M', 16))
+    PQ_NBITS = int(os.getenv('PQ_NBITS', 8))
+    HNSW_M = int(os.getenv('HNSW_M', 32))
+    HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', 40))
+    HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', 64))
+    INDEX_TRAIN_SIZE = int(os.getenv('INDEX_TRAIN_SIZE', 0)) or None
+    VECTOR_STORAGE = os.getenv('VECTOR_STORAGE', 'float32')  # float32, float16, int8, pq
+    RERANK_FACTOR = int(os.getenv('RERANK_FACTOR', 4))  # Candidates per result re-scored at full precision
 
     # LLM Settings
     GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama3-8b-8192')
@@ -39,14 +74,58 @@ class Config:
     GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama3-8b-8192')
     MAX_TOKENS = int(os.getenv('MAX_TOKENS', 1024))
     TEMPERATURE = float(os.getenv('TEMPERATURE', 0.3))
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'groq')  # groq or stub (offline, deterministic)
+    LLM_CONTEXT_WINDOW = int(os.getenv('LLM_CONTEXT_WINDOW', 0))  # 0 = read from GROQ_MODEL (llama3-8b-8192 -> 8192)
+    LLM_CONNECTION_CHECK = os.getenv('LLM_CONNECTION_CHECK', 'true').lower() == 'true'  # Probe the LLM at startup
+    STUB_LLM_TTFT = float(os.getenv('STUB_LLM_TTFT', 0.2))
+    STUB_LLM_TOKENS_PER_SECOND = float(os.getenv('STUB_LLM_TOKENS_PER_SECOND', 200))
+    STUB_LLM_FAILURE_RATE = float(os.getenv('STUB_LLM_FAILURE_RATE', 0.0))
+    STUB_LLM_ANSWER_TOKENS = int(os.getenv('STUB_LLM_ANSWER_TOKENS', 100))
+    STUB_LLM_SEED = int(os.getenv('STUB_LLM_SEED', 0))
 
     # Retrieval Settings
     TOP_K_RETRIEVAL = int(os.getenv('TOP_K_RETRIEVAL', 5))
     SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.3))
-    MAX_CONTEXT_LENGTH = int(os.getenv('MAX_CONTEXT_LENGTH', 4000))
+    MAX_CONTEXT_TOKENS = int(os.getenv('MAX_CONTEXT_TOKENS', 0))  # 0 = whatever the model window leaves after MAX_TOKENS
+    CONTEXT_TOKENIZER = os.getenv('CONTEXT_TOKENIZER', 'tiktoken:cl100k_base')  # tiktoken:<encoding> or a Hugging Face tokenizer; cl100k only approximates Llama/Mixtral tokens
+    CONTEXT_TOKEN_SAFETY = float(os.getenv('CONTEXT_TOKEN_SAFETY', 1.25))  # Model tokens per counted token assumed when budgeting; 1.0 if CONTEXT_TOKENIZER is the model's own
+    LEXICAL_INDEX_ENABLED = os.getenv('LEXICAL_INDEX_ENABLED', 'true').lower() == 'true'  # Build BM25 postings with the index
+    HYBRID_SEARCH = os.getenv('HYBRID_SEARCH', 'true').lower() == 'true'  # Fuse BM25 and dense results at query time
+    HYBRID_CANDIDATE_FACTOR = int(os.getenv('HYBRID_CANDIDATE_FACTOR', 4))  # Candidates per result from each retriever
+    RRF_K = int(os.getenv('RRF_K', 60))  # Reciprocal-rank fusion constant: 1 / (RRF_K + rank)
+    BM25_K1 = float(os.getenv('BM25_K1', 1.2))
+    BM25_B = float(os.getenv('BM25_B', 0.75))
+    FILTER_FIELDS = [field.strip() for field in os.getenv('FILTER_FIELDS', 'file_name,file_type,source,tags').split(',') if field.strip()]  # Metadata indexed for filtered search; empty disables
+    RERANK_ENABLED = os.getenv('RERANK_ENABLED', 'false').lower() == 'true'  # Cross-encoder rerank before prompting
+    RERANK_MODEL = os.getenv('RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+    RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', 20))  # Retrieved for reranking, cut to TOP_K_RETRIEVAL
+    RERANK_BATCH_SIZE = int(os.getenv('RERANK_BATCH_SIZE', 8))  # Candidates per cross-encoder forward pass
+    RERANK_MAX_LENGTH = int(os.getenv('RERANK_MAX_LENGTH', 512))  # Tokens per (query, chunk) pair
+    RERANK_BUDGET_MS = float(os.getenv('RERANK_BUDGET_MS', 150))  # Scoring time per request; fewer candidates past it
+
+    # Sharding Settings
+    NUM_SHARDS = int(os.getenv('NUM_SHARDS', 1))  # >1 partitions the index by document into independently rebuildable shards
+    SHARD_SEARCH_WORKERS = int(os.getenv('SHARD_SEARCH_WORKERS', 0))  # Threads searching shards in parallel; 0 = one per shard
+
+    # Collection Settings
+    DEFAULT_COLLECTION = os.getenv('DEFAULT_COLLECTION', 'default')  # Used when a query names none; "default" is the index in vector_db/
+    COLLECTION_MEMORY_MB = float(os.getenv('COLLECTION_MEMORY_MB', 0))  # Unload least recently used collections above this; 0 = no limit
 
     # Response Settings
     ENABLE_STREAMING = os.getenv('ENABLE_STREAMING', 'true').lower() == 'true'
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+    RETRIEVAL_WORKERS = int(os.getenv('RETRIEVAL_WORKERS', 4))  # Threads for embedding/FAISS on the async path
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 1000))  # 0 disables the answer cache
+    ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', 3600))
+    ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', 0.95))
+    METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', 10000))  # Recent queries kept for latency percentiles
+
+    # Server Settings
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', 8000))
+    SERVER_MAX_CONCURRENCY = int(os.getenv('SERVER_MAX_CONCURRENCY', 256))  # In-flight queries per process
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 32))
+    BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', 5))
 
     # Create directories if they don't exist
     @staticmethod
@@ -0,0 +1,116 @@
+import argparse
+import sys
+import os
+import logging
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import faiss
+import numpy as np
+
+from config.config import Config
+from src.vector_store import FAISSVectorStore
+
+
+def load_vectors(args):
+    """Load base vectors from the built index, or generate a clustered synthetic set"""
+    if args.from_index:
+        index = faiss.read_index(Config.FAISS_INDEX_PATH)
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(inner, faiss.IndexIVF):
+            inner.make_direct_map()
+        return inner.reconstruct_n(0, inner.ntotal)
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(max(args.num_vectors // 1000, 1), args.dimension))
+    assignments = rng.integers(0, len(centers), size=args.num_vectors)
+    return (centers[assignments] + 0.3 * rng.normal(size=(args.num_vectors, args.dimension))).astype('float32')
+
+
+def build_store(index_type, vectors, args):
+    """Build a store of the given type and return it with its build time"""
+    store = FAISSVectorStore(
+        dimension=vectors.shape[1],
+        index_type=index_type,
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        hnsw_m=Config.HNSW_M,
+        ef_construction=Config.HNSW_EF_CONSTRUCTION
+    )
+
+    start_time = time.perf_counter()
+    store.train(vectors[:store.train_size])
+    store.index.add_with_ids(vectors, np.arange(len(vectors), dtype='int64'))
+    return store, time.perf_counter() - start_time
+
+
+def measure(store, queries, ground_truth, k, **search_kwargs):
+    """Return recall@k and per-query latency percentiles in milliseconds"""
+    latencies = []
+    hits = 0
+    for query, truth in zip(queries, ground_truth):
+        start_time = time.perf_counter()
+        _, ids = store.search_vectors(query, k, **search_kwargs)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        hits += len(set(ids[0]) & set(truth))
+
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+
+def print_row(name, setting, build_time, result):
+    """Print one benchmark row"""
+    print(
+        f"{name:>10} {setting:>14} {build_time:>9.2f} {result['recall']:>10.3f} "
+        f"{result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}"
+    )
+
+
+def benchmark_ann():
+    """Compare approximate index types against the exact flat index"""
+    parser = argparse.ArgumentParser(description="Benchmark recall@k and latency of FAISS index types")
+    parser.add_argument("--from-index", action="store_true", help="Use vectors from the built index")
+    parser.add_argument("--num-vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=Config.TOP_K_RETRIEVAL)
+    parser.add_argument("--nlist", type=int, default=Config.IVF_NLIST)
+    parser.add_argument("--pq-m", type=int, default=Config.PQ_M)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 128, 256])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(args.seed + 1)
+    sample = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+    queries = vectors[sample] + 0.05 * rng.normal(size=(len(sample), vectors.shape[1])).astype('float32')
+
+    print(f"Benchmarking {len(vectors)} vectors (dim {vectors.shape[1]}), {len(queries)} queries, k={args.k}")
+    print(f"{'index':>10} {'setting':>14} {'build_s':>9} {'recall@k':>10} {'p50_ms':>9} {'p99_ms':>9}")
+
+    flat_store, build_time = build_store("flat", vectors, args)
+    _, ground_truth = flat_store.search_vectors(queries, args.k)
+    print_row("flat", "exact", build_time, measure(flat_store, queries, ground_truth, args.k))
+
+    for index_type in ("ivf_flat", "ivf_pq"):
+        store, build_time = build_store(index_type, vectors, args)
+        for nprobe in args.nprobe:
+            result = measure(store, queries, ground_truth, args.k, nprobe=nprobe)
+            print_row(index_type, f"nprobe={nprobe}", build_time, result)
+
+    store, build_time = build_store("hnsw", vectors, args)
+    for ef_search in args.ef_search:
+        result = measure(store, queries, ground_truth, args.k, ef_search=ef_search)
+        print_row("hnsw", f"efSearch={ef_search}", build_time, result)
+
+
+if __name__ == "__main__":
+    benchmark_ann()
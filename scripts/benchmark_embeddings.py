@@ -0,0 +1,98 @@
+import argparse
+import sys
+import os
+import logging
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from config.config import Config
+from src.document_loader import DocumentLoader
+from src.text_splitter import OptimizedTextSplitter
+from src.embeddings import EmbeddingGenerator
+
+
+def load_texts(args):
+    """Chunk texts from the data directory, or synthetic chunks of varied length when it is empty"""
+    loader = DocumentLoader(num_workers=Config.LOADER_WORKERS)
+    files = loader.find_documents(args.data_dir) if os.path.exists(args.data_dir) else []
+    if files:
+        splitter = OptimizedTextSplitter(chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP)
+        texts = [chunk.page_content for chunk in splitter.iter_split_documents(loader.iter_files(files))]
+        return texts[:args.num_texts], f"{len(files)} files in {args.data_dir}"
+
+    rng = np.random.default_rng(args.seed)
+    words = [f"word{i}" for i in range(5000)]
+    lengths = rng.integers(20, Config.CHUNK_SIZE // 6, size=args.num_texts)
+    texts = [" ".join(rng.choice(words, size=length)) for length in lengths]
+    return texts, "synthetic chunks"
+
+
+def run_embedder(texts, num_workers, args):
+    """Embed all texts once after a warm-up call and return (startup seconds, encode seconds)"""
+    embedding_generator = EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        cache_dir=Config.MODELS_DIR,
+        batch_size=args.batch_size,
+        num_workers=num_workers,
+        threads_per_worker=args.threads_per_worker,
+        backend=args.backend,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=args.onnx_quantize
+    )
+    try:
+        # Load the model(s) and start the pool outside the timed run
+        start_time = time.perf_counter()
+        embedding_generator.generate_embeddings(texts[:num_workers * args.batch_size * 2], show_progress_bar=False)
+        startup_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        embedding_generator.generate_embeddings(texts, show_progress_bar=False)
+        return startup_time, time.perf_counter() - start_time
+    finally:
+        embedding_generator.close()
+
+
+def benchmark_embeddings():
+    """Compare embedding throughput across worker process counts"""
+    parser = argparse.ArgumentParser(description="Benchmark EmbeddingGenerator throughput by worker count")
+    parser.add_argument("--data-dir", default=Config.RAW_DATA_DIR, help="Directory of documents to chunk and embed")
+    parser.add_argument("--num-texts", type=int, default=4096, help="Maximum number of chunks to embed")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--threads-per-worker", type=int, default=Config.EMBEDDING_THREADS_PER_WORKER,
+                        help="Intra-op threads per worker (0 = cores / workers)")
+    parser.add_argument("--backend", default=Config.EMBEDDING_BACKEND, choices=["torch", "onnx"])
+    parser.add_argument("--onnx-quantize", action="store_true", default=Config.ONNX_QUANTIZE,
+                        help="Use the int8-quantized ONNX export")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    texts, source = load_texts(args)
+    if not texts:
+        print(f"No text found in {args.data_dir}")
+        return
+
+    print(
+        f"Benchmarking {Config.EMBEDDING_MODEL} ({args.backend}) on {len(texts)} texts "
+        f"from {source} ({os.cpu_count()} cores)"
+    )
+    print(f"{'workers':>8} {'startup_s':>10} {'seconds':>10} {'texts/s':>10} {'speedup':>8}")
+
+    baseline = None
+    for num_workers in args.workers:
+        startup_time, elapsed = run_embedder(texts, num_workers, args)
+        baseline = baseline or elapsed
+        print(
+            f"{num_workers:>8} {startup_time:>10.2f} {elapsed:>10.2f} "
+            f"{len(texts) / elapsed:>10.1f} {baseline / elapsed:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_embeddings()
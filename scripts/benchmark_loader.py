@@ -0,0 +1,69 @@
+import argparse
+import sys
+import os
+import logging
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pypdf
+
+from config.config import Config
+from src.document_loader import DocumentLoader
+
+
+def count_pages(files):
+    """Count PDF pages; every other document counts as a single page"""
+    pages = 0
+    for file_path in files:
+        if file_path.suffix.lower() == '.pdf':
+            try:
+                with open(file_path, 'rb') as file:
+                    pages += len(pypdf.PdfReader(file).pages)
+            except Exception:
+                pass
+        else:
+            pages += 1
+    return pages
+
+
+def run_loader(files, num_workers, pdf_pages_per_task):
+    """Load all files once and return (documents loaded, seconds)"""
+    loader = DocumentLoader(num_workers=num_workers, pdf_pages_per_task=pdf_pages_per_task)
+    start_time = time.perf_counter()
+    documents = loader.load_files(files)
+    return len(documents), time.perf_counter() - start_time
+
+
+def benchmark_loader():
+    """Compare serial and parallel document loading throughput"""
+    parser = argparse.ArgumentParser(description="Benchmark DocumentLoader throughput")
+    parser.add_argument("--data-dir", default=Config.RAW_DATA_DIR, help="Directory of documents to load")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare")
+    parser.add_argument("--pdf-pages-per-task", type=int, default=Config.PDF_PAGES_PER_TASK)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    files = DocumentLoader().find_documents(args.data_dir)
+    if not files:
+        print(f"No documents found in {args.data_dir}")
+        return
+
+    pages = count_pages(files)
+    print(f"Benchmarking {len(files)} files ({pages} pages) from {args.data_dir}")
+    print(f"{'workers':>8} {'seconds':>10} {'files/s':>10} {'pages/s':>10} {'speedup':>8}")
+
+    baseline = None
+    for num_workers in args.workers:
+        loaded, elapsed = run_loader(files, num_workers, args.pdf_pages_per_task)
+        baseline = baseline or elapsed
+        print(
+            f"{num_workers:>8} {elapsed:>10.2f} {loaded / elapsed:>10.1f} "
+            f"{pages / elapsed:>10.1f} {baseline / elapsed:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_loader()
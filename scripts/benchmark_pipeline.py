@@ -0,0 +1,118 @@
+import argparse
+import json
+import sys
+import os
+import logging
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from config.config import Config
+from src.llm_client import StubLLMClient
+from src.rag_pipeline import RAGPipeline
+
+DEFAULT_QUERIES = [
+    "What is the main topic of the documents?",
+    "Can you provide a summary?",
+    "What are the key points discussed?",
+    "Which methods are described?",
+    "What conclusions are drawn?"
+]
+
+
+def percentiles(values):
+    """p50/p95/p99 of a list of seconds, in milliseconds"""
+    values_ms = np.asarray(values) * 1000
+    return {
+        "p50_ms": float(np.percentile(values_ms, 50)),
+        "p95_ms": float(np.percentile(values_ms, 95)),
+        "p99_ms": float(np.percentile(values_ms, 99))
+    }
+
+
+def run_query(pipeline, query):
+    """Time retrieval, prompt assembly and streamed generation of one query"""
+    timings = {}
+
+    start_time = time.perf_counter()
+    retrieved_chunks = pipeline.query_processor.process_query(query)
+    timings["retrieval"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    context = pipeline._prepare_context(query, retrieved_chunks)
+    prompt = pipeline._create_rag_prompt(query, context)
+    timings["prompt"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    first_token_time = None
+    tokens = 0
+    for _ in pipeline.llm_client.generate_response(prompt, pipeline._get_system_prompt(), stream=True):
+        if first_token_time is None:
+            first_token_time = time.perf_counter() - start_time
+        tokens += 1
+    timings["ttft"] = first_token_time or 0.0
+    timings["generation"] = time.perf_counter() - start_time
+    timings["tokens"] = tokens
+
+    return timings
+
+
+def benchmark_pipeline():
+    """Measure retrieval, prompt and streaming overhead against the deterministic stub LLM"""
+    parser = argparse.ArgumentParser(description="Benchmark the RAG pipeline with the offline stub LLM")
+    parser.add_argument("--iterations", type=int, default=50, help="Queries to run")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed queries to run first")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    stub = StubLLMClient.from_config()
+    pipeline = RAGPipeline()
+    pipeline.initialize(llm_client=stub, async_llm_client=stub, warmup="eager")
+    # Measure the full path on every iteration, not cache hits
+    pipeline.answer_cache = None
+
+    queries = [DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)] for i in range(args.warmup + args.iterations)]
+    for query in queries[:args.warmup]:
+        run_query(pipeline, query)
+
+    runs = [run_query(pipeline, query) for query in queries[args.warmup:]]
+
+    # Time the stub spends by design; anything above it is pipeline/streaming overhead
+    expected_generation = [
+        stub.ttft + max(run["tokens"] - 1, 0) * stub.token_interval() for run in runs
+    ]
+    results = {
+        "config": {
+            "iterations": args.iterations,
+            "stub_ttft": stub.ttft,
+            "stub_tokens_per_second": stub.tokens_per_second,
+            "top_k": Config.TOP_K_RETRIEVAL,
+            "vector_store": pipeline.vector_store.get_stats()
+        },
+        "retrieval": percentiles([run["retrieval"] for run in runs]),
+        "prompt": percentiles([run["prompt"] for run in runs]),
+        "ttft": percentiles([run["ttft"] for run in runs]),
+        "generation": percentiles([run["generation"] for run in runs]),
+        "streaming_overhead": percentiles(
+            [run["generation"] - expected for run, expected in zip(runs, expected_generation)]
+        )
+    }
+
+    print(f"{'stage':>20} {'p50_ms':>10} {'p95_ms':>10} {'p99_ms':>10}")
+    for stage in ("retrieval", "prompt", "ttft", "generation", "streaming_overhead"):
+        stats = results[stage]
+        print(f"{stage:>20} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    benchmark_pipeline()
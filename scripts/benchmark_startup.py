@@ -0,0 +1,175 @@
+import argparse
+import json
+import subprocess
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+WARMUP_MODES = ("lazy", "background", "eager")
+
+
+def run_phases(include_llm_probe):
+    """Child process: time imports, index load, model load and the first embedding separately"""
+    results = {}
+
+    start_time = time.perf_counter()
+    from config.config import Config
+    results["import_config"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    import faiss  # noqa: F401
+    results["import_faiss"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    from src.rag_pipeline import RAGPipeline  # noqa: F401
+    from src.vector_store import FAISSVectorStore
+    from src.embeddings import EmbeddingGenerator
+    results["import_pipeline"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    store = FAISSVectorStore.from_index(Config.FAISS_INDEX_PATH, Config.METADATA_PATH)
+    results["index_load"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    if Config.EMBEDDING_BACKEND == "onnx":
+        import onnxruntime  # noqa: F401
+    else:
+        import sentence_transformers  # noqa: F401
+    results["import_model_backend"] = time.perf_counter() - start_time
+
+    embedding_generator = EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        cache_dir=Config.MODELS_DIR,
+        normalize=store.metric == "cosine",
+        backend=Config.EMBEDDING_BACKEND,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=Config.ONNX_QUANTIZE
+    )
+    start_time = time.perf_counter()
+    embedding_generator.initialize_model()
+    results["model_load"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    query_embedding = embedding_generator.encode_single("What is the main topic of the documents?")
+    results["first_embed"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    store.similarity_search(query_embedding, k=Config.TOP_K_RETRIEVAL)
+    results["first_search"] = time.perf_counter() - start_time
+
+    if include_llm_probe:
+        from src.llm_client import create_llm_clients
+        start_time = time.perf_counter()
+        llm_client = create_llm_clients(Config.LLM_BACKEND)[0]
+        results["llm_client"] = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        llm_client.check_connection()
+        results["llm_probe"] = time.perf_counter() - start_time
+
+    return results
+
+
+def run_pipeline(warmup):
+    """Child process: time RAGPipeline.initialize and the first retrieval for one warm-up mode"""
+    results = {}
+
+    start_time = time.perf_counter()
+    from src.llm_client import StubLLMClient
+    from src.rag_pipeline import RAGPipeline
+    results["import"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    pipeline = RAGPipeline()
+    stub = StubLLMClient.from_config()
+    pipeline.initialize(llm_client=stub, async_llm_client=stub, warmup=warmup, check_connection=False)
+    results["initialize"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    pipeline.query_processor.process_query("What is the main topic of the documents?")
+    results["first_retrieval"] = time.perf_counter() - start_time
+
+    results["ready_to_first_result"] = sum(results.values())
+    return results
+
+
+def run_child(spec, include_llm_probe):
+    """Run one measurement in a fresh interpreter so every import is cold; returns (results, process seconds)"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", spec]
+    if include_llm_probe:
+        command.append("--include-llm-probe")
+
+    start_time = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup measurement '{spec}' failed:\n{completed.stderr[-2000:]}")
+
+    return json.loads(completed.stdout.strip().splitlines()[-1]), elapsed
+
+
+def summarize(samples):
+    """Median seconds per phase over repeated runs"""
+    return {phase: float(np.median([sample[phase] for sample in samples])) for phase in samples[0]}
+
+
+def print_table(title, medians):
+    print(f"\n{title}")
+    for phase, seconds in medians.items():
+        print(f"  {phase:<24} {seconds * 1000:>10.1f} ms")
+
+
+def benchmark_startup():
+    """Break cold-start time into import, index load and model load phases"""
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the query pipeline")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement (median reported)")
+    parser.add_argument("--modes", nargs="*", default=list(WARMUP_MODES), choices=WARMUP_MODES,
+                        help="Warm-up modes to compare end to end (none to skip)")
+    parser.add_argument("--include-llm-probe", action="store_true",
+                        help="Also time LLM client creation and the network connection check")
+    parser.add_argument("--output", help="Write the medians as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        if args.child == "phases":
+            results = run_phases(args.include_llm_probe)
+        else:
+            results = run_pipeline(args.child.split(":", 1)[1])
+        print(json.dumps(results))
+        return
+
+    from config.config import Config
+    if not os.path.exists(Config.FAISS_INDEX_PATH):
+        print(f"No index at {Config.FAISS_INDEX_PATH}; build one first (python scripts/build_index.py)")
+        return
+
+    report = {}
+
+    samples, process_times = [], []
+    for _ in range(args.runs):
+        results, elapsed = run_child("phases", args.include_llm_probe)
+        samples.append(results)
+        process_times.append(elapsed)
+    report["phases"] = {**summarize(samples), "process_total": float(np.median(process_times))}
+    print_table("Cold-start phases (median of fresh processes)", report["phases"])
+
+    for mode in args.modes:
+        samples = [run_child(f"pipeline:{mode}", False)[0] for _ in range(args.runs)]
+        report[f"pipeline_{mode}"] = summarize(samples)
+        print_table(f"RAGPipeline.initialize with warmup={mode}", report[f"pipeline_{mode}"])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    benchmark_startup()
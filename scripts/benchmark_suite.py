@@ -0,0 +1,501 @@
+import argparse
+import json
+import sys
+import os
+import logging
+import platform
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+
+from config.config import Config
+from src.document_loader import DocumentLoader
+from src.text_splitter import OptimizedTextSplitter
+from src.embeddings import EmbeddingGenerator
+from src.vector_store import FAISSVectorStore
+from src.metadata_store import MetadataStore
+from src.llm_client import StubLLMClient
+from src.rag_pipeline import RAGPipeline
+
+# Vectors generated and added per step when building the large synthetic indexes
+VECTOR_BATCH_SIZE = 10000
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingestion and query hot paths on synthetic data and write the results as JSON"
+    )
+    parser.add_argument("--docs", type=int, default=200, help="Synthetic documents in the corpus")
+    parser.add_argument("--words-per-doc", type=int, default=1000)
+    parser.add_argument("--loader-workers", type=int, default=Config.LOADER_WORKERS)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000, 1000000],
+                        help="Vector counts for the similarity_search scaling runs (none to skip)")
+    parser.add_argument("--index-type", default=Config.FAISS_INDEX_TYPE, choices=FAISSVectorStore.INDEX_TYPES)
+    parser.add_argument("--num-queries", type=int, default=200, help="Queries per latency measurement")
+    parser.add_argument("--k", type=int, default=Config.TOP_K_RETRIEVAL)
+    parser.add_argument("--storage-vectors", type=int, default=100000,
+                        help="Vectors for the storage memory/recall report (0 to skip)")
+    parser.add_argument("--storage-modes", nargs="+", default=list(FAISSVectorStore.STORAGE_TYPES),
+                        choices=FAISSVectorStore.STORAGE_TYPES)
+    parser.add_argument("--rerank-factor", type=int, default=max(Config.RERANK_FACTOR, 2),
+                        help="Candidates per result re-scored at full precision in the storage report")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Skip the stub-LLM QPS run")
+    parser.add_argument("--stub-ttft", type=float, default=Config.STUB_LLM_TTFT)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=Config.STUB_LLM_TOKENS_PER_SECOND)
+    parser.add_argument("--concurrency", type=int, default=Config.LLM_MAX_CONCURRENCY,
+                        help="Parallel LLM calls for the answer_queries QPS run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results file (default: logs/benchmark_<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown vs. --baseline reported as a regression (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+def latency_stats(latencies):
+    """p50/p95/p99 of a list of seconds, in milliseconds"""
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def make_vocabulary(rng, size=5000):
+    """Deterministic pseudo-words so every run sees the same corpus for a given seed"""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 10, size=size)
+    return [''.join(rng.choice(letters, size=length)) for length in lengths]
+
+
+def make_text(rng, vocabulary, num_words):
+    """Sentences and paragraphs of Zipf-distributed vocabulary words"""
+    ranks = np.minimum(rng.zipf(1.3, size=num_words), len(vocabulary)) - 1
+    words = [vocabulary[rank] for rank in ranks]
+
+    sentences = []
+    position = 0
+    while position < len(words):
+        length = int(rng.integers(8, 25))
+        sentence = ' '.join(words[position:position + length])
+        sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+        position += length
+
+    paragraphs = [' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+    return '\n\n'.join(paragraphs)
+
+
+def generate_corpus(output_dir, num_docs, words_per_doc, rng, vocabulary):
+    """Write num_docs synthetic .txt documents and return their paths"""
+    files = []
+    for i in range(num_docs):
+        file_path = Path(output_dir) / f"doc_{i:06d}.txt"
+        file_path.write_text(make_text(rng, vocabulary, words_per_doc), encoding='utf-8')
+        files.append(file_path)
+    return files
+
+
+def bench_ingestion(files, args):
+    """Loader, splitter and embedder throughput on the synthetic corpus"""
+    results = {}
+
+    loader = DocumentLoader(num_workers=args.loader_workers, pdf_pages_per_task=Config.PDF_PAGES_PER_TASK)
+    start_time = time.perf_counter()
+    documents = loader.load_files(files)
+    elapsed = time.perf_counter() - start_time
+    total_bytes = sum(file_path.stat().st_size for file_path in files)
+    results["loader"] = {
+        "workers": args.loader_workers,
+        "files": len(documents),
+        "seconds": elapsed,
+        "files_per_second": len(documents) / elapsed,
+        "mb_per_second": total_bytes / elapsed / 1e6
+    }
+
+    splitter = OptimizedTextSplitter(chunk_size=Config.CHUNK_SIZE, chunk_overlap=Config.CHUNK_OVERLAP)
+    start_time = time.perf_counter()
+    chunks = splitter.split_documents(documents)
+    elapsed = time.perf_counter() - start_time
+    results["splitter"] = {
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "chunks_per_second": len(chunks) / elapsed,
+        "mb_per_second": sum(len(document.page_content) for document in documents) / elapsed / 1e6
+    }
+
+    embedding_generator = EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        cache_dir=Config.MODELS_DIR,
+        normalize=Config.FAISS_METRIC == "cosine",
+        backend=Config.EMBEDDING_BACKEND,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=Config.ONNX_QUANTIZE
+    )
+    start_time = time.perf_counter()
+    embedding_generator.initialize_model()
+    model_load_time = time.perf_counter() - start_time
+
+    texts = [chunk.page_content for chunk in chunks]
+    start_time = time.perf_counter()
+    embeddings = embedding_generator.generate_embeddings(texts, show_progress_bar=False)
+    elapsed = time.perf_counter() - start_time
+    results["embedder"] = {
+        "model": Config.EMBEDDING_MODEL,
+        "model_load_seconds": model_load_time,
+        "texts": len(texts),
+        "seconds": elapsed,
+        "texts_per_second": len(texts) / elapsed,
+        "chars_per_second": sum(len(text) for text in texts) / elapsed
+    }
+
+    return results, chunks, embeddings, embedding_generator
+
+
+def create_store(dimension, index_type, index_path, metadata_path):
+    """Create a vector store with the configured FAISS settings"""
+    return FAISSVectorStore(
+        dimension=dimension,
+        index_path=index_path,
+        metadata_path=metadata_path,
+        index_type=index_type,
+        nlist=Config.IVF_NLIST,
+        pq_m=Config.PQ_M,
+        pq_nbits=Config.PQ_NBITS,
+        hnsw_m=Config.HNSW_M,
+        ef_construction=Config.HNSW_EF_CONSTRUCTION,
+        nprobe=Config.IVF_NPROBE,
+        ef_search=Config.HNSW_EF_SEARCH,
+        train_size=Config.INDEX_TRAIN_SIZE,
+        storage=Config.VECTOR_STORAGE,
+        rerank_factor=Config.RERANK_FACTOR,
+        metric=Config.FAISS_METRIC
+    )
+
+
+def bench_vector_store(num_vectors, dimension, args, work_dir):
+    """Index build, save and load times and similarity_search latency for num_vectors random vectors"""
+    rng = np.random.default_rng(args.seed + num_vectors)
+    index_path = os.path.join(work_dir, f"index_{num_vectors}.bin")
+    metadata_path = os.path.join(work_dir, f"metadata_{num_vectors}.bin")
+    store = create_store(dimension, args.index_type, index_path, metadata_path)
+
+    # Build in batches so the full matrix is never held twice
+    queries = None
+    start_time = time.perf_counter()
+    for start in range(0, num_vectors, VECTOR_BATCH_SIZE):
+        count = min(VECTOR_BATCH_SIZE, num_vectors - start)
+        vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+        documents = [
+            Document(page_content=f"synthetic chunk {start + i}",
+                     metadata={"file_name": f"doc_{(start + i) // 100:06d}.txt", "chunk_id": start + i})
+            for i in range(count)
+        ]
+        store.add_embeddings(vectors, documents)
+        if queries is None:
+            sample = vectors[rng.choice(count, size=min(args.num_queries, count), replace=False)]
+            queries = sample + 0.1 * rng.standard_normal(sample.shape, dtype=np.float32)
+    store.flush()
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    store.save_index()
+    save_time = time.perf_counter() - start_time
+    index_type = store.index_type
+    del store
+
+    start_time = time.perf_counter()
+    metadata_store = MetadataStore()
+    metadata_store.open(metadata_path)
+    metadata_load_time = time.perf_counter() - start_time
+    metadata_store.close()
+
+    store = create_store(dimension, args.index_type, index_path, metadata_path)
+    start_time = time.perf_counter()
+    store.load_index()
+    load_time = time.perf_counter() - start_time
+
+    latencies = []
+    for query in queries:
+        start_time = time.perf_counter()
+        store.similarity_search(query, k=args.k)
+        latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    store.similarity_search_batch(queries, k=args.k)
+    batch_time = time.perf_counter() - start_time
+
+    return {
+        "vectors": num_vectors,
+        "index_type": index_type,
+        "build_seconds": build_time,
+        "build_vectors_per_second": num_vectors / build_time,
+        "save_seconds": save_time,
+        "load_seconds": load_time,
+        "metadata_load_seconds": metadata_load_time,
+        "index_bytes": os.path.getsize(index_path),
+        "metadata_bytes": os.path.getsize(metadata_path),
+        "search": latency_stats(latencies),
+        "search_qps": len(latencies) / sum(latencies),
+        "batch_search_qps": len(queries) / batch_time
+    }
+
+
+def bench_storage(num_vectors, dimension, args):
+    """Index memory and recall@k of each storage mode, with and without full-precision rerank"""
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((max(num_vectors // 1000, 1), dimension), dtype=np.float32)
+    assignments = rng.integers(0, len(centers), size=num_vectors)
+    vectors = centers[assignments] + 0.3 * rng.standard_normal((num_vectors, dimension), dtype=np.float32)
+    sample = rng.choice(num_vectors, size=min(args.num_queries, num_vectors), replace=False)
+    queries = vectors[sample] + 0.05 * rng.standard_normal((len(sample), dimension), dtype=np.float32)
+    ids = np.arange(num_vectors, dtype='int64')
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(vectors)
+    _, ground_truth = exact.search(queries, args.k)
+    float32_bytes = num_vectors * dimension * 4
+
+    results = []
+    for storage in args.storage_modes:
+        store = FAISSVectorStore(
+            dimension=dimension,
+            storage=storage,
+            pq_m=Config.PQ_M,
+            pq_nbits=Config.PQ_NBITS,
+            rerank_factor=args.rerank_factor
+        )
+        start_time = time.perf_counter()
+        store.train(vectors[:store.train_size])
+        store.index.add_with_ids(vectors, ids)
+        build_time = time.perf_counter() - start_time
+        if store.full_precision is not None:
+            store.full_precision.add(ids, vectors)
+
+        index_bytes = faiss.serialize_index(store.index).nbytes
+        run = {
+            "storage": storage,
+            "build_seconds": build_time,
+            "index_bytes": int(index_bytes),
+            "bytes_per_vector": index_bytes / num_vectors,
+            "compression": float32_bytes / index_bytes
+        }
+
+        for name, rerank_factor in (("no_rerank", 0), ("rerank", args.rerank_factor)):
+            if rerank_factor and store.full_precision is None:
+                continue
+
+            latencies = []
+            hits = 0
+            for query, truth in zip(queries, ground_truth):
+                start_time = time.perf_counter()
+                _, found = store.search_vectors(query, args.k, rerank_factor=rerank_factor)
+                latencies.append(time.perf_counter() - start_time)
+                hits += len(set(found[0]) & set(truth))
+
+            run[name] = {"recall": hits / (len(queries) * args.k), **latency_stats(latencies)}
+
+        results.append(run)
+
+    return {"vectors": num_vectors, "k": args.k, "rerank_factor": args.rerank_factor, "modes": results}
+
+
+def bench_end_to_end(chunks, embeddings, queries, args, work_dir):
+    """QPS of the full pipeline over the synthetic corpus, answering with the stub LLM"""
+    index_path = os.path.join(work_dir, "corpus_index.bin")
+    metadata_path = os.path.join(work_dir, "corpus_metadata.bin")
+
+    start_time = time.perf_counter()
+    store = create_store(embeddings.shape[1], args.index_type, index_path, metadata_path)
+    store.add_embeddings(embeddings, chunks)
+    store.save_index()
+    build_time = time.perf_counter() - start_time
+
+    # Point the pipeline at the benchmark index while it runs, restoring the configured index afterwards
+    configured_paths = Config.FAISS_INDEX_PATH, Config.METADATA_PATH
+    Config.FAISS_INDEX_PATH = index_path
+    Config.METADATA_PATH = metadata_path
+    try:
+        stub = StubLLMClient(
+            ttft=args.stub_ttft,
+            tokens_per_second=args.stub_tokens_per_second,
+            answer_tokens=Config.STUB_LLM_ANSWER_TOKENS,
+            seed=args.seed
+        )
+        pipeline = RAGPipeline()
+        pipeline.initialize(llm_client=stub, async_llm_client=stub, warmup="eager")
+        # Measure the full path on every query, not cache hits
+        pipeline.answer_cache = None
+
+        latencies = []
+        start_time = time.perf_counter()
+        for query in queries:
+            query_start = time.perf_counter()
+            pipeline.answer_query(query, stream=False, include_sources=True)
+            latencies.append(time.perf_counter() - query_start)
+        sequential_time = time.perf_counter() - start_time
+        stage_latency = pipeline.get_pipeline_stats()["latency"]
+
+        start_time = time.perf_counter()
+        pipeline.answer_queries(queries, include_sources=True, max_concurrency=args.concurrency)
+        concurrent_time = time.perf_counter() - start_time
+    finally:
+        Config.FAISS_INDEX_PATH, Config.METADATA_PATH = configured_paths
+
+    return {
+        "corpus_index_build_seconds": build_time,
+        "queries": len(queries),
+        "stub_ttft": stub.ttft,
+        "stub_tokens_per_second": stub.tokens_per_second,
+        "sequential_qps": len(queries) / sequential_time,
+        "sequential_latency": latency_stats(latencies),
+        "stage_latency": stage_latency,
+        "concurrency": args.concurrency,
+        "concurrent_qps": len(queries) / concurrent_time
+    }
+
+
+def flatten(results, prefix=""):
+    """Flatten nested results into {"a.b.c": number}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline, results, tolerance):
+    """Return (metric, baseline, current, relative change) for every metric that got worse than tolerance"""
+    current = flatten(results["results"])
+    regressions = []
+    for name, old in flatten(baseline["results"]).items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+
+        if name.endswith(("_per_second", "qps", "recall")):
+            change = (old - new) / old
+        elif name.endswith(("_ms", "_seconds")):
+            # Sub-millisecond timings are dominated by noise
+            if max(old, new) < (1.0 if name.endswith("_ms") else 0.001):
+                continue
+            change = (new - old) / old
+        else:
+            continue
+
+        if change > tolerance:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def print_summary(results):
+    """Print the headline numbers"""
+    ingestion = results["ingestion"]
+    print(f"loader:   {ingestion['loader']['files_per_second']:.1f} files/s, "
+          f"{ingestion['loader']['mb_per_second']:.2f} MB/s")
+    print(f"splitter: {ingestion['splitter']['chunks_per_second']:.1f} chunks/s")
+    print(f"embedder: {ingestion['embedder']['texts_per_second']:.1f} texts/s")
+
+    if results["vector_store"]:
+        print(f"\n{'vectors':>10} {'build_s':>9} {'load_s':>8} {'meta_s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+        for run in results["vector_store"]:
+            print(
+                f"{run['vectors']:>10} {run['build_seconds']:>9.2f} {run['load_seconds']:>8.3f} "
+                f"{run['metadata_load_seconds']:>8.3f} {run['search']['p50_ms']:>8.3f} "
+                f"{run['search']['p95_ms']:>8.3f} {run['search']['p99_ms']:>8.3f}"
+            )
+
+    storage = results.get("storage")
+    if storage:
+        print(f"\n{'storage':>8} {'MB':>9} {'ratio':>6} {'recall':>7} {'p50_ms':>8} "
+              f"{'recall@rerank':>14} {'p50_ms':>8}   ({storage['vectors']} vectors, k={storage['k']})")
+        for run in storage["modes"]:
+            rerank = run.get("rerank", {})
+            print(
+                f"{run['storage']:>8} {run['index_bytes'] / 1e6:>9.1f} {run['compression']:>5.1f}x "
+                f"{run['no_rerank']['recall']:>7.3f} {run['no_rerank']['p50_ms']:>8.3f} "
+                f"{rerank.get('recall', float('nan')):>14.3f} {rerank.get('p50_ms', float('nan')):>8.3f}"
+            )
+
+    end_to_end = results.get("end_to_end")
+    if end_to_end:
+        print(f"\nend-to-end: {end_to_end['sequential_qps']:.2f} QPS sequential, "
+              f"{end_to_end['concurrent_qps']:.2f} QPS with {end_to_end['concurrency']} concurrent LLM calls")
+
+
+def benchmark_suite():
+    """Run every benchmark on synthetic data and write the results as JSON"""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    Config.create_directories()
+
+    rng = np.random.default_rng(args.seed)
+    vocabulary = make_vocabulary(rng)
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="rag_benchmark_") as work_dir:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        os.makedirs(corpus_dir)
+        files = generate_corpus(corpus_dir, args.docs, args.words_per_doc, rng, vocabulary)
+        print(f"Generated {len(files)} documents of {args.words_per_doc} words in {corpus_dir}")
+
+        results["ingestion"], chunks, embeddings, embedding_generator = bench_ingestion(files, args)
+        dimension = embedding_generator.get_embedding_dimension()
+
+        results["vector_store"] = []
+        for num_vectors in args.sizes:
+            print(f"Benchmarking similarity_search over {num_vectors} vectors...")
+            results["vector_store"].append(bench_vector_store(num_vectors, dimension, args, work_dir))
+
+        if args.storage_vectors:
+            print(f"Comparing storage modes on {args.storage_vectors} vectors...")
+            results["storage"] = bench_storage(args.storage_vectors, dimension, args)
+
+        if not args.skip_end_to_end:
+            queries = [make_text(rng, vocabulary, 12) for _ in range(args.num_queries)]
+            results["end_to_end"] = bench_end_to_end(chunks, embeddings, queries, args, work_dir)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "faiss": getattr(faiss, "__version__", "unknown")
+        },
+        "args": vars(args),
+        "results": results
+    }
+
+    print_summary(results)
+
+    output = args.output or os.path.join(
+        Config.LOGS_DIR, f'benchmark_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = compare_results(baseline, report, args.tolerance)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.4g} -> {new:.4g} ({change:+.0%} worse)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    benchmark_suite()
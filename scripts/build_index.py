@@ -1,7 +1,10 @@
+import argparse
 import logging
 import sys
 import os
+from collections import namedtuple
 from datetime import datetime
+from pathlib import Path
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -10,7 +13,15 @@ from config.config import Config
 from src.document_loader import DocumentLoader
 from src.text_splitter import OptimizedTextSplitter
 from src.embeddings import EmbeddingGenerator
+from src.chunk_embedding_cache import ChunkEmbeddingCache
 from src.vector_store import FAISSVectorStore
+from src.index_manifest import IndexManifest
+from src.ingestion import StreamingIndexer
+from src.sharded_vector_store import ShardedVectorStore, shard_for_source
+from src.collection_manager import collection_paths
+
+# Paths, first chunk id and documents of one shard of a sharded index
+IndexShard = namedtuple("IndexShard", ["index_path", "metadata_path", "manifest_path", "first_id", "files"])
 
 
 def setup_logging():
@@ -31,61 +42,321 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
-def main():
-    """Main pipeline for building the vector index"""
-    logger = setup_logging()
-    logger.info("=== Starting RAG Index Building Pipeline (Phase 1) ===")
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build the FAISS vector index from data/raw/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-embed added or changed files and drop vectors of deleted files"
+    )
+    parser.add_argument(
+        "--shard",
+        type=int,
+        nargs="+",
+        help="With NUM_SHARDS > 1, only rebuild these shards and leave the others untouched"
+    )
+    parser.add_argument(
+        "--collection",
+        default=Config.DEFAULT_COLLECTION,
+        help="Collection to build; named collections read data/collections/<name>/ and write vector_db/collections/<name>/"
+    )
+    return parser.parse_args()
 
-    try:
-        # Step 1: Load Documents
-        logger.info("Step 1: Loading documents...")
-        loader = DocumentLoader()
-        documents = loader.load_documents(Config.RAW_DATA_DIR)
 
-        if not documents:
-            logger.error("No documents found! Please add documents to data/raw/ directory")
-            return
+def create_chunk_cache(paths):
+    """Open the collection's persistent chunk embedding cache, or return None when it is disabled"""
+    if not Config.CHUNK_CACHE_ENABLED:
+        return None
+    return ChunkEmbeddingCache(paths.chunk_cache_path, dtype=Config.CHUNK_CACHE_DTYPE)
+
+
+def save_chunk_cache(chunk_cache, logger, prune):
+    """Log the cache hit rate and persist the cache for the next build"""
+    if chunk_cache is None:
+        return
+    logger.info(f"Chunk Embedding Cache: {chunk_cache.get_stats()}")
+    chunk_cache.save(prune=prune)
+
+
+def create_embedding_generator(paths):
+    """Create the embedding generator used for index building"""
+    return EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        cache_dir=Config.MODELS_DIR,
+        normalize=Config.FAISS_METRIC == "cosine",
+        chunk_cache=create_chunk_cache(paths),
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        num_workers=Config.EMBEDDING_WORKERS,
+        threads_per_worker=Config.EMBEDDING_THREADS_PER_WORKER,
+        backend=Config.EMBEDDING_BACKEND,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=Config.ONNX_QUANTIZE
+    )
+
+
+def create_loader(paths):
+    """Create the document loader used for index building, tagging files per the collection's tags.json"""
+    return DocumentLoader(
+        num_workers=Config.LOADER_WORKERS,
+        pdf_pages_per_task=Config.PDF_PAGES_PER_TASK,
+        tags=DocumentLoader.read_tags(paths.raw_data_dir)
+    )
+
+
+def create_vector_store(dimension, index_path, metadata_path, first_id=0):
+    """Create a vector store configured for index building"""
+    return FAISSVectorStore(
+        dimension=dimension,
+        index_path=index_path,
+        metadata_path=metadata_path,
+        index_type=Config.FAISS_INDEX_TYPE,
+        nlist=Config.IVF_NLIST,
+        pq_m=Config.PQ_M,
+        pq_nbits=Config.PQ_NBITS,
+        hnsw_m=Config.HNSW_M,
+        ef_construction=Config.HNSW_EF_CONSTRUCTION,
+        nprobe=Config.IVF_NPROBE,
+        ef_search=Config.HNSW_EF_SEARCH,
+        train_size=Config.INDEX_TRAIN_SIZE,
+        storage=Config.VECTOR_STORAGE,
+        rerank_factor=Config.RERANK_FACTOR,
+        metric=Config.FAISS_METRIC,
+        lexical=Config.LEXICAL_INDEX_ENABLED,
+        bm25_k1=Config.BM25_K1,
+        bm25_b=Config.BM25_B,
+        first_id=first_id,
+        filter_fields=Config.FILTER_FIELDS
+    )
+
+
+def record_files(manifest, files, ids_by_source):
+    """Record every processed file in the manifest with the chunk ids it produced.
+
+    Files that yielded no chunks (empty, scanned or unreadable) are recorded
+    with none, so incremental builds skip them until they change.
+    """
+    for file_path in files:
+        manifest.update_file(Path(file_path), ids_by_source.get(str(file_path), []))
 
-        logger.info(f"Loaded {len(documents)} documents")
 
-        # Step 2: Split Documents into Chunks
-        logger.info("Step 2: Splitting documents into chunks...")
-        splitter = OptimizedTextSplitter(
+def build_full_index(logger, paths, shard=None, embedding_generator=None):
+    """Build the vector index of a collection (CollectionPaths) from scratch.
+
+    shard is an IndexShard to build one shard of a sharded index from its own
+    files; its embedding_generator is then owned (closed and cached) by the caller.
+    """
+    index_path = shard.index_path if shard else paths.index_path
+    metadata_path = shard.metadata_path if shard else paths.metadata_path
+    manifest_path = shard.manifest_path if shard else paths.manifest_path
+
+    # Step 1: Find Documents
+    logger.info("Step 1: Finding documents...")
+    loader = create_loader(paths)
+    files = shard.files if shard else loader.find_documents(paths.raw_data_dir)
+
+    if not files and not shard:
+        logger.error(f"No documents found! Please add documents to {paths.raw_data_dir}")
+        return
+
+    logger.info(f"Found {len(files)} documents")
+
+    # Step 2: Create Vector Store
+    logger.info("Step 2: Creating vector store...")
+    owns_generator = embedding_generator is None
+    embedding_generator = embedding_generator or create_embedding_generator(paths)
+    vector_store = create_vector_store(
+        embedding_generator.get_embedding_dimension(), index_path, metadata_path, shard.first_id if shard else 0
+    )
+
+    # Step 3: Stream documents through splitting, embedding and indexing
+    logger.info("Step 3: Loading, splitting and embedding documents...")
+    indexer = StreamingIndexer(
+        splitter=OptimizedTextSplitter(
             chunk_size=Config.CHUNK_SIZE,
             chunk_overlap=Config.CHUNK_OVERLAP
+        ),
+        embedding_generator=embedding_generator,
+        vector_store=vector_store,
+        batch_size=Config.INDEX_BATCH_SIZE
+    )
+    ids_by_source = indexer.index_documents(loader.iter_files(files))
+
+    # Log chunk statistics
+    logger.info(f"Chunk Statistics: {indexer.get_chunk_stats()}")
+    if owns_generator:
+        embedding_generator.close()
+        # A full build looks up every current chunk, so entries it did not touch are stale
+        save_chunk_cache(embedding_generator.chunk_cache, logger, prune=True)
+
+    # An empty shard is still written so the sharded index stays complete
+    if not ids_by_source and not shard:
+        logger.error(f"No text could be extracted from the documents in {paths.raw_data_dir}")
+        return
+
+    # Step 4: Save Vector Store and Manifest
+    logger.info("Step 4: Saving vector store...")
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    vector_store.save_index()
+
+    manifest = IndexManifest(manifest_path)
+    record_files(manifest, files, ids_by_source)
+    manifest.save()
+
+    return vector_store
+
+
+def build_incremental_index(logger, paths, shard=None, embedding_generator=None):
+    """Update a collection's vector index with only the files that changed (of one IndexShard when given)"""
+    index_path = shard.index_path if shard else paths.index_path
+    manifest = IndexManifest(shard.manifest_path if shard else paths.manifest_path)
+
+    if not manifest.exists() or not os.path.exists(index_path):
+        logger.info("No existing index or manifest found, falling back to a full build")
+        return build_full_index(logger, paths, shard, embedding_generator)
+
+    manifest.load()
+
+    # Step 1: Detect changes
+    logger.info("Step 1: Detecting changed documents...")
+    loader = create_loader(paths)
+    changes = manifest.diff(shard.files if shard else loader.find_documents(paths.raw_data_dir))
+    logger.info(
+        f"Added: {len(changes['added'])}, changed: {len(changes['changed'])}, "
+        f"removed: {len(changes['removed'])}, unchanged: {len(changes['unchanged'])}"
+    )
+
+    owns_generator = embedding_generator is None
+    embedding_generator = embedding_generator or create_embedding_generator(paths)
+    vector_store = create_vector_store(
+        embedding_generator.get_embedding_dimension(),
+        index_path,
+        shard.metadata_path if shard else paths.metadata_path,
+        shard.first_id if shard else 0
+    )
+    vector_store.load_index()
+    # New vectors must be embedded the same way as the index being updated
+    embedding_generator.normalize = vector_store.metric == "cosine"
+    if vector_store.lexical and vector_store.lexical_index is None:
+        logger.info("Building the BM25 index from the existing chunks...")
+        vector_store.build_lexical_index()
+    attribute_index = vector_store.attribute_index
+    if Config.FILTER_FIELDS and (attribute_index is None or list(attribute_index.fields) != Config.FILTER_FIELDS):
+        logger.info("Building the attribute index from the existing chunks...")
+        vector_store.build_attribute_index()
+
+    # Step 2: Drop vectors of removed and changed files
+    logger.info("Step 2: Removing stale vectors...")
+    stale_ids = []
+    for file_path in changes["removed"] + changes["changed"]:
+        stale_ids.extend(manifest.remove_file(file_path))
+    vector_store.remove_ids(stale_ids)
+
+    # Step 3: Stream added and changed files through splitting, embedding and indexing
+    to_index = changes["added"] + changes["changed"]
+    if to_index:
+        logger.info(f"Step 3: Indexing {len(to_index)} documents...")
+        indexer = StreamingIndexer(
+            splitter=OptimizedTextSplitter(
+                chunk_size=Config.CHUNK_SIZE,
+                chunk_overlap=Config.CHUNK_OVERLAP
+            ),
+            embedding_generator=embedding_generator,
+            vector_store=vector_store,
+            batch_size=Config.INDEX_BATCH_SIZE
         )
-        chunks = splitter.split_documents(documents)
+        ids_by_source = indexer.index_documents(loader.iter_files(to_index))
+        logger.info(f"Chunk Statistics: {indexer.get_chunk_stats()}")
+        if owns_generator:
+            embedding_generator.close()
+            save_chunk_cache(embedding_generator.chunk_cache, logger, prune=False)
+
+        record_files(manifest, to_index, ids_by_source)
+    else:
+        logger.info("Step 3: No new or changed documents to index")
 
-        # Log chunk statistics
-        stats = splitter.get_chunk_stats(chunks)
-        logger.info(f"Chunk Statistics: {stats}")
+    # Step 4: Save Vector Store and Manifest
+    logger.info("Step 4: Saving vector store...")
+    vector_store.save_index()
+    manifest.save()
 
-        # Step 3: Generate Embeddings
-        logger.info("Step 3: Generating embeddings...")
-        embedding_generator = EmbeddingGenerator(
-            model_name=Config.EMBEDDING_MODEL,
-            cache_dir=Config.MODELS_DIR
+    return vector_store
+
+
+def build_sharded_index(logger, paths, incremental, only_shards=None):
+    """Build NUM_SHARDS shards of a collection partitioned by document, or rebuild only_shards of them"""
+    num_shards = Config.NUM_SHARDS
+    layout = ShardedVectorStore.read_layout(paths.shards_dir)
+    if layout is not None and layout["num_shards"] != num_shards and (incremental or only_shards):
+        # Documents map to shards by NUM_SHARDS, so changing it moves them all
+        logger.warning(
+            f"Index has {layout['num_shards']} shards but NUM_SHARDS is {num_shards}; rebuilding every shard"
         )
+        incremental, only_shards = False, None
+    if only_shards and layout is None:
+        logger.warning("No sharded index exists yet; building every shard")
+        only_shards = None
 
-        # Extract text content from chunks
-        texts = [chunk.page_content for chunk in chunks]
-        embeddings = embedding_generator.generate_embeddings(texts)
+    rebuild = set(range(num_shards)) if not only_shards else set(only_shards)
+    invalid = sorted(shard for shard in rebuild if not 0 <= shard < num_shards)
+    if invalid:
+        raise ValueError(f"Shards {invalid} do not exist (NUM_SHARDS is {num_shards})")
 
-        # Step 4: Create and Populate Vector Store
-        logger.info("Step 4: Creating vector store...")
-        dimension = embedding_generator.get_embedding_dimension()
+    files = create_loader(paths).find_documents(paths.raw_data_dir)
+    if not files and len(rebuild) == num_shards and not incremental:
+        logger.error(f"No documents found! Please add documents to {paths.raw_data_dir}")
+        return
 
-        vector_store = FAISSVectorStore(
-            dimension=dimension,
-            index_path=Config.FAISS_INDEX_PATH,
-            metadata_path=Config.METADATA_PATH
+    embedding_generator = create_embedding_generator(paths)
+    shards = []
+    for shard_number in range(num_shards):
+        index_path, metadata_path, manifest_path = ShardedVectorStore.shard_paths(paths.shards_dir, shard_number)
+        first_id = ShardedVectorStore.first_id(shard_number)
+        if shard_number not in rebuild:
+            shards.append(FAISSVectorStore.from_index(index_path, metadata_path, first_id=first_id))
+            continue
+
+        shard = IndexShard(
+            index_path=index_path,
+            metadata_path=metadata_path,
+            manifest_path=manifest_path,
+            first_id=first_id,
+            files=[file_path for file_path in files if shard_for_source(str(file_path), num_shards) == shard_number]
         )
+        logger.info(f"=== Shard {shard_number + 1}/{num_shards}: {len(shard.files)} documents ===")
+        build = build_incremental_index if incremental else build_full_index
+        shards.append(build(logger, paths, shard, embedding_generator))
+
+    embedding_generator.close()
+    # Only a build that looked up every chunk of every shard knows which cache entries are stale
+    save_chunk_cache(embedding_generator.chunk_cache, logger, prune=not incremental and len(rebuild) == num_shards)
+
+    vector_store = ShardedVectorStore(paths.shards_dir, shards)
+    vector_store.save_layout()
+    return vector_store
+
+
+def main():
+    """Main pipeline for building the vector index"""
+    args = parse_args()
+    logger = setup_logging()
+    logger.info("=== Starting RAG Index Building Pipeline (Phase 1) ===")
+
+    try:
+        paths = collection_paths(args.collection)
+        logger.info(f"Collection: {args.collection}")
 
-        vector_store.add_embeddings(embeddings, chunks)
+        if Config.NUM_SHARDS > 1:
+            vector_store = build_sharded_index(logger, paths, args.incremental, args.shard)
+        elif args.shard:
+            raise ValueError("--shard needs a sharded index (NUM_SHARDS > 1)")
+        elif args.incremental:
+            vector_store = build_incremental_index(logger, paths)
+        else:
+            vector_store = build_full_index(logger, paths)
 
-        # Step 5: Save Vector Store
-        logger.info("Step 5: Saving vector store...")
-        vector_store.save_index()
+        if vector_store is None:
+            return
 
         # Final Statistics
         store_stats = vector_store.get_stats()
@@ -93,8 +364,15 @@ def main():
 
         logger.info("=== Index Building Complete! ===")
         logger.info(f"Created index with {store_stats['total_vectors']} vectors")
-        logger.info(f"Index saved to: {Config.FAISS_INDEX_PATH}")
-        logger.info(f"Metadata saved to: {Config.METADATA_PATH}")
+        if Config.NUM_SHARDS > 1:
+            logger.info(f"{Config.NUM_SHARDS} shards saved to: {paths.shards_dir}")
+            return
+        logger.info(f"Index saved to: {paths.index_path}")
+        logger.info(f"Metadata saved to: {paths.metadata_path}")
+        if vector_store.lexical_index is not None:
+            logger.info(f"BM25 index saved to: {FAISSVectorStore.lexical_index_path(paths.index_path)}")
+        if vector_store.attribute_index is not None:
+            logger.info(f"Attribute index saved to: {FAISSVectorStore.attribute_index_path(paths.index_path)}")
 
     except Exception as e:
         logger.error(f"Error in index building pipeline: {str(e)}", exc_info=True)
@@ -103,4 +381,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
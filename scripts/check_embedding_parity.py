@@ -0,0 +1,86 @@
+import argparse
+import sys
+import os
+import logging
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from config.config import Config
+from src.embeddings import EmbeddingGenerator
+
+SAMPLE_TEXTS = [
+    "What is artificial intelligence?",
+    "How does machine learning work?",
+    "Python is a programming language.",
+    "The weather is sunny today.",
+    "Retrieval-augmented generation grounds answers in documents.",
+    "FAISS performs efficient similarity search over dense vectors.",
+    "The quarterly report shows revenue growth in every region.",
+    "Install the dependencies before building the index.",
+]
+
+
+def load_texts(args):
+    """Texts from --texts-file (one per line), or the built-in samples"""
+    if args.texts_file:
+        with open(args.texts_file, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()][:args.max_texts]
+    return SAMPLE_TEXTS
+
+
+def embed(texts, backend, onnx_quantize):
+    """Embed texts with one backend and return (embeddings, seconds after model load)"""
+    embedding_generator = EmbeddingGenerator(
+        model_name=Config.EMBEDDING_MODEL,
+        cache_dir=Config.MODELS_DIR,
+        backend=backend,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=onnx_quantize
+    )
+    embedding_generator.initialize_model()
+
+    start_time = time.perf_counter()
+    embeddings = embedding_generator.generate_embeddings(texts, show_progress_bar=False)
+    return embeddings, time.perf_counter() - start_time
+
+
+def check_embedding_parity():
+    """Compare ONNX Runtime embeddings against the PyTorch sentence-transformers path"""
+    parser = argparse.ArgumentParser(description="Check cosine agreement of the ONNX embedding backend with torch")
+    parser.add_argument("--texts-file", help="File with one text per line (default: built-in samples)")
+    parser.add_argument("--max-texts", type=int, default=1000)
+    parser.add_argument("--onnx-quantize", action="store_true", default=Config.ONNX_QUANTIZE,
+                        help="Check the int8-quantized export")
+    parser.add_argument("--min-cosine", type=float, default=None,
+                        help="Lowest acceptable per-text cosine (default 0.999, or 0.98 with --onnx-quantize)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    min_cosine = args.min_cosine or (0.98 if args.onnx_quantize else 0.999)
+
+    texts = load_texts(args)
+    reference, torch_seconds = embed(texts, "torch", False)
+    candidate, onnx_seconds = embed(texts, "onnx", args.onnx_quantize)
+
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+
+    label = "onnx-int8" if args.onnx_quantize else "onnx"
+    print(f"{Config.EMBEDDING_MODEL}: torch vs {label} on {len(texts)} texts")
+    print(f"  cosine  mean {cosines.mean():.6f}  min {cosines.min():.6f}  (threshold {min_cosine})")
+    print(f"  seconds torch {torch_seconds:.3f}  {label} {onnx_seconds:.3f}")
+
+    if cosines.min() < min_cosine:
+        worst = int(np.argmin(cosines))
+        print(f"FAIL: lowest agreement {cosines[worst]:.6f} on: {texts[worst][:100]}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    check_embedding_parity()
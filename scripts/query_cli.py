@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 import logging
@@ -6,7 +7,6 @@ from datetime import datetime
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.rag_pipeline import RAGPipeline
 from config.config import Config
 
 
@@ -82,22 +82,35 @@ def single_query_mode(pipeline, query):
     print_response(result)
 
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Ask the RAG system a question, or start interactive mode")
+    parser.add_argument("query", nargs="*", help="Question to answer (omit for interactive mode)")
+    parser.add_argument("--warmup", choices=["eager", "background", "lazy"], default=Config.EMBEDDING_WARMUP,
+                        help="When to load the embedding model")
+    parser.add_argument("--skip-connection-check", action="store_true", default=not Config.LLM_CONNECTION_CHECK,
+                        help="Do not probe the LLM backend before the first query")
+    return parser.parse_args()
+
+
 def main():
     """Main CLI function"""
     logger = setup_logging()
 
     # Parse command line arguments
-    if len(sys.argv) > 1:
-        query = " ".join(sys.argv[1:])
+    args = parse_args()
+    if args.query:
+        query = " ".join(args.query)
         mode = "single"
     else:
         mode = "interactive"
 
     try:
-        # Initialize pipeline
+        # Initialize pipeline; imported here so the first message prints before the heavy imports
         print("🔧 Initializing RAG pipeline...")
+        from src.rag_pipeline import RAGPipeline
         pipeline = RAGPipeline()
-        pipeline.initialize()
+        pipeline.initialize(warmup=args.warmup, check_connection=not args.skip_connection_check)
         print("✅ Pipeline ready!")
 
         # Run based on mode
@@ -0,0 +1,57 @@
+import argparse
+import sys
+import os
+import logging
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aiohttp import web
+
+from config.config import Config
+from src.llm_client import StubLLMClient
+from src.rag_pipeline import RAGPipeline
+from src.server import RAGServer
+
+
+def setup_logging():
+    """Setup logging for the server"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    return logging.getLogger(__name__)
+
+
+def main():
+    """Load the model and index once and serve queries over HTTP"""
+    parser = argparse.ArgumentParser(description="Serve the RAG pipeline over HTTP")
+    parser.add_argument("--host", default=Config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT)
+    parser.add_argument("--max-concurrency", type=int, default=Config.SERVER_MAX_CONCURRENCY,
+                        help="Maximum in-flight queries")
+    parser.add_argument("--batch-size", type=int, default=Config.BATCH_MAX_SIZE,
+                        help="Maximum queries per embedding/FAISS micro-batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=Config.BATCH_MAX_WAIT_MS,
+                        help="How long a query waits for others to join its micro-batch")
+    parser.add_argument("--stub-llm", action="store_true",
+                        help="Answer with the local stub LLM (STUB_LLM_* settings) instead of LLM_BACKEND")
+    args = parser.parse_args()
+
+    logger = setup_logging()
+
+    pipeline = RAGPipeline()
+    if args.stub_llm:
+        stub = StubLLMClient.from_config()
+        pipeline.initialize(llm_client=stub, async_llm_client=stub)
+    else:
+        pipeline.initialize()
+    pipeline.enable_batching(max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms)
+
+    server = RAGServer(pipeline, max_concurrency=args.max_concurrency)
+    logger.info(f"Serving on http://{args.host}:{args.port}")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import logging
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.attribute_index import AttributeIndex
+
+
+def test_filter_values_match_by_type():
+    """A filter on 1 must not match "1" or True, before or after saving"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    index = AttributeIndex(["page", "tags"])
+    index.add([0, 1, 2, 3, 4], [
+        {"page": 1},
+        {"page": "1"},
+        {"page": True},
+        {"page": 1.0},
+        {"page": {"nested": 1}, "tags": ["1", 1, None]}
+    ])
+
+    with tempfile.TemporaryDirectory() as directory:
+        for stage in ("overlay", "saved"):
+            assert index.select({"page": 1}).tolist() == [0], stage
+            assert index.select({"page": "1"}).tolist() == [1], stage
+            assert index.select({"page": True}).tolist() == [2], stage
+            assert index.select({"page": 1.0}).tolist() == [3], stage
+            assert index.select({"page": [1, "1"]}).tolist() == [0, 1], stage
+            assert index.select({"tags": "1"}).tolist() == [4], stage
+            assert index.select({"tags": 1}).tolist() == [4], stage
+            assert index.select({"tags": True}).tolist() == [], stage
+
+            for bad_filter in ({"page": {"nested": 1}}, {"page": None}):
+                try:
+                    index.select(bad_filter)
+                except ValueError:
+                    pass
+                else:
+                    raise AssertionError(f"{bad_filter} should be rejected ({stage})")
+
+            index.save(os.path.join(directory, "attrs.bin"))
+        index.close()
+
+    logger.info("✅ Attribute index test completed successfully!")
+
+
+if __name__ == "__main__":
+    test_filter_values_match_by_type()
@@ -19,7 +19,10 @@ def test_embeddings():
     # Initialize embedding generator
     embedding_gen = EmbeddingGenerator(
         model_name=Config.EMBEDDING_MODEL,
-        cache_dir=Config.MODELS_DIR
+        cache_dir=Config.MODELS_DIR,
+        backend=Config.EMBEDDING_BACKEND,
+        onnx_dir=Config.ONNX_MODELS_DIR,
+        onnx_quantize=Config.ONNX_QUANTIZE
     )
 
     # Test texts
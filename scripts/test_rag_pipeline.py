@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 import logging
@@ -5,10 +6,12 @@ import logging
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from config.config import Config
+from src.llm_client import StubLLMClient
 from src.rag_pipeline import RAGPipeline
 
 
-def test_pipeline():
+def test_pipeline(stub_llm: bool = False):
     """Test the complete RAG pipeline"""
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
@@ -18,7 +21,11 @@ def test_pipeline():
     try:
         # Initialize pipeline
         pipeline = RAGPipeline()
-        pipeline.initialize()
+        if stub_llm:
+            stub = StubLLMClient.from_config()
+            pipeline.initialize(llm_client=stub, async_llm_client=stub)
+        else:
+            pipeline.initialize()
         logger.info("✅ Pipeline initialized successfully")
 
         # Test queries
@@ -54,4 +61,8 @@ def test_pipeline():
 
 
 if __name__ == "__main__":
-    test_pipeline()
+    parser = argparse.ArgumentParser(description="Run sample queries through the RAG pipeline")
+    parser.add_argument("--stub-llm", action="store_true",
+                        help="Use the offline stub LLM instead of LLM_BACKEND (no network or API key needed)")
+    args = parser.parse_args()
+    test_pipeline(stub_llm=args.stub_llm or Config.LLM_BACKEND == "stub")
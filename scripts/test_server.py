@@ -0,0 +1,57 @@
+import sys
+import os
+import asyncio
+import logging
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from aiohttp.test_utils import TestClient, TestServer
+from src.rag_pipeline import RAGPipeline
+from src.server import RAGServer
+
+
+async def _post(path: str, body) -> tuple:
+    """POST a JSON body to a server whose pipeline is never initialized, returning (status, text)"""
+    server = RAGServer(RAGPipeline())
+    async with TestClient(TestServer(server.create_app())) as client:
+        response = await client.post(path, json=body)
+        return response.status, await response.text()
+
+
+def test_rejects_non_object_body():
+    """JSON bodies that are not objects are a 400, not a server error"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    for path in ("/query", "/query/stream"):
+        for body in (["What is RAG?"], "What is RAG?", 42):
+            status, text = asyncio.run(_post(path, body))
+            assert status == 400, f"{path} with {body!r} returned {status}"
+            assert text == "Request body must be a JSON object"
+
+    logger.info("✅ Server request validation test completed successfully!")
+
+
+def test_rejects_invalid_filter_and_collection():
+    """Filters with non-scalar values and collection names outside COLLECTIONS_DIR are a 400, not an error answer"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    for path in ("/query", "/query/stream"):
+        for metadata_filter in ({"source": None}, {"source": {"name": "a.pdf"}}, {"tags": ["a", ["b"]]}):
+            status, text = asyncio.run(_post(path, {"query": "What is RAG?", "filter": metadata_filter}))
+            assert status == 400, f"{path} with filter {metadata_filter!r} returned {status}"
+            assert text.startswith("'filter."), text
+
+        for collection in ("../secrets", "", ".hidden"):
+            status, text = asyncio.run(_post(path, {"query": "What is RAG?", "collection": collection}))
+            assert status == 400, f"{path} with collection {collection!r} returned {status}"
+            assert text.startswith("Invalid collection name"), text
+
+    logger.info("✅ Server filter validation test completed successfully!")
+
+
+if __name__ == "__main__":
+    test_rejects_non_object_body()
+    test_rejects_invalid_filter_and_collection()
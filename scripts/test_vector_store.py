@@ -0,0 +1,43 @@
+import sys
+import os
+import logging
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain.schema import Document
+from src.vector_store import FAISSVectorStore
+
+
+def test_ivf_remove_ids_keeps_ids():
+    """After removing ids from an IVF index, searches still return the ids vectors were added with"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    vectors = np.random.RandomState(0).randn(3000, 32).astype('float32')
+    documents = [Document(page_content=f"chunk {i}", metadata={}) for i in range(len(vectors))]
+
+    for index_type in ("ivf_flat", "ivf_pq"):
+        store = FAISSVectorStore(
+            32, index_type=index_type, nlist=16, pq_m=8, pq_nbits=6, nprobe=16, train_size=len(vectors)
+        )
+        store.add_embeddings(vectors, documents)
+        store.flush()
+
+        assert store.remove_ids(list(range(1000))) == 1000
+        assert store.index.ntotal == 2000
+
+        for query_id in (1000, 2500, 2999):
+            distances, ids = store.search_vectors(vectors[query_id], k=3)
+            assert ids[0][0] == query_id, f"{index_type}: query {query_id} returned {ids[0].tolist()}"
+            assert (ids[0] >= 1000).all(), f"{index_type}: removed ids returned {ids[0].tolist()}"
+
+        results = store.similarity_search(vectors[2500], k=1)
+        assert results[0]["id"] == 2500 and results[0]["content"] == "chunk 2500"
+
+    logger.info("✅ Vector store removal test completed successfully!")
+
+
+if __name__ == "__main__":
+    test_ivf_remove_ids_keeps_ids()
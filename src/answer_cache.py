@@ -0,0 +1,121 @@
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict, defaultdict
+from itertools import count
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class SemanticAnswerCache:
+    """Caches LLM answers for semantically equivalent queries over the same retrieved chunks.
+
+    An entry matches when the retrieved chunk ids and generation parameters are
+    identical and the cosine similarity between query embeddings reaches the
+    threshold. Entries expire after ttl_seconds, the least recently used ones are
+    evicted above max_entries, and the entries of a namespace (a collection) are
+    dropped when its index version changes.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple, List[int]] = defaultdict(list)
+        self._entry_ids = count()
+        self._index_versions: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_bucket(chunk_ids: List[int], params: Tuple) -> Tuple:
+        """Exact-match part of the key: retrieved chunk ids plus prompt/model parameters"""
+        return tuple(sorted(chunk_ids)), params
+
+    def get(self, query_embedding: np.ndarray, bucket: Tuple, index_version: Any, namespace: Any = None) -> Optional[str]:
+        """Return a cached answer for a similar query in the same bucket, if any"""
+        query_vector = self._normalize(query_embedding)
+        now = time.time()
+
+        with self._lock:
+            self._check_index_version(namespace, index_version)
+
+            best_id, best_similarity = None, self.similarity_threshold
+            for entry_id in list(self._buckets.get(bucket, [])):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(np.dot(entry["embedding"], query_vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id]["answer"]
+
+    def put(self, query_embedding: np.ndarray, bucket: Tuple, index_version: Any, answer: str, namespace: Any = None):
+        """Store an answer, evicting the least recently used entries over the limit"""
+        with self._lock:
+            self._check_index_version(namespace, index_version)
+
+            entry_id = next(self._entry_ids)
+            self._entries[entry_id] = {
+                "embedding": self._normalize(query_embedding),
+                "bucket": bucket,
+                "namespace": namespace,
+                "answer": answer,
+                "created_at": time.time()
+            }
+            self._buckets[bucket].append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _check_index_version(self, namespace: Any, index_version: Any):
+        """Invalidate a namespace's entries once its index has been rebuilt or modified"""
+        if namespace in self._index_versions and index_version == self._index_versions[namespace]:
+            return
+        stale_ids = [entry_id for entry_id, entry in self._entries.items() if entry["namespace"] == namespace]
+        if stale_ids:
+            self.logger.info("Vector index changed, clearing its answer cache entries")
+        for entry_id in stale_ids:
+            self._remove(entry_id)
+        self._index_versions[namespace] = index_version
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket_ids = self._buckets[entry["bucket"]]
+        bucket_ids.remove(entry_id)
+        if not bucket_ids:
+            del self._buckets[entry["bucket"]]
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype='float32').ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,225 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import tempfile
+import numpy as np
+from typing import List, Dict, Any, Iterable, Union
+from src.bm25_index import term_hash
+
+# Value(s) a filter accepts for one field: a single value or any of a list
+FilterValue = Union[str, int, float, bool, List[Union[str, int, float, bool]]]
+
+# Values are keyed with their type, so 1, 1.0, "1" and True are different values
+_VALUE_TYPES = {bool: "b", int: "i", float: "f", str: "s"}
+
+
+def attribute_key(field: str, value: Any) -> int:
+    """Stable 64-bit key of one scalar field value; raises ValueError for other types"""
+    value_type = _VALUE_TYPES.get(type(value))
+    if value_type is None:
+        raise ValueError(
+            f"Cannot index or filter {field}={value!r}: values must be str, int, float or bool"
+        )
+    return term_hash(f"{field}\0{value_type}\0{value}")
+
+
+class AttributeIndex:
+    """Inverted index from chunk metadata values to chunk ids, in a memory-mapped file.
+
+    Every value of the indexed fields (list fields such as tags contribute each
+    element) keeps a sorted array of the chunk ids that carry it, so the ids
+    matching a filter are a union per field and an intersection across fields
+    of precomputed arrays, with no metadata decoded. Only str, int, float and
+    bool values are indexed, and a filter value matches only stored values of
+    the same type: {"page": 1} does not match "1" or True.
+
+    File layout (little endian)::
+
+        magic     8 bytes   b"RAGATTR2"
+        keys      uint64    number of distinct (field, value) keys
+        postings  uint64    number of (key, chunk) pairs
+        fields    uint64    length of the field list
+        field list          UTF-8 JSON list of the indexed fields, padded to 8 bytes
+        hashes    uint64[keys]          key hashes, sorted ascending
+        offsets   uint64[keys + 1]      postings range of each key
+        ids       int64[postings]       chunk ids, ascending within each key
+
+    As with BM25Index, changes after opening are kept in an overlay until the
+    next save, but here they are visible to lookups immediately.
+    """
+
+    # Version 2 keys values by type; version 1 files must be rebuilt
+    MAGIC = b"RAGATTR2"
+    HEADER = struct.Struct("<8sQQQ")
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._mmap = None
+        self._empty_views()
+        self._deleted = set()
+        self._added: Dict[int, List[int]] = {}
+        self._added_ids = set()
+
+    # Lookups
+
+    def select(self, metadata_filter: Dict[str, FilterValue]) -> np.ndarray:
+        """Sorted ids of chunks matching every field of metadata_filter (any of the values listed for a field)"""
+        unknown = sorted(set(metadata_filter) - set(self.fields))
+        if unknown:
+            raise ValueError(f"Cannot filter on {unknown}; indexed fields are {list(self.fields)}")
+
+        selected = None
+        for field, values in metadata_filter.items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            matches = self.ids_for(field, values)
+            selected = matches if selected is None else np.intersect1d(selected, matches, assume_unique=True)
+            if not len(selected):
+                break
+        return selected if selected is not None else np.empty(0, dtype='int64')
+
+    def ids_for(self, field: str, values: Iterable[Any]) -> np.ndarray:
+        """Sorted ids of chunks whose field has any of values"""
+        postings = []
+        for value in values:
+            key = attribute_key(field, value)
+            key_index = int(np.searchsorted(self._hashes, np.uint64(key)))
+            if key_index < len(self._hashes) and self._hashes[key_index] == np.uint64(key):
+                postings.append(self._ids[int(self._offsets[key_index]):int(self._offsets[key_index + 1])])
+            if key in self._added:
+                postings.append(np.array(self._added[key], dtype='int64'))
+
+        if not postings:
+            return np.empty(0, dtype='int64')
+        ids = np.unique(np.concatenate(postings)).astype('int64')
+        if self._deleted:
+            ids = ids[~np.isin(ids, list(self._deleted))]
+        return ids
+
+    # Writing
+
+    def add(self, item_ids: List[int], metadatas: List[Dict[str, Any]]):
+        """Index the field values of new chunks"""
+        for item_id, metadata in zip(item_ids, metadatas):
+            item_id = int(item_id)
+            self._deleted.discard(item_id)
+            self._added_ids.add(item_id)
+            for key in self._keys(metadata):
+                self._added.setdefault(key, []).append(item_id)
+
+    def remove(self, item_ids: List[int]):
+        """Remove chunks by id"""
+        removed = {int(item_id) for item_id in item_ids}
+        self._deleted.update(removed)
+        unsaved = removed & self._added_ids
+        if unsaved:
+            self._added_ids -= unsaved
+            for key in list(self._added):
+                kept = [item_id for item_id in self._added[key] if item_id not in unsaved]
+                if kept:
+                    self._added[key] = kept
+                else:
+                    del self._added[key]
+
+    def save(self, path: str):
+        """Merge the overlay with the mapped postings, write them to path and reopen it memory-mapped"""
+        # Boolean indexing copies, so no view of the mapping outlives close() below
+        base_hashes = np.repeat(self._hashes, np.diff(self._offsets).astype('int64'))
+        live = ~np.isin(self._ids, list(self._deleted)) if self._deleted else np.ones(len(self._ids), bool)
+        base_hashes, base_ids = base_hashes[live], self._ids[live]
+
+        added_hashes = [np.full(len(ids), key, dtype='<u8') for key, ids in self._added.items()]
+        added_ids = [np.array(ids, dtype='<i8') for ids in self._added.values()]
+        hashes = np.concatenate([base_hashes.astype('<u8')] + added_hashes)
+        ids = np.concatenate([base_ids.astype('<i8')] + added_ids)
+
+        # Group postings by key, ids ascending within each key
+        order = np.lexsort((ids, hashes))
+        hashes, ids = hashes[order], ids[order]
+        key_hashes, key_counts = np.unique(hashes, return_counts=True)
+        offsets = np.zeros(len(key_hashes) + 1, dtype='<u8')
+        np.cumsum(key_counts, out=offsets[1:])
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        fields = json.dumps(list(self.fields)).encode('utf-8')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(key_hashes), len(ids), len(fields)))
+            f.write(fields + b"\0" * (-len(fields) % 8))
+            for section in (key_hashes.astype('<u8'), offsets, ids):
+                f.write(section.tobytes())
+
+        self.close()
+        os.replace(tmp_path, path)
+        self.open(path)
+
+        self.logger.info(f"Saved attribute index with {len(key_hashes)} values and {len(ids)} postings to {path}")
+
+    # Opening and closing
+
+    def open(self, path: str):
+        """Map an index file written by save; fields become the ones it was built with"""
+        self.close()
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, key_count, posting_count, fields_length = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an attribute index file of this version")
+
+        offset = self.HEADER.size
+        self.fields = tuple(json.loads(self._mmap[offset:offset + fields_length].decode('utf-8')))
+        offset += fields_length + (-fields_length % 8)
+        views = []
+        for dtype, count in (('<u8', key_count), ('<u8', key_count + 1), ('<i8', posting_count)):
+            view = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+            views.append(view)
+            offset += view.nbytes
+        self._hashes, self._offsets, self._ids = views
+
+    def close(self):
+        """Release the mapping and discard any unsaved overlay"""
+        # Drop numpy views before closing the mmap they point into
+        self._empty_views()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._deleted = set()
+        self._added = {}
+        self._added_ids = set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size of the mapped index"""
+        return {
+            "fields": list(self.fields),
+            "values": len(self._hashes),
+            "postings": len(self._ids)
+        }
+
+    # Internals
+
+    def _empty_views(self):
+        self._hashes = np.empty(0, dtype='<u8')
+        self._offsets = np.zeros(1, dtype='<u8')
+        self._ids = np.empty(0, dtype='<i8')
+
+    def _keys(self, metadata: Dict[str, Any]) -> set:
+        """Keys of every indexed field value in a chunk's metadata; values of other types are not indexed"""
+        keys = set()
+        for field in self.fields:
+            values = metadata.get(field)
+            if values is None:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            keys.update(attribute_key(field, value) for value in values if type(value) in _VALUE_TYPES)
+        return keys
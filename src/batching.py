@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class RetrievalBatcher:
+    """Coalesces concurrent retrieval requests into one batched embedding and FAISS call.
+
+    A request waits at most max_wait_ms for others to arrive; a batch is dispatched
+    as soon as it reaches max_batch_size. Queries for different collections or
+    metadata filters are retrieved in separate calls. The batch function runs in the executor so the
+    event loop stays free while the model and index do their work.
+    """
+
+    def __init__(
+            self,
+            retrieve_batch: Callable[[List[str], str, Dict[str, Any]], List[Tuple[Any, ...]]],
+            executor: Executor,
+            max_batch_size: int = 32,
+            max_wait_ms: float = 5
+    ):
+        self.retrieve_batch = retrieve_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.logger = logging.getLogger(__name__)
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.queries = 0
+
+    async def retrieve(
+            self,
+            query: str,
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> Tuple[Any, ...]:
+        """Queue a query and wait for its (embedding, chunks, timings) result"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, collection, metadata_filter, future))
+        return await future
+
+    async def _run(self):
+        """Collect queued queries into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for query, collection, metadata_filter, future in batch:
+                key = (collection, repr(sorted(metadata_filter.items())) if metadata_filter else None)
+                groups.setdefault(key, (collection, metadata_filter, []))[2].append((query, future))
+
+            for collection, metadata_filter, requests in groups.values():
+                queries = [query for query, _ in requests]
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, self.retrieve_batch, queries, collection, metadata_filter
+                    )
+                except Exception as e:
+                    for _, future in requests:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), result in zip(requests, results):
+                    if not future.done():
+                        future.set_result(result)
+
+            self.batches += 1
+            self.queries += len(batch)
+            self.logger.debug(f"Dispatched retrieval batch of {len(batch)} queries")
+
+    def get_stats(self):
+        """Get batch counters"""
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0
+        }
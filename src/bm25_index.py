@@ -0,0 +1,319 @@
+import os
+import re
+import mmap
+import math
+import struct
+import hashlib
+import logging
+import tempfile
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Tuple
+
+# Word-like runs, keeping joined forms such as ABC-123, 0x1f/2 or v2.3.1 together
+_TOKEN = re.compile(r"[^\W_]+(?:[-_./:][^\W_]+)*")
+_TOKEN_PARTS = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the their this to was were "
+    "what when where which who why will with how do does did can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of text; a joined token such as err-404 also yields its parts"""
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = _TOKEN_PARTS.findall(token)
+        if len(parts) > 1:
+            terms.append(token)
+            terms.extend(parts)
+        elif token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash under which a term is stored"""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class BM25Index:
+    """BM25 inverted index over chunk text in a compact, memory-mapped file.
+
+    File layout (little endian, sections padded to 8 bytes)::
+
+        magic     8 bytes   b"RAGBM251"
+        docs      uint64    number of chunks
+        terms     uint64    number of distinct terms
+        postings  uint64    number of (term, chunk) pairs
+        avgdl     float64   average chunk length in terms
+        hashes    uint64[terms]         term hashes, sorted ascending
+        offsets   uint64[terms + 1]     postings range of each term
+        ids       int64[docs]           chunk ids, sorted ascending
+        lengths   uint32[docs]          chunk length in terms
+        postings  uint32[postings]      chunk positions, grouped by term
+        tfs       uint16[postings]      term frequency in that chunk
+
+    A query reads only the postings of its own terms. As with MetadataStore,
+    chunks added or removed after opening are kept in an overlay and merged
+    into the file on save. Additions are searchable immediately, scored with
+    corpus statistics that include them; removed chunks still count towards
+    those statistics until the save.
+    """
+
+    MAGIC = b"RAGBM251"
+    HEADER = struct.Struct("<8sQQQd")
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._mmap = None
+        self._avgdl = 0.0
+        self._empty_views()
+        self._deleted = set()
+        self._added_postings: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._added_lengths: Dict[int, int] = {}
+        self._overlay = None
+        self._hash_cache: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        deleted_from_base = int(np.isin(self._ids, list(self._deleted)).sum()) if self._deleted else 0
+        return len(self._ids) - deleted_from_base + len(self._added_lengths)
+
+    # Searching
+
+    def search(self, query: str, k: int = 5, allowed_ids: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) of the k best-scoring chunks for query, best first, among allowed_ids when given"""
+        if k <= 0:
+            return np.empty(0, dtype='float32'), np.empty(0, dtype='int64')
+        ids, scores = self._score(query)
+        if self._deleted and len(ids):
+            keep = ~np.isin(ids, list(self._deleted))
+            ids, scores = ids[keep], scores[keep]
+        if allowed_ids is not None and len(ids):
+            keep = np.isin(ids, allowed_ids)
+            ids, scores = ids[keep], scores[keep]
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return scores[order], ids[order]
+
+    def search_batch(
+            self,
+            queries: List[str],
+            k: int = 5,
+            allowed_ids: np.ndarray = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Return (scores, ids) of the k best-scoring chunks for each query"""
+        return [self.search(query, k, allowed_ids) for query in queries]
+
+    def _score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 score of every chunk, mapped or in the overlay, containing at least one query term, as (ids, scores)"""
+        added_hashes, added_ids, added_tfs, added_lengths, added_total = self._overlay_postings()
+        doc_count = len(self._ids) + len(self._added_lengths)
+        if doc_count == 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='float32')
+        avgdl = (self._avgdl * len(self._ids) + added_total) / doc_count or 1.0
+
+        term_ids, contributions = [], []
+        for term in set(tokenize(query)):
+            hashed = np.uint64(term_hash(term))
+            ids, tfs, lengths = [], [], []
+
+            term_index = int(np.searchsorted(self._hashes, hashed))
+            if term_index < len(self._hashes) and self._hashes[term_index] == hashed:
+                start, end = int(self._offsets[term_index]), int(self._offsets[term_index + 1])
+                postings = self._postings[start:end]
+                ids.append(self._ids[postings])
+                tfs.append(self._tfs[start:end])
+                lengths.append(self._lengths[postings])
+
+            start = int(np.searchsorted(added_hashes, hashed, side='left'))
+            end = int(np.searchsorted(added_hashes, hashed, side='right'))
+            if end > start:
+                ids.append(added_ids[start:end])
+                tfs.append(added_tfs[start:end])
+                lengths.append(added_lengths[start:end])
+
+            if not ids:
+                continue
+            ids = np.concatenate(ids)
+            tfs = np.concatenate(tfs).astype('float32')
+            lengths = np.concatenate(lengths).astype('float32')
+
+            document_frequency = len(ids)
+            idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+            term_ids.append(ids)
+            contributions.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not term_ids:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='float32')
+
+        ids, inverse = np.unique(np.concatenate(term_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype('float32')
+        return ids.astype('int64'), scores
+
+    def _overlay_postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+        """Unsaved postings sorted by term as (hashes, ids, tfs, chunk lengths, total length), rebuilt after changes"""
+        if self._overlay is None:
+            hashes = np.concatenate([np.empty(0, '<u8')] + [added[0] for added in self._added_postings])
+            ids = np.concatenate([np.empty(0, '<i8')] + [added[1] for added in self._added_postings])
+            tfs = np.concatenate([np.empty(0, '<u2')] + [added[2] for added in self._added_postings])
+            order = np.argsort(hashes, kind='stable')
+            lengths = np.array([self._added_lengths[int(item_id)] for item_id in ids[order]], dtype='<u4')
+            self._overlay = (hashes[order], ids[order], tfs[order], lengths, sum(self._added_lengths.values()))
+        return self._overlay
+
+    # Writing
+
+    def add(self, item_ids: List[int], texts: List[str]):
+        """Tokenize and add chunks; they are searchable at once and merged into the file on the next save"""
+        self._overlay = None
+        hashes, doc_ids, tfs = [], [], []
+        for item_id, text in zip(item_ids, texts):
+            item_id = int(item_id)
+            counts = Counter(tokenize(text))
+            self._added_lengths[item_id] = sum(counts.values())
+            self._deleted.discard(item_id)
+            for term, tf in counts.items():
+                hashes.append(self._hash(term))
+                doc_ids.append(item_id)
+                tfs.append(min(tf, 65535))
+
+        self._added_postings.append((
+            np.array(hashes, dtype='<u8'), np.array(doc_ids, dtype='<i8'), np.array(tfs, dtype='<u2')
+        ))
+
+    def remove(self, item_ids: List[int]):
+        """Remove chunks by id"""
+        self._overlay = None
+        unsaved = []
+        for item_id in item_ids:
+            item_id = int(item_id)
+            if self._added_lengths.pop(item_id, None) is None:
+                self._deleted.add(item_id)
+            else:
+                unsaved.append(item_id)
+
+        if unsaved:
+            kept_postings = []
+            for hashes, doc_ids, tfs in self._added_postings:
+                keep = ~np.isin(doc_ids, unsaved)
+                kept_postings.append((hashes[keep], doc_ids[keep], tfs[keep]))
+            self._added_postings = kept_postings
+
+    def save(self, path: str):
+        """Merge the overlay with the mapped postings, write them to path and reopen it memory-mapped"""
+        # Expand the mapped postings back to (hash, id, tf) triples, minus removed chunks
+        base_hashes = np.repeat(self._hashes, np.diff(self._offsets).astype('int64'))
+        base_doc_ids = self._ids[self._postings]
+        base_live_docs = ~np.isin(self._ids, list(self._deleted)) if self._deleted else np.ones(len(self._ids), bool)
+        base_live = base_live_docs[self._postings]
+
+        hashes = np.concatenate([base_hashes[base_live]] + [added[0] for added in self._added_postings])
+        doc_ids = np.concatenate([base_doc_ids[base_live]] + [added[1] for added in self._added_postings])
+        tfs = np.concatenate([self._tfs[base_live]] + [added[2] for added in self._added_postings])
+
+        added_ids = np.fromiter(self._added_lengths, dtype='<i8', count=len(self._added_lengths))
+        added_lengths = np.fromiter(self._added_lengths.values(), dtype='<u4', count=len(self._added_lengths))
+        ids = np.concatenate([self._ids[base_live_docs], added_ids])
+        lengths = np.concatenate([self._lengths[base_live_docs], added_lengths])
+        id_order = np.argsort(ids, kind='stable')
+        ids, lengths = ids[id_order].astype('<i8'), lengths[id_order].astype('<u4')
+
+        # Group postings by term, chunks ascending within each term
+        positions = np.searchsorted(ids, doc_ids).astype('<u4')
+        posting_order = np.lexsort((positions, hashes))
+        hashes, positions, tfs = hashes[posting_order], positions[posting_order], tfs[posting_order].astype('<u2')
+        term_hashes, term_counts = np.unique(hashes, return_counts=True)
+        offsets = np.zeros(len(term_hashes) + 1, dtype='<u8')
+        np.cumsum(term_counts, out=offsets[1:])
+        avgdl = float(lengths.mean()) if len(lengths) else 0.0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(ids), len(term_hashes), len(positions), avgdl))
+            for section in (term_hashes.astype('<u8'), offsets, ids, lengths, positions, tfs):
+                f.write(section.tobytes())
+                f.write(b"\0" * (-section.nbytes % 8))
+
+        self.close()
+        os.replace(tmp_path, path)
+        self.open(path)
+
+        self.logger.info(f"Saved BM25 index with {len(ids)} chunks and {len(term_hashes)} terms to {path}")
+
+    # Opening and closing
+
+    def open(self, path: str):
+        """Map an index file written by save"""
+        self.close()
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, doc_count, term_count, posting_count, avgdl = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a BM25 index file")
+
+        self._avgdl = avgdl or 1.0
+        offset = self.HEADER.size
+        views = []
+        for dtype, count in (('<u8', term_count), ('<u8', term_count + 1), ('<i8', doc_count),
+                             ('<u4', doc_count), ('<u4', posting_count), ('<u2', posting_count)):
+            view = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+            views.append(view)
+            offset += view.nbytes + (-view.nbytes % 8)
+        self._hashes, self._offsets, self._ids, self._lengths, self._postings, self._tfs = views
+
+    def close(self):
+        """Release the mapping and discard any unsaved overlay"""
+        # Drop numpy views before closing the mmap they point into
+        self._empty_views()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._avgdl = 0.0
+        self._deleted = set()
+        self._added_postings = []
+        self._added_lengths = {}
+        self._overlay = None
+        # Terms of a saved build are not needed again, so the memo does not outlive it
+        self._hash_cache = {}
+
+    def get_stats(self) -> Dict[str, float]:
+        """Size of the mapped index"""
+        return {
+            "chunks": len(self._ids),
+            "terms": len(self._hashes),
+            "postings": len(self._postings),
+            "avg_chunk_terms": round(self._avgdl, 1)
+        }
+
+    # Internals
+
+    def _empty_views(self):
+        self._hashes = np.empty(0, dtype='<u8')
+        self._offsets = np.zeros(1, dtype='<u8')
+        self._ids = np.empty(0, dtype='<i8')
+        self._lengths = np.empty(0, dtype='<u4')
+        self._postings = np.empty(0, dtype='<u4')
+        self._tfs = np.empty(0, dtype='<u2')
+
+    def _hash(self, term: str) -> int:
+        """term_hash, memoized while indexing (query terms are hashed directly)"""
+        hashed = self._hash_cache.get(term)
+        if hashed is None:
+            hashed = self._hash_cache[term] = term_hash(term)
+        return hashed
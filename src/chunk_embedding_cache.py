@@ -0,0 +1,249 @@
+import os
+import mmap
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from src.embedding_cache import EMBEDDING_DTYPES, quantize_embeddings, dequantize_embeddings
+
+
+class ChunkEmbeddingCache:
+    """Content-addressed chunk embeddings in a memory-mapped file, shared across index builds.
+
+    A key is the SHA-1 of the embedding namespace (model name and normalization)
+    plus the exact chunk text, so a chunk whose text is unchanged since an
+    earlier build is never sent to the model again.
+
+    File layout (little endian, sections padded to 8 bytes)::
+
+        magic    8 bytes   b"RAGEMB01"
+        count    uint64
+        dim      uint64
+        dtype    8 bytes   float32, float16 or int8, NUL padded
+        keys     S40[count]               hex digests, sorted ascending
+        codes    dtype[count, dim]
+        scales   float32[count]           int8 dequantization scales (1.0 otherwise)
+
+    Like VectorFile, embeddings added after opening are spilled to a temporary
+    file as float32 until the next save.
+    """
+
+    MAGIC = b"RAGEMB01"
+    HEADER = struct.Struct("<8sQQ8s")
+    KEY_DTYPE = 'S40'
+
+    def __init__(self, path: str = None, dtype: str = "float32"):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        self.path = path
+        self.dtype = dtype
+        self.dimension = None
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._mmap = None
+        self._keys = np.empty(0, dtype=self.KEY_DTYPE)
+        self._codes = None
+        self._scales = np.empty(0, dtype='<f4')
+        self._spill = None
+        self._spill_lock = threading.Lock()
+        self._spill_rows = 0
+        self._added: Dict[bytes, int] = {}
+        # Keys looked up or added since opening; a pruning save keeps only these
+        self._touched = set()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path and os.path.exists(self.path):
+            self.open(self.path)
+
+    @staticmethod
+    def make_key(text: str, namespace: str) -> bytes:
+        """Key on the exact chunk text plus the model (and normalization) that embeds it"""
+        return hashlib.sha1(f"{namespace}\0{text}".encode('utf-8')).hexdigest().encode('ascii')
+
+    def __len__(self) -> int:
+        return len(self._keys) + sum(1 for key in self._added if self._find(key) is None)
+
+    def get_many(self, keys: List[bytes]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Return (embeddings, found) for keys; rows where found is False are undefined"""
+        embeddings, found = self._read(keys)
+
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(keys) - hits
+        self._touched.update(key for key, hit in zip(keys, found) if hit)
+
+        return embeddings, found
+
+    def _read(self, keys: List[bytes]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        found = np.zeros(len(keys), dtype=bool)
+        if self.dimension is None:
+            return None, found
+
+        embeddings = np.empty((len(keys), self.dimension), dtype='float32')
+        base_rows, base_positions, spill_rows, spill_positions = [], [], [], []
+        for i, key in enumerate(keys):
+            if key in self._added:
+                spill_rows.append(i)
+                spill_positions.append(self._added[key])
+            else:
+                position = self._find(key)
+                if position is not None:
+                    base_rows.append(i)
+                    base_positions.append(position)
+
+        if base_rows:
+            positions = np.asarray(base_positions)
+            embeddings[base_rows] = dequantize_embeddings(self._codes[positions], self._scales[positions])
+            found[base_rows] = True
+        if spill_rows:
+            embeddings[spill_rows] = self._spill_view()[spill_positions]
+            found[spill_rows] = True
+
+        return embeddings, found
+
+    def put_many(self, keys: List[bytes], embeddings: np.ndarray):
+        """Add embeddings, appending them to the spill file"""
+        embeddings = np.ascontiguousarray(embeddings, dtype='<f4')
+        if self.dimension is not None and embeddings.shape[1] != self.dimension:
+            # Every cached entry came from a model of another size and can never hit again
+            self.logger.warning(
+                f"Discarding {self.dimension}-dimensional chunk embedding cache for "
+                f"{embeddings.shape[1]}-dimensional embeddings"
+            )
+            self.close()
+        if self.dimension is None:
+            self.dimension = embeddings.shape[1]
+
+        with self._spill_lock:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile()
+            self._spill.seek(0, os.SEEK_END)
+            self._spill.write(embeddings.tobytes())
+            for key in keys:
+                self._added[key] = self._spill_rows
+                self._spill_rows += 1
+        self._touched.update(keys)
+
+    def save(self, path: str = None, prune: bool = False, block_size: int = 65536):
+        """Write all entries to path and reopen it memory-mapped.
+
+        With prune, only entries looked up or added since opening are kept, so a
+        full build drops embeddings of chunks that no longer exist.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("Cache path must be provided")
+        if self.dimension is None:
+            return
+
+        keys = np.union1d(self._keys, np.array(list(self._added), dtype=self.KEY_DTYPE))
+        if prune:
+            keys = keys[np.isin(keys, np.array(list(self._touched), dtype=self.KEY_DTYPE))]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        scales = []
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(keys), self.dimension, self.dtype.encode('ascii')))
+            self._write_padded(f, keys.tobytes())
+            codes_size = 0
+            for start in range(0, len(keys), block_size):
+                embeddings, _ = self._read(list(keys[start:start + block_size]))
+                codes, block_scales = quantize_embeddings(embeddings, self.dtype)
+                f.write(codes.astype(codes.dtype.newbyteorder('<')).tobytes())
+                codes_size += codes.nbytes
+                scales.append(block_scales)
+            f.write(b"\0" * (-codes_size % 8))
+            f.write(np.concatenate(scales).astype('<f4').tobytes() if scales else b"")
+
+        touched = self._touched
+        self.close()
+        os.replace(tmp_path, path)
+        self.open(path)
+        self._touched = touched
+
+        self.logger.info(f"Saved {len(keys)} cached chunk embeddings to {path}")
+
+    def open(self, path: str):
+        """Map a cache file written by save; an unreadable file is ignored and rewritten on save"""
+        self.close()
+
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count, dimension, dtype = self.HEADER.unpack_from(self._mmap, 0)
+            dtype = dtype.rstrip(b"\0").decode('ascii')
+            if magic != self.MAGIC or dtype not in EMBEDDING_DTYPES:
+                raise ValueError("not a chunk embedding cache")
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable chunk embedding cache {path}: {e}")
+            self.close()
+            return
+
+        keys_start = self.HEADER.size
+        codes_start = keys_start + self._padded(40 * count)
+        scales_start = codes_start + self._padded(count * dimension * np.dtype(dtype).itemsize)
+        self.dimension = dimension
+        self._keys = np.frombuffer(self._mmap, dtype=self.KEY_DTYPE, count=count, offset=keys_start)
+        self._codes = np.frombuffer(
+            self._mmap, dtype=np.dtype(dtype).newbyteorder('<'), count=count * dimension, offset=codes_start
+        ).reshape(count, dimension)
+        self._scales = np.frombuffer(self._mmap, dtype='<f4', count=count, offset=scales_start)
+
+        self.logger.info(f"Opened chunk embedding cache with {count} entries")
+
+    def close(self):
+        """Release the mapping and discard any unsaved entries"""
+        # Drop numpy views before closing the mmap they point into
+        self._keys = np.empty(0, dtype=self.KEY_DTYPE)
+        self._codes = None
+        self._scales = np.empty(0, dtype='<f4')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spill_rows = 0
+        self._added = {}
+        self._touched = set()
+        self.dimension = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "dtype": self.dtype,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _find(self, key: bytes) -> Optional[int]:
+        position = int(np.searchsorted(self._keys, key))
+        if position < len(self._keys) and self._keys[position] == key:
+            return position
+        return None
+
+    def _spill_view(self) -> np.ndarray:
+        with self._spill_lock:
+            self._spill.flush()
+            return np.memmap(self._spill, dtype='<f4', mode='r', shape=(self._spill_rows, self.dimension))
+
+    @staticmethod
+    def _padded(size: int) -> int:
+        return size + (-size % 8)
+
+    def _write_padded(self, f, data: bytes):
+        f.write(data)
+        f.write(b"\0" * (self._padded(len(data)) - len(data)))
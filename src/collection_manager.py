@@ -0,0 +1,192 @@
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from itertools import count
+from typing import Callable, Dict, Any, Iterator, List, Union
+from src.vector_store import FAISSVectorStore
+from src.sharded_vector_store import ShardedVectorStore
+from src.query_processor import QueryProcessor
+from config.config import Config
+
+# The collection kept at the top-level FAISS_INDEX_PATH / METADATA_PATH, as before collections existed
+BASE_COLLECTION = "default"
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+CollectionPaths = namedtuple(
+    "CollectionPaths",
+    ["index_path", "metadata_path", "manifest_path", "shards_dir", "raw_data_dir", "chunk_cache_path"]
+)
+
+
+def collection_paths(name: str) -> CollectionPaths:
+    """Index files and source documents of a collection; named ones live in COLLECTIONS_DIR/<name>/"""
+    if name == BASE_COLLECTION:
+        return CollectionPaths(
+            Config.FAISS_INDEX_PATH, Config.METADATA_PATH, Config.MANIFEST_PATH,
+            Config.SHARDS_DIR, Config.RAW_DATA_DIR, Config.CHUNK_CACHE_PATH
+        )
+    # Names come from requests, so they must not be able to reach outside COLLECTIONS_DIR
+    if not _COLLECTION_NAME.match(name or ""):
+        raise ValueError(f"Invalid collection name: {name!r}")
+
+    collection_dir = os.path.join(Config.COLLECTIONS_DIR, name)
+    return CollectionPaths(
+        os.path.join(collection_dir, "faiss_index.bin"),
+        os.path.join(collection_dir, "faiss_metadata.bin"),
+        os.path.join(collection_dir, "index_manifest.json"),
+        os.path.join(collection_dir, "shards"),
+        os.path.join(Config.COLLECTIONS_DATA_DIR, name),
+        # Pruned by full builds of the collection, so not shared with other collections
+        os.path.join(collection_dir, "chunk_embedding_cache.bin")
+    )
+
+
+VectorStore = Union[FAISSVectorStore, ShardedVectorStore]
+
+
+class Collection:
+    """A loaded collection: its vector store and the query processor searching it"""
+
+    def __init__(self, name: str, vector_store: VectorStore, query_processor: QueryProcessor, generation: int):
+        self.name = name
+        self.vector_store = vector_store
+        self.query_processor = query_processor
+        self.memory_bytes = vector_store.memory_bytes()
+        # Distinguishes this load from earlier ones, whose index may have been rebuilt since
+        self.generation = generation
+        self.in_use = 0
+
+    @property
+    def index_version(self) -> tuple:
+        """Changes whenever search results can change, including on reload"""
+        return self.generation, self.vector_store.index_version
+
+
+class CollectionManager:
+    """Loads named collections on first use and unloads the least recently used over a memory cap.
+
+    All collections are searched with one shared EmbeddingGenerator, so serving
+    many document sets costs one model plus the indexes actually in use. A
+    collection is only unloaded while no query holds it (see acquire); pinned
+    collections are never unloaded.
+    """
+
+    def __init__(
+            self,
+            load_store: Callable[[str], VectorStore],
+            create_query_processor: Callable[[VectorStore], QueryProcessor],
+            max_memory_mb: float = 0,
+            pinned: List[str] = None
+    ):
+        self.load_store = load_store
+        self.create_query_processor = create_query_processor
+        # 0 keeps every loaded collection
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.pinned = set(pinned or [])
+        self.logger = logging.getLogger(__name__)
+        self._loaded: "OrderedDict[str, Collection]" = OrderedDict()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._generations = count(1)
+        self.loads = 0
+        self.unloads = 0
+
+    @contextmanager
+    def acquire(self, name: str) -> Iterator[Collection]:
+        """Use a collection, loading it if needed; it stays loaded until the block exits"""
+        collection = self._check_out(name)
+        try:
+            yield collection
+        finally:
+            with self._lock:
+                collection.in_use -= 1
+                self._unload_over_limit()
+
+    def get(self, name: str) -> Collection:
+        """A collection for use outside acquire; only safe for pinned collections"""
+        with self.acquire(name) as collection:
+            return collection
+
+    def _check_out(self, name: str) -> Collection:
+        with self._lock:
+            collection = self._use(name)
+            if collection is not None:
+                return collection
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Only queries for this collection wait while it loads
+        with load_lock:
+            with self._lock:
+                collection = self._use(name)
+                if collection is not None:
+                    return collection
+
+            try:
+                vector_store = self.load_store(name)
+            except Exception:
+                with self._lock:
+                    self._load_locks.pop(name, None)
+                raise
+            collection = Collection(name, vector_store, self.create_query_processor(vector_store), next(self._generations))
+
+            with self._lock:
+                self._loaded[name] = collection
+                collection.in_use += 1
+                self.loads += 1
+                self._unload_over_limit()
+
+        self.logger.info(f"Loaded collection '{name}' ({collection.memory_bytes / 1024 / 1024:.1f} MB)")
+        return collection
+
+    def _use(self, name: str) -> Collection:
+        """Mark a loaded collection as in use and most recently used; None when not loaded (lock held)"""
+        collection = self._loaded.get(name)
+        if collection is not None:
+            self._loaded.move_to_end(name)
+            collection.in_use += 1
+        return collection
+
+    def _unload_over_limit(self):
+        """Unload idle collections, least recently used first, until under the cap (lock held)"""
+        if not self.max_memory_bytes:
+            return
+        for name in list(self._loaded):
+            if self._memory_bytes() <= self.max_memory_bytes:
+                break
+            collection = self._loaded[name]
+            if collection.in_use or name in self.pinned:
+                continue
+            del self._loaded[name]
+            collection.vector_store.close()
+            self.unloads += 1
+            self.logger.info(f"Unloaded collection '{name}' to stay under the collection memory limit")
+
+    def index_version(self, name: str):
+        """Version of a loaded collection for cache invalidation, or None when it is not loaded"""
+        with self._lock:
+            collection = self._loaded.get(name)
+            return collection.index_version if collection is not None else None
+
+    def _memory_bytes(self) -> int:
+        return sum(collection.memory_bytes for collection in self._loaded.values())
+
+    def close(self):
+        """Unload every collection"""
+        with self._lock:
+            for collection in self._loaded.values():
+                collection.vector_store.close()
+            self._loaded.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded collections (most recently used last), their memory and the load/unload counters"""
+        with self._lock:
+            return {
+                "loaded": list(self._loaded),
+                "memory_mb": round(self._memory_bytes() / 1024 / 1024, 1),
+                "max_memory_mb": round(self.max_memory_bytes / 1024 / 1024, 1),
+                "loads": self.loads,
+                "unloads": self.unloads
+            }
@@ -1,44 +1,150 @@
 import os
+import json
+import fnmatch
 import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 import pypdf
 import docx2txt
 from langchain.schema import Document
 
 
+def _load_document_task(file_path: Path) -> "Document":
+    """Process pool entry point: load one whole file"""
+    return DocumentLoader()._load_single_document(file_path)
+
+
+def _extract_pdf_pages_task(file_path: Path, start: int, end: int) -> str:
+    """Process pool entry point: extract the text of a page range of a PDF"""
+    return DocumentLoader._extract_pdf_text(file_path, start, end)
+
+
 class DocumentLoader:
     """Handles loading of different document types (PDF, TXT, DOCX)"""
 
-    def __init__(self):
+    # PDFs smaller than this are loaded by a single worker without counting pages first
+    LARGE_PDF_BYTES = 1 << 20
+    # Optional {file name pattern: [tags]} file in the data directory
+    TAGS_FILE = "tags.json"
+
+    def __init__(self, num_workers: int = 1, pdf_pages_per_task: int = 50, tags: Dict[str, List[str]] = None):
         self.supported_extensions = {'.pdf', '.txt', '.docx', '.doc'}
+        self.num_workers = num_workers
+        self.pdf_pages_per_task = pdf_pages_per_task
+        # Tags of every matching pattern are stored in each chunk's "tags" metadata for filtering
+        self.tags = tags or {}
         self.logger = logging.getLogger(__name__)
 
+    @classmethod
+    def read_tags(cls, data_dir: str) -> Dict[str, List[str]]:
+        """The tag patterns in data_dir/tags.json, or none when the file does not exist"""
+        tags_path = os.path.join(data_dir, cls.TAGS_FILE)
+        if not os.path.exists(tags_path):
+            return {}
+        with open(tags_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     def load_documents(self, data_dir: str) -> List[Document]:
         """Load all supported documents from a directory"""
-        documents = []
+        files = self.find_documents(data_dir)
+        self.logger.info(f"Found {len(files)} documents to process")
+        return self.load_files(files)
+
+    def find_documents(self, data_dir: str) -> List[Path]:
+        """Find all supported files in a directory"""
         data_path = Path(data_dir)
 
         if not data_path.exists():
             raise FileNotFoundError(f"Data directory not found: {data_dir}")
 
-        # Find all supported files
         files = []
         for ext in self.supported_extensions:
             files.extend(data_path.glob(f"*{ext}"))
 
-        self.logger.info(f"Found {len(files)} documents to process")
+        return sorted(files)
+
+    def load_files(self, files: List[Path]) -> List[Document]:
+        """Load the given files, skipping any that fail"""
+        return list(self.iter_files(files))
+
+    def iter_files(self, files: List[Path]) -> Iterator[Document]:
+        """Yield documents for the given files in input order, skipping any that fail"""
+        if self.num_workers > 1:
+            yield from self._iter_files_parallel(files)
+            return
 
         for file_path in files:
             try:
                 doc = self._load_single_document(file_path)
                 if doc:
-                    documents.append(doc)
                     self.logger.info(f"Loaded: {file_path.name}")
+                    yield self._tag(doc, file_path)
             except Exception as e:
                 self.logger.error(f"Error loading {file_path.name}: {str(e)}")
 
-        return documents
+    def _iter_files_parallel(self, files: List[Path]) -> Iterator[Document]:
+        """Load files across a process pool, yielding results in input order"""
+        self.logger.info(f"Loading documents with {self.num_workers} worker processes")
+
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            # Keep a bounded window of files in flight so results are consumed as they finish
+            pending = deque()
+            for file_path in files:
+                pending.append((file_path, self._submit_file(executor, file_path)))
+                if len(pending) > self.num_workers * 2:
+                    yield from self._collect_file(*pending.popleft())
+
+            while pending:
+                yield from self._collect_file(*pending.popleft())
+
+    def _submit_file(self, executor: ProcessPoolExecutor, file_path: Path) -> List[Future]:
+        """Submit a file to the pool, splitting large PDFs into page ranges"""
+        try:
+            if file_path.suffix.lower() == '.pdf' and file_path.stat().st_size >= self.LARGE_PDF_BYTES:
+                with open(file_path, 'rb') as file:
+                    page_count = len(pypdf.PdfReader(file).pages)
+
+                if page_count > self.pdf_pages_per_task:
+                    return [
+                        executor.submit(
+                            _extract_pdf_pages_task, file_path, start,
+                            min(start + self.pdf_pages_per_task, page_count)
+                        )
+                        for start in range(0, page_count, self.pdf_pages_per_task)
+                    ]
+
+            return [executor.submit(_load_document_task, file_path)]
+        except Exception as e:
+            failed = Future()
+            failed.set_exception(e)
+            return [failed]
+
+    def _collect_file(self, file_path: Path, futures: List[Future]) -> Iterator[Document]:
+        """Wait for the tasks of one file and yield its document"""
+        try:
+            if len(futures) == 1:
+                doc = futures[0].result()
+            else:
+                doc = self._pdf_document(file_path, "".join(future.result() for future in futures))
+
+            if doc:
+                self.logger.info(f"Loaded: {file_path.name}")
+                yield self._tag(doc, file_path)
+        except Exception as e:
+            self.logger.error(f"Error loading {file_path.name}: {str(e)}")
+
+    def _tag(self, doc: Document, file_path: Path) -> Document:
+        """Attach the tags of every pattern matching the file name"""
+        tags = {
+            tag
+            for pattern, pattern_tags in self.tags.items() if fnmatch.fnmatch(file_path.name, pattern)
+            for tag in pattern_tags
+        }
+        if tags:
+            doc.metadata["tags"] = sorted(tags)
+        return doc
 
     def _load_single_document(self, file_path: Path) -> Document:
         """Load a single document based on its extension"""
@@ -55,12 +161,21 @@ class DocumentLoader:
 
     def _load_pdf(self, file_path: Path) -> Document:
         """Load PDF document"""
-        text = ""
+        return self._pdf_document(file_path, self._extract_pdf_text(file_path))
+
+    @staticmethod
+    def _extract_pdf_text(file_path: Path, start: int = 0, end: int = None) -> str:
+        """Extract the text of pages [start, end) of a PDF"""
+        parts = []
         with open(file_path, 'rb') as file:
             pdf_reader = pypdf.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            for page in pdf_reader.pages[start:end]:
+                parts.append(page.extract_text() + "\n")
+
+        return "".join(parts)
 
+    def _pdf_document(self, file_path: Path, text: str) -> Document:
+        """Build the Document for extracted PDF text"""
         return Document(
             page_content=text,
             metadata={
@@ -0,0 +1,134 @@
+import os
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Encodings for cached embeddings: int8 is symmetric scalar quantization with one scale per vector
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize_embeddings(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode float32 rows as dtype codes plus a per-row scale (always 1.0 unless int8)"""
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype='float32'))
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype('int8')
+        return codes, scales.astype('float32')
+    return embeddings.astype(dtype), np.ones(len(embeddings), dtype='float32')
+
+
+def dequantize_embeddings(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Decode rows produced by quantize_embeddings back to float32"""
+    return np.atleast_2d(codes).astype('float32') * np.asarray(scales, dtype='float32')[:, None]
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings, optionally persisted to an .npz file.
+
+    Entries are stored as dtype (float32, float16 or int8) and decoded to float32 on lookup.
+    """
+
+    def __init__(self, max_entries: int = 10000, persist_path: str = None, dtype: str = "float32"):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.dtype = dtype
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, np.float32]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_path and os.path.exists(self.persist_path):
+            self.load()
+
+    @staticmethod
+    def make_key(text: str, model_name: str) -> str:
+        """Key on whitespace-normalized text plus the model that produced the embedding"""
+        normalized = " ".join(text.split())
+        return hashlib.sha1(f"{model_name}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up an embedding, marking it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        codes, scale = entry
+        embedding = dequantize_embeddings(codes, [scale])[0]
+        embedding.setflags(write=False)
+        return embedding
+
+    def put(self, key: str, embedding: np.ndarray):
+        """Store an embedding, evicting the least recently used entries over the limit"""
+        codes, scales = quantize_embeddings(np.ravel(embedding), self.dtype)
+
+        with self._lock:
+            self._entries[key] = (codes[0], scales[0])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, persist_path: str = None):
+        """Write the cache to disk, least recently used first"""
+        persist_path = persist_path or self.persist_path
+        if not persist_path:
+            raise ValueError("Persist path must be provided")
+
+        with self._lock:
+            keys = list(self._entries)
+            entries = list(self._entries.values())
+
+        codes = np.stack([code for code, _ in entries]) if entries else np.empty((0, 0), dtype=self.dtype)
+        scales = np.array([scale for _, scale in entries], dtype='float32')
+
+        # np.savez appends .npz to names without it, so write through a file object
+        tmp_path = persist_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=np.array(keys), codes=codes, scales=scales)
+        os.replace(tmp_path, persist_path)
+
+        self.logger.info(f"Saved {len(keys)} cached query embeddings to {persist_path}")
+
+    def load(self, persist_path: str = None):
+        """Read a cache written by save"""
+        persist_path = persist_path or self.persist_path
+
+        try:
+            with np.load(persist_path) as data:
+                keys = data["keys"]
+                if "codes" in data.files:
+                    vectors = dequantize_embeddings(data["codes"], data["scales"]) if len(keys) else data["codes"]
+                else:
+                    # Caches saved before quantization support hold float32 vectors
+                    vectors = data["vectors"]
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable query embedding cache {persist_path}: {e}")
+            return
+
+        for key, vector in zip(keys[-self.max_entries:], vectors[-self.max_entries:]):
+            self.put(str(key), vector)
+
+        self.logger.info(f"Loaded {len(self._entries)} cached query embeddings")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "dtype": self.dtype,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
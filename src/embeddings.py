@@ -1,47 +1,195 @@
 import logging
+import multiprocessing
+import threading
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
-from sentence_transformers import SentenceTransformer
 import os
+from src.embedding_cache import QueryEmbeddingCache
+from src.chunk_embedding_cache import ChunkEmbeddingCache
+
+# Inference backends: PyTorch sentence-transformers, or an ONNX export run by ONNX Runtime
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+# Model copy held by each embedding worker process
+_worker_model = None
+
+
+def _load_model(model_name: str, cache_dir: str, backend: str, onnx_dir: str, quantize: bool, num_threads: int = 0):
+    """Load a model for the backend; num_threads caps intra-op threads (0 keeps the library default)"""
+    if backend == "onnx":
+        # Imported here so the torch backend does not require onnxruntime, and this one does not import torch
+        from src.onnx_embeddings import OnnxSentenceEncoder, ensure_onnx_model
+        model_dir = ensure_onnx_model(model_name, onnx_dir, cache_dir, quantize)
+        return OnnxSentenceEncoder(model_dir, quantized=quantize, num_threads=num_threads)
+
+    from sentence_transformers import SentenceTransformer
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    return SentenceTransformer(model_name, cache_folder=cache_dir)
+
+
+def _init_embedding_worker(model_name: str, cache_dir: str, backend: str, onnx_dir: str, quantize: bool,
+                           num_threads: int):
+    """Process pool initializer: load this worker's own model with capped intra-op threads"""
+    global _worker_model
+    _worker_model = _load_model(model_name, cache_dir, backend, onnx_dir, quantize, num_threads)
+
+
+def _encode_task(texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+    """Process pool entry point: embed one shard of texts"""
+    return _worker_model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=normalize
+    )
 
 
 class EmbeddingGenerator:
-    """Handles text embedding generation using sentence-transformers"""
+    """Handles text embedding generation using sentence-transformers or its ONNX export"""
+
+    def __init__(
+            self,
+            model_name: str = "all-MiniLM-L6-v2",
+            cache_dir: str = None,
+            query_cache: QueryEmbeddingCache = None,
+            normalize: bool = False,
+            chunk_cache: ChunkEmbeddingCache = None,
+            batch_size: int = 32,
+            num_workers: int = 1,
+            threads_per_worker: int = 0,
+            backend: str = "torch",
+            onnx_dir: str = None,
+            onnx_quantize: bool = False
+    ):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unsupported embedding backend: {backend}")
 
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", cache_dir: str = None):
         self.model_name = model_name
         self.cache_dir = cache_dir
+        self.query_cache = query_cache
+        self.chunk_cache = chunk_cache
+        # Unit-length embeddings make inner product equal to cosine similarity
+        self.normalize = normalize
+        self.batch_size = batch_size
+        # Worker processes for generate_embeddings; 1 encodes in this process
+        self.num_workers = num_workers
+        # Intra-op threads per worker; 0 splits the cores evenly between workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.backend = backend
+        # Exported models are kept under onnx_dir, one directory per model
+        self.onnx_dir = onnx_dir or os.path.join(cache_dir or ".", "onnx")
+        self.onnx_quantize = onnx_quantize
         self.logger = logging.getLogger(__name__)
         self.model = None
+        self._model_lock = threading.Lock()
+        self._pool = None
 
     def initialize_model(self):
-        """Initialize the sentence transformer model"""
-        if self.model is None:
-            self.logger.info(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(
-                self.model_name,
-                cache_folder=self.cache_dir
-            )
-            self.logger.info("Embedding model loaded successfully")
+        """Initialize the embedding model for the configured backend"""
+        # A background warm-up and the first query may both get here; load once
+        with self._model_lock:
+            if self.model is None:
+                self.logger.info(f"Loading embedding model: {self.model_name} ({self._backend_name()})")
+                self.model = _load_model(
+                    self.model_name, self.cache_dir, self.backend, self.onnx_dir, self.onnx_quantize
+                )
+                self.logger.info("Embedding model loaded successfully")
 
-    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for a list of texts"""
-        if self.model is None:
-            self.initialize_model()
+    def warm_up(self):
+        """Load the model and run one forward pass so the first real query pays neither cost"""
+        self._encode(["warm-up"])
+
+    def generate_embeddings(self, texts: List[str], show_progress_bar: bool = True) -> np.ndarray:
+        """Generate embeddings for a list of texts, sending only chunk cache misses to the model"""
+        if self.chunk_cache is None or not texts:
+            return self._generate(texts, show_progress_bar)
 
+        keys = [ChunkEmbeddingCache.make_key(text, self._cache_namespace()) for text in texts]
+        embeddings, found = self.chunk_cache.get_many(keys)
+
+        # Identical chunk texts in one batch are embedded once
+        misses = {}
+        for i in np.flatnonzero(~found):
+            misses.setdefault(keys[i], []).append(i)
+
+        if misses:
+            encoded = self._generate([texts[rows[0]] for rows in misses.values()], show_progress_bar)
+            self.chunk_cache.put_many(list(misses), encoded)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), encoded.shape[1]), dtype='float32')
+            for rows, embedding in zip(misses.values(), encoded):
+                embeddings[rows] = embedding
+
+        self.logger.info(f"Chunk embedding cache: {int(found.sum())}/{len(texts)} hits")
+        return embeddings
+
+    def _generate(self, texts: List[str], show_progress_bar: bool) -> np.ndarray:
+        """Embed texts with the model in batches, longest first, in this process or across the worker pool"""
         self.logger.info(f"Generating embeddings for {len(texts)} texts...")
 
-        # Generate embeddings in batches to manage memory
-        embeddings = self.model.encode(
-            texts,
-            batch_size=32,
-            show_progress_bar=True,
-            convert_to_numpy=True
-        )
+        # Texts of similar length share batches, so little compute is spent on padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        sorted_texts = [texts[i] for i in order]
+
+        if self.num_workers > 1 and len(texts) > self.batch_size:
+            sorted_embeddings = self._generate_parallel(sorted_texts)
+        else:
+            if self.model is None:
+                self.initialize_model()
+            sorted_embeddings = self.model.encode(
+                sorted_texts,
+                batch_size=self.batch_size,
+                show_progress_bar=show_progress_bar,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize
+            )
+
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
 
         self.logger.info(f"Generated embeddings shape: {embeddings.shape}")
         return embeddings
 
+    def _generate_parallel(self, sorted_texts: List[str]) -> np.ndarray:
+        """Shard length-sorted texts across the worker pool, two shards per worker for balance"""
+        if self._pool is None:
+            if self.backend == "onnx":
+                # Export once here rather than racing to export in every worker
+                from src.onnx_embeddings import ensure_onnx_model
+                ensure_onnx_model(self.model_name, self.onnx_dir, self.cache_dir, self.onnx_quantize)
+
+            self.logger.info(
+                f"Starting {self.num_workers} embedding workers with {self.threads_per_worker} threads each"
+            )
+            # Spawned rather than forked: forking a process that has started torch threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_embedding_worker,
+                initargs=(
+                    self.model_name, self.cache_dir, self.backend, self.onnx_dir, self.onnx_quantize,
+                    self.threads_per_worker
+                )
+            )
+
+        shard_batches = -(-len(sorted_texts) // (self.num_workers * 2 * self.batch_size))
+        shard_size = max(shard_batches, 1) * self.batch_size
+        futures = [
+            self._pool.submit(_encode_task, sorted_texts[start:start + shard_size], self.batch_size, self.normalize)
+            for start in range(0, len(sorted_texts), shard_size)
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def close(self):
+        """Shut down the embedding worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def get_embedding_dimension(self) -> int:
         """Get the dimension of the embedding vectors"""
         if self.model is None:
@@ -49,7 +197,50 @@ class EmbeddingGenerator:
         return self.model.get_sentence_embedding_dimension()
 
     def encode_single(self, text: str) -> np.ndarray:
-        """Encode a single text string"""
+        """Encode a single text string, consulting the query cache first"""
+        if self.query_cache is not None:
+            key = QueryEmbeddingCache.make_key(text, self._cache_namespace())
+            embedding = self.query_cache.get(key)
+            if embedding is None:
+                embedding = self._encode([text])[0]
+                self.query_cache.put(key, embedding)
+            return embedding
+
+        return self._encode([text])[0]
+
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Encode query strings, sending only query cache misses to the model in one batch"""
+        if self.query_cache is None:
+            return self._encode(texts)
+
+        keys = [QueryEmbeddingCache.make_key(text, self._cache_namespace()) for text in texts]
+        cached = [self.query_cache.get(key) for key in keys]
+        misses = [i for i, embedding in enumerate(cached) if embedding is None]
+
+        if misses:
+            encoded = self._encode([texts[i] for i in misses])
+            for i, embedding in zip(misses, encoded):
+                self.query_cache.put(keys[i], embedding)
+                cached[i] = embedding
+
+        return np.stack(cached)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run the model on a list of texts without progress output"""
         if self.model is None:
             self.initialize_model()
-        return self.model.encode([text])[0]
\ No newline at end of file
+        return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=self.normalize)
+
+    def _backend_name(self) -> str:
+        if self.backend == "onnx" and self.onnx_quantize:
+            return "onnx-int8"
+        return self.backend
+
+    def _cache_namespace(self) -> str:
+        """Cache key prefix; embeddings from other backends or normalization settings are different entries"""
+        namespace = self.model_name
+        if self.backend != "torch":
+            namespace += f"|{self._backend_name()}"
+        if self.normalize:
+            namespace += "|normalized"
+        return namespace
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+
+
+class IndexManifest:
+    """Tracks which files were indexed and which chunk ids each file produced"""
+
+    def __init__(self, manifest_path: str = None):
+        self.manifest_path = manifest_path
+        self.logger = logging.getLogger(__name__)
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def compute_hash(file_path: Path, block_size: int = 1 << 20) -> str:
+        """Compute the SHA-256 of a file without reading it into memory at once"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def diff(self, file_paths: Iterable[Path]) -> Dict[str, List[Path]]:
+        """Compare files on disk against the manifest.
+
+        mtime and size are checked first so unchanged files are never hashed.
+        Files whose stat changed but whose content hash did not (e.g. touched or
+        copied) are reported as unchanged and their stat is refreshed.
+        """
+        added, changed, unchanged = [], [], []
+        seen = set()
+
+        for file_path in file_paths:
+            key = str(file_path)
+            seen.add(key)
+            entry = self.files.get(key)
+
+            if entry is None:
+                added.append(file_path)
+                continue
+
+            stat = file_path.stat()
+            if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                unchanged.append(file_path)
+                continue
+
+            if entry["content_hash"] == self.compute_hash(file_path):
+                entry["mtime"] = stat.st_mtime
+                entry["size"] = stat.st_size
+                unchanged.append(file_path)
+            else:
+                changed.append(file_path)
+
+        removed = [Path(key) for key in self.files if key not in seen]
+
+        return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
+
+    def update_file(self, file_path: Path, chunk_ids: List[int]):
+        """Record the current state of a file and the chunk ids it produced"""
+        stat = file_path.stat()
+        self.files[str(file_path)] = {
+            "path": str(file_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "content_hash": self.compute_hash(file_path),
+            "chunk_ids": list(chunk_ids)
+        }
+
+    def remove_file(self, file_path: Path) -> List[int]:
+        """Drop a file from the manifest and return the chunk ids it owned"""
+        entry = self.files.pop(str(file_path), None)
+        return entry["chunk_ids"] if entry else []
+
+    def get_chunk_ids(self, file_path: Path) -> List[int]:
+        """Get the chunk ids produced by a file"""
+        entry = self.files.get(str(file_path))
+        return entry["chunk_ids"] if entry else []
+
+    def exists(self, manifest_path: str = None) -> bool:
+        """Check whether a manifest has been written to disk"""
+        manifest_path = manifest_path or self.manifest_path
+        return bool(manifest_path) and os.path.exists(manifest_path)
+
+    def save(self, manifest_path: str = None):
+        """Save the manifest to disk"""
+        manifest_path = manifest_path or self.manifest_path
+
+        if not manifest_path:
+            raise ValueError("Manifest path must be provided")
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f, indent=2, ensure_ascii=False)
+
+        self.logger.info(f"Saved manifest with {len(self.files)} files to {manifest_path}")
+
+    def load(self, manifest_path: str = None):
+        """Load the manifest from disk"""
+        manifest_path = manifest_path or self.manifest_path
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.files = json.load(f)["files"]
+
+        self.logger.info(f"Loaded manifest with {len(self.files)} files")
@@ -0,0 +1,82 @@
+import logging
+from collections import defaultdict
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator
+from langchain.schema import Document
+from src.text_splitter import OptimizedTextSplitter
+from src.embeddings import EmbeddingGenerator
+from src.vector_store import FAISSVectorStore
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most batch_size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class StreamingIndexer:
+    """Streams documents through splitter, embedder and vector store in bounded batches"""
+
+    def __init__(
+            self,
+            splitter: OptimizedTextSplitter,
+            embedding_generator: EmbeddingGenerator,
+            vector_store: FAISSVectorStore,
+            batch_size: int = 512
+    ):
+        self.splitter = splitter
+        self.embedding_generator = embedding_generator
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+        self.stats = {"count": 0, "min_size": 0, "max_size": 0, "total_chars": 0}
+
+    def index_documents(self, documents: Iterable[Document]) -> Dict[str, List[int]]:
+        """Index a stream of documents and return the vector ids produced per source file.
+
+        Each stage pulls from the previous one, so at most one batch of chunks and
+        embeddings is held in memory regardless of corpus size.
+        """
+        ids_by_source = defaultdict(list)
+        chunks = self.splitter.iter_split_documents(documents)
+
+        for batch in batched(chunks, self.batch_size):
+            embeddings = self.embedding_generator.generate_embeddings(
+                [chunk.page_content for chunk in batch],
+                show_progress_bar=False
+            )
+            ids = self.vector_store.add_embeddings(embeddings, batch)
+
+            for chunk, chunk_id in zip(batch, ids):
+                ids_by_source[chunk.metadata["source"]].append(chunk_id)
+            self._update_stats(batch)
+
+            self.logger.info(f"Indexed {self.stats['count']} chunks so far")
+
+        # Train approximate indexes on whatever is still buffered and add it
+        self.vector_store.flush()
+
+        return ids_by_source
+
+    def _update_stats(self, batch: List[Document]):
+        """Accumulate chunk statistics without keeping the chunks around"""
+        sizes = [len(chunk.page_content) for chunk in batch]
+        if self.stats["count"] == 0:
+            self.stats["min_size"] = min(sizes)
+        else:
+            self.stats["min_size"] = min(self.stats["min_size"], min(sizes))
+        self.stats["count"] += len(sizes)
+        self.stats["max_size"] = max(self.stats["max_size"], max(sizes))
+        self.stats["total_chars"] += sum(sizes)
+
+    def get_chunk_stats(self) -> Dict[str, Any]:
+        """Get statistics about the chunks indexed so far"""
+        count = self.stats["count"]
+        return {
+            **self.stats,
+            "avg_size": self.stats["total_chars"] // count if count else 0
+        }
@@ -1,11 +1,73 @@
+import asyncio
+import hashlib
 import logging
-from typing import Iterator, Optional, Dict, Any
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator, Optional, Dict, Any, List, Tuple
 import time
-from groq import Groq
 from config.config import Config
 
 
-class GroqLLMClient:
+def build_messages(prompt: str, system_prompt: str = None) -> List[Dict[str, str]]:
+    """Build the chat messages for a prompt and optional system prompt"""
+    messages = []
+
+    # Add system prompt if provided
+    if system_prompt:
+        messages.append({
+            "role": "system",
+            "content": system_prompt
+        })
+
+    # Add user prompt
+    messages.append({
+        "role": "user",
+        "content": prompt
+    })
+
+    return messages
+
+
+class BaseLLMClient(ABC):
+    """Interface of synchronous LLM backends used by RAGPipeline"""
+
+    model: str
+
+    @abstractmethod
+    def generate_response(
+            self,
+            prompt: str,
+            system_prompt: str = None,
+            max_tokens: int = None,
+            temperature: float = None,
+            stream: bool = False
+    ):
+        """Return the answer, or an iterator of text chunks when stream=True"""
+
+    @abstractmethod
+    def check_connection(self) -> bool:
+        """Check that the backend is reachable"""
+
+
+class BaseAsyncLLMClient(ABC):
+    """Interface of asyncio LLM backends used by RAGPipeline.aanswer_query"""
+
+    model: str
+
+    @abstractmethod
+    async def agenerate_response(
+            self,
+            prompt: str,
+            system_prompt: str = None,
+            max_tokens: int = None,
+            temperature: float = None,
+            stream: bool = False
+    ):
+        """Return the answer, or an async iterator of text chunks when stream=True"""
+
+
+class GroqLLMClient(BaseLLMClient):
     """Groq LLM client for text generation with streaming support"""
 
     def __init__(self, api_key: str = None, model: str = None):
@@ -16,6 +78,8 @@ class GroqLLMClient:
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
 
+        # Imported on first use so the stub backend and CLI startup do not pay for it
+        from groq import Groq
         self.client = Groq(api_key=self.api_key)
         self.logger.info(f"Initialized Groq client with model: {self.model}")
 
@@ -29,20 +93,7 @@ class GroqLLMClient:
     ) -> str:
         """Generate a response from the LLM"""
         try:
-            messages = []
-
-            # Add system prompt if provided
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-
-            # Add user prompt
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            messages = build_messages(prompt, system_prompt)
 
             # Set parameters
             max_tokens = max_tokens or Config.MAX_TOKENS
@@ -97,3 +148,192 @@ class GroqLLMClient:
         except Exception as e:
             self.logger.error(f"Connection test failed: {str(e)}")
             return False
+
+
+class AsyncGroqLLMClient(BaseAsyncLLMClient):
+    """Asyncio-native Groq LLM client, so one event loop can keep many generations in flight"""
+
+    def __init__(self, api_key: str = None, model: str = None):
+        self.api_key = api_key or Config.GROQ_API_KEY
+        self.model = model or Config.GROQ_MODEL
+        self.logger = logging.getLogger(__name__)
+
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables")
+
+        from groq import AsyncGroq
+        self.client = AsyncGroq(api_key=self.api_key)
+        self.logger.info(f"Initialized async Groq client with model: {self.model}")
+
+    async def agenerate_response(
+            self,
+            prompt: str,
+            system_prompt: str = None,
+            max_tokens: int = None,
+            temperature: float = None,
+            stream: bool = False
+    ):
+        """Generate a response from the LLM; with stream=True an async iterator of chunks is returned"""
+        try:
+            messages = build_messages(prompt, system_prompt)
+
+            # Set parameters
+            max_tokens = max_tokens or Config.MAX_TOKENS
+            temperature = temperature or Config.TEMPERATURE
+
+            self.logger.info(f"Generating async response with {self.model}")
+
+            if stream:
+                return self._astream_response(messages, max_tokens, temperature)
+            else:
+                return await self._agenerate_complete_response(messages, max_tokens, temperature)
+
+        except Exception as e:
+            self.logger.error(f"Error generating response: {str(e)}")
+            raise
+
+    async def _agenerate_complete_response(self, messages, max_tokens, temperature) -> str:
+        """Generate complete response (non-streaming)"""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=False
+        )
+
+        return response.choices[0].message.content
+
+    async def _astream_response(self, messages, max_tokens, temperature) -> AsyncIterator[str]:
+        """Generate streaming response"""
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubLLMClient(BaseLLMClient, BaseAsyncLLMClient):
+    """Local, deterministic stand-in for a streaming LLM.
+
+    Simulates time-to-first-token, a steady token rate and random failures (from a
+    seeded generator, so runs are reproducible) without any network access. The
+    answer text depends only on the prompt.
+    """
+
+    def __init__(
+            self,
+            model: str = "stub",
+            ttft: float = 0.2,
+            tokens_per_second: float = 200,
+            failure_rate: float = 0.0,
+            answer_tokens: int = 100,
+            seed: int = 0
+    ):
+        self.model = model
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.answer_tokens = answer_tokens
+        self.logger = logging.getLogger(__name__)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "StubLLMClient":
+        """Create a stub configured from Config"""
+        return cls(
+            ttft=Config.STUB_LLM_TTFT,
+            tokens_per_second=Config.STUB_LLM_TOKENS_PER_SECOND,
+            failure_rate=Config.STUB_LLM_FAILURE_RATE,
+            answer_tokens=Config.STUB_LLM_ANSWER_TOKENS,
+            seed=Config.STUB_LLM_SEED
+        )
+
+    def _tokens(self, prompt: str, max_tokens: int = None) -> List[str]:
+        """Deterministic answer tokens derived from the prompt"""
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+        count = min(self.answer_tokens, max_tokens or Config.MAX_TOKENS)
+        return ["Stub"] + [f" {digest[i % len(digest)]}{i}" for i in range(1, count)]
+
+    def _should_fail(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.failure_rate
+
+    def token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def generate_response(
+            self,
+            prompt: str,
+            system_prompt: str = None,
+            max_tokens: int = None,
+            temperature: float = None,
+            stream: bool = False
+    ):
+        """Generate a response without network access"""
+        if self._should_fail():
+            raise RuntimeError("Stub LLM simulated failure")
+
+        tokens = self._tokens(prompt, max_tokens)
+        if stream:
+            return self._stream_tokens(tokens)
+
+        time.sleep(self.ttft + (len(tokens) - 1) * self.token_interval())
+        return "".join(tokens)
+
+    def _stream_tokens(self, tokens: List[str]) -> Iterator[str]:
+        time.sleep(self.ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_interval())
+            yield token
+
+    async def agenerate_response(
+            self,
+            prompt: str,
+            system_prompt: str = None,
+            max_tokens: int = None,
+            temperature: float = None,
+            stream: bool = False
+    ):
+        """Async version of generate_response"""
+        if self._should_fail():
+            raise RuntimeError("Stub LLM simulated failure")
+
+        tokens = self._tokens(prompt, max_tokens)
+        if stream:
+            return self._astream_tokens(tokens)
+
+        await asyncio.sleep(self.ttft + (len(tokens) - 1) * self.token_interval())
+        return "".join(tokens)
+
+    async def _astream_tokens(self, tokens: List[str]) -> AsyncIterator[str]:
+        await asyncio.sleep(self.ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_interval())
+            yield token
+
+    def check_connection(self) -> bool:
+        """The stub is always reachable"""
+        return True
+
+
+def create_llm_clients(backend: str = None) -> Tuple[BaseLLMClient, BaseAsyncLLMClient]:
+    """Create the (sync, async) client pair for the configured LLM backend"""
+    backend = backend or Config.LLM_BACKEND
+
+    if backend == "groq":
+        return GroqLLMClient(), AsyncGroqLLMClient()
+    if backend == "stub":
+        stub = StubLLMClient.from_config()
+        return stub, stub
+
+    raise ValueError(f"Unsupported LLM backend: {backend}")
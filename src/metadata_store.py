@@ -0,0 +1,217 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+
+class MetadataStore:
+    """Chunk text and metadata in a compact, memory-mapped binary file.
+
+    File layout (little endian)::
+
+        magic    8 bytes   b"RAGMETA1"
+        count    uint64
+        ids      int64[count]        sorted ascending
+        offsets  uint64[count + 1]   row boundaries inside the blob
+        blob     UTF-8 JSON rows     {"content": ..., "metadata": ...}
+
+    Opening a file only maps it; a row is decoded when its id is looked up, so
+    load time does not depend on corpus size and the pages are shared through
+    the OS page cache by every process that opens the same file. Rows added or
+    removed after opening are kept in an overlay until the next save: added rows
+    are spilled to a temporary file so they do not accumulate in memory.
+    """
+
+    MAGIC = b"RAGMETA1"
+    HEADER = struct.Struct("<8sQ")
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._mmap = None
+        self._ids = np.empty(0, dtype='<i8')
+        self._offsets = np.zeros(1, dtype='<u8')
+        self._blob_start = 0
+        self._deleted = set()
+        self._spill = None
+        self._spill_lock = threading.Lock()
+        self._added: Dict[int, Tuple[int, int]] = {}
+
+    # Reading
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch one row by id, or None if it does not exist"""
+        item_id = int(item_id)
+        if item_id in self._deleted:
+            return None
+
+        if item_id in self._added:
+            row = self._read_spill(*self._added[item_id])
+        else:
+            position = self._find(item_id)
+            if position is None:
+                return None
+            row = self._read_base(position)
+
+        item = json.loads(row)
+        item["id"] = item_id
+        return item
+
+    def get_many(self, item_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch several rows by id"""
+        return [self.get(item_id) for item_id in item_ids]
+
+    def __contains__(self, item_id: int) -> bool:
+        item_id = int(item_id)
+        if item_id in self._deleted:
+            return False
+        return item_id in self._added or self._find(item_id) is not None
+
+    def __len__(self) -> int:
+        deleted_from_base = sum(1 for item_id in self._deleted if self._find(item_id) is not None)
+        return len(self._ids) - deleted_from_base + len(self._added)
+
+    def ids(self) -> List[int]:
+        """All live ids in ascending order"""
+        base_ids = [int(item_id) for item_id in self._ids if int(item_id) not in self._deleted]
+        return sorted(base_ids + list(self._added))
+
+    def items(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over all live rows in id order"""
+        for item_id in self.ids():
+            yield self.get(item_id)
+
+    def max_id(self) -> int:
+        """Largest id ever stored, or -1 when empty"""
+        candidates = list(self._added)
+        if len(self._ids):
+            candidates.append(int(self._ids[-1]))
+        return max(candidates, default=-1)
+
+    # Writing
+
+    def add(self, item_id: int, content: str, metadata: Dict[str, Any]):
+        """Add a row; it is persisted on the next save"""
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+
+        row = self._encode(content, metadata)
+        with self._spill_lock:
+            self._spill.seek(0, os.SEEK_END)
+            self._added[int(item_id)] = (self._spill.tell(), len(row))
+            self._spill.write(row)
+        self._deleted.discard(int(item_id))
+
+    def remove(self, item_ids: List[int]):
+        """Remove rows by id"""
+        for item_id in item_ids:
+            item_id = int(item_id)
+            if self._added.pop(item_id, None) is None:
+                self._deleted.add(item_id)
+
+    def save(self, path: str):
+        """Write all live rows to path and reopen it memory-mapped"""
+        ids = self.ids()
+        lengths = np.empty(len(ids), dtype='<u8')
+        for i, item_id in enumerate(ids):
+            if item_id in self._added:
+                lengths[i] = self._added[item_id][1]
+            else:
+                position = self._find(item_id)
+                lengths[i] = self._offsets[position + 1] - self._offsets[position]
+
+        offsets = np.zeros(len(ids) + 1, dtype='<u8')
+        np.cumsum(lengths, out=offsets[1:])
+
+        # Write next to the target and swap in atomically; the old file may still be mapped
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(ids)))
+            f.write(np.asarray(ids, dtype='<i8').tobytes())
+            f.write(offsets.tobytes())
+            for item_id in ids:
+                if item_id in self._added:
+                    f.write(self._read_spill(*self._added[item_id]))
+                else:
+                    f.write(self._read_base(self._find(item_id)))
+
+        self.close()
+        os.replace(tmp_path, path)
+        self.open(path)
+
+        self.logger.info(f"Saved {len(ids)} metadata entries to {path}")
+
+    # Opening and closing
+
+    def open(self, path: str):
+        """Map a metadata file, converting legacy JSON metadata on the fly"""
+        self.close()
+
+        with open(path, 'rb') as f:
+            is_binary = f.read(len(self.MAGIC)) == self.MAGIC
+
+        if not is_binary:
+            self._load_legacy_json(path)
+            return
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, count = self.HEADER.unpack_from(self._mmap, 0)
+        ids_start = self.HEADER.size
+        offsets_start = ids_start + 8 * count
+        self._ids = np.frombuffer(self._mmap, dtype='<i8', count=count, offset=ids_start)
+        self._offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=offsets_start)
+        self._blob_start = offsets_start + 8 * (count + 1)
+
+    def close(self):
+        """Release the mapping and discard any unsaved overlay"""
+        # Drop numpy views before closing the mmap they point into
+        self._ids = np.empty(0, dtype='<i8')
+        self._offsets = np.zeros(1, dtype='<u8')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._added = {}
+        self._deleted = set()
+
+    # Internals
+
+    @staticmethod
+    def _encode(content: str, metadata: Dict[str, Any]) -> bytes:
+        return json.dumps({"content": content, "metadata": metadata}, ensure_ascii=False).encode('utf-8')
+
+    def _find(self, item_id: int) -> Optional[int]:
+        position = int(np.searchsorted(self._ids, item_id))
+        if position < len(self._ids) and self._ids[position] == item_id:
+            return position
+        return None
+
+    def _read_base(self, position: int) -> bytes:
+        start = self._blob_start + int(self._offsets[position])
+        end = self._blob_start + int(self._offsets[position + 1])
+        return self._mmap[start:end]
+
+    def _read_spill(self, offset: int, length: int) -> bytes:
+        with self._spill_lock:
+            self._spill.seek(offset)
+            return self._spill.read(length)
+
+    def _load_legacy_json(self, path: str):
+        """Read a faiss_metadata.json list into the overlay"""
+        self.logger.info(f"Converting legacy JSON metadata from {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            for item in json.load(f):
+                self.add(item["id"], item["content"], item["metadata"])
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List
+
+import numpy as np
+
+# Pipeline stages timed per query, in seconds
+STAGES = ("embed", "search", "lexical", "filter", "rerank", "prepare_context", "ttft", "generation", "total")
+
+# Metrics that are rates rather than durations
+RATE_METRICS = ("tokens_per_second",)
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str):
+    """Add the wall-clock seconds spent in the block to timings[stage]"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start_time
+
+
+class MetricsHook(ABC):
+    """Receives one observation per metric per query"""
+
+    @abstractmethod
+    def observe(self, metric: str, value: float):
+        """Record a value: seconds for a stage in STAGES, otherwise the metric's own unit"""
+
+
+class InProcessCollector(MetricsHook):
+    """Keeps the most recent observations of each metric for percentile summaries"""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, value: float):
+        with self._lock:
+            self._samples[metric].append(value)
+            self._counts[metric] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 and mean over the window, plus the all-time count, per metric"""
+        with self._lock:
+            samples = {metric: np.array(values) for metric, values in self._samples.items() if values}
+            counts = dict(self._counts)
+
+        stats = {}
+        for metric, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stats[metric] = {
+                "count": counts[metric],
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99)
+            }
+        return stats
+
+    def reset(self):
+        """Drop all observations"""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+class PrometheusHistogramExporter(MetricsHook):
+    """Cumulative histograms rendered in the Prometheus text exposition format.
+
+    Stage durations share one histogram labelled by stage; rate metrics get
+    their own histogram each.
+    """
+
+    DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 200, 400, 800, 1600)
+
+    def __init__(self, namespace: str = "rag", duration_buckets: Iterable[float] = None,
+                 rate_buckets: Iterable[float] = None):
+        self.namespace = namespace
+        self.duration_buckets = tuple(duration_buckets or self.DURATION_BUCKETS)
+        self.rate_buckets = tuple(rate_buckets or self.RATE_BUCKETS)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, value: float):
+        buckets = self.rate_buckets if metric in RATE_METRICS else self.duration_buckets
+        with self._lock:
+            histogram = self._histograms.get(metric)
+            if histogram is None:
+                histogram = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+                self._histograms[metric] = histogram
+
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def render(self) -> str:
+        """Render all histograms as Prometheus exposition text"""
+        with self._lock:
+            histograms = {
+                metric: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                for metric, h in self._histograms.items()
+            }
+
+        lines = []
+        stages = {metric: h for metric, h in histograms.items() if metric not in RATE_METRICS}
+        if stages:
+            name = f"{self.namespace}_stage_duration_seconds"
+            lines.append(f"# HELP {name} Time spent in each RAG pipeline stage.")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in sorted(stages.items()):
+                lines.extend(self._render_histogram(name, histogram, self.duration_buckets, f'stage="{stage}",'))
+
+        for metric in RATE_METRICS:
+            if metric in histograms:
+                name = f"{self.namespace}_{metric}"
+                lines.append(f"# HELP {name} Generation throughput per streamed answer.")
+                lines.append(f"# TYPE {name} histogram")
+                lines.extend(self._render_histogram(name, histograms[metric], self.rate_buckets, ""))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(name: str, histogram: Dict[str, Any], buckets: tuple, labels: str) -> List[str]:
+        lines = [
+            f'{name}_bucket{{{labels}le="{bound}"}} {count}'
+            for bound, count in zip(buckets, histogram["buckets"])
+        ]
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {histogram["count"]}')
+        label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+        lines.append(f"{name}_sum{label_set} {histogram['sum']}")
+        lines.append(f"{name}_count{label_set} {histogram['count']}")
+        return lines
+
+
+def emit_metrics(hooks: List[MetricsHook], timings: Dict[str, float], query_stats: Dict[str, Any]):
+    """Send one query's stage timings and token rate to every hook; a failing hook is logged, not raised"""
+    observations = dict(timings)
+    if query_stats.get("tokens_per_second") is not None:
+        observations["tokens_per_second"] = query_stats["tokens_per_second"]
+
+    for hook in hooks:
+        for metric, value in observations.items():
+            try:
+                hook.observe(metric, value)
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Metrics hook {type(hook).__name__} failed: {e}")
+                break
@@ -0,0 +1,154 @@
+import os
+import json
+import logging
+import numpy as np
+from typing import List
+
+# Files written next to each other in an exported model directory
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "export_config.json"
+
+
+def export_onnx_model(model_name: str, output_dir: str, cache_dir: str = None):
+    """Export a sentence-transformers model, pooling and normalization included, to ONNX.
+
+    Only the export needs torch and sentence-transformers; running the exported
+    model needs onnxruntime and tokenizers alone.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"Exporting embedding model {model_name} to ONNX in {output_dir}")
+
+    model = SentenceTransformer(model_name, cache_folder=cache_dir, device="cpu")
+    model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+    model.tokenizer.save_pretrained(output_dir)
+    if not os.path.exists(os.path.join(output_dir, TOKENIZER_FILE)):
+        raise ValueError(f"{model_name} has no fast tokenizer and cannot run under ONNX Runtime")
+
+    sample = model.tokenize(["ONNX export sample"])
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class SentenceEmbedding(torch.nn.Module):
+        """Positional-argument wrapper so torch.onnx can trace the feature-dict forward"""
+
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(dict(zip(input_names, inputs)))["sentence_embedding"]
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["sentence_embedding"] = {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(
+            SentenceEmbedding(),
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    # Written last: a directory without it holds an interrupted export
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w') as f:
+        json.dump({
+            "model_name": model_name,
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "pad_token": model.tokenizer.pad_token,
+            "pad_token_id": model.tokenizer.pad_token_id
+        }, f, indent=2)
+
+    logger.info("ONNX export complete")
+
+
+def quantize_onnx_model(model_dir: str):
+    """Write a dynamically int8-quantized copy of an exported model"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    logging.getLogger(__name__).info(f"Quantizing ONNX embedding model in {model_dir} to int8")
+    quantize_dynamic(
+        os.path.join(model_dir, MODEL_FILE),
+        os.path.join(model_dir, QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8
+    )
+
+
+class OnnxSentenceEncoder:
+    """Runs an exported sentence embedding model under ONNX Runtime.
+
+    Exposes the subset of the SentenceTransformer interface EmbeddingGenerator
+    uses, so either can sit behind it.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(
+            self,
+            texts: List[str],
+            batch_size: int = 32,
+            show_progress_bar: bool = False,
+            convert_to_numpy: bool = True,
+            normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        """Embed texts batch by batch; returns a float32 (len(texts), dimension) array"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            features = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype='int64'),
+                "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype='int64'),
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype='int64')
+            }
+            batches.append(self.session.run(None, {name: features[name] for name in self.input_names})[0])
+
+        embeddings = (
+            np.concatenate(batches).astype('float32') if batches
+            else np.empty((0, self.get_sentence_embedding_dimension()), dtype='float32')
+        )
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        return embeddings
+
+
+def ensure_onnx_model(model_name: str, onnx_dir: str, cache_dir: str = None, quantize: bool = False) -> str:
+    """Return the directory holding the ONNX export of model_name, exporting (and quantizing) it first if needed"""
+    model_dir = os.path.join(onnx_dir, model_name.replace("/", "__"))
+    if not os.path.exists(os.path.join(model_dir, CONFIG_FILE)):
+        export_onnx_model(model_name, model_dir, cache_dir)
+    if quantize and not os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE)):
+        quantize_onnx_model(model_dir)
+    return model_dir
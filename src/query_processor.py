@@ -1,86 +1,315 @@
 import logging
+import re
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from src.embeddings import EmbeddingGenerator
 from src.vector_store import FAISSVectorStore
+from src.metrics import timed
+from src.token_budget import TokenCounter, get_token_counter, model_context_window, PROMPT_TOKEN_MARGIN
 from config.config import Config
 
+MIN_OVERLAP_CHARS = 20  # Shortest shared run treated as chunk overlap rather than coincidence
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*(?=\s)|\n\s*\n')
+_WORD_END = re.compile(r'\S(?=\s)')
+
 
 class QueryProcessor:
     """Handles query processing and context retrieval"""
 
-    def __init__(self, vector_store: FAISSVectorStore, embedding_generator: EmbeddingGenerator):
+    def __init__(
+            self,
+            vector_store: FAISSVectorStore,
+            embedding_generator: EmbeddingGenerator,
+            token_counter: TokenCounter = None
+    ):
         self.vector_store = vector_store
         self.embedding_generator = embedding_generator
+        self._token_counter = token_counter
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def token_counter(self) -> TokenCounter:
+        """Tokenizer for context budgeting, loaded on first use and shared across the process"""
+        if self._token_counter is None:
+            self._token_counter = get_token_counter(Config.CONTEXT_TOKENIZER)
+        return self._token_counter
+
     def process_query(
             self,
             query: str,
             top_k: int = None,
-            similarity_threshold: float = None
+            similarity_threshold: float = None,
+            query_embedding: np.ndarray = None,
+            timings: Dict[str, float] = None,
+            hybrid: bool = None,
+            metadata_filter: Dict[str, Any] = None
     ) -> List[Dict[str, Any]]:
-        """Process a query and return relevant context"""
+        """Process a query and return relevant context; a precomputed query_embedding skips encoding.
+
+        With hybrid (HYBRID_SEARCH) and a BM25 index, dense and BM25 candidates are
+        merged by reciprocal-rank fusion. metadata_filter (e.g. {"file_type": "pdf"})
+        restricts both searches to matching chunks. Seconds spent embedding,
+        searching and filtering are added to timings when given.
+        """
+        timings = timings if timings is not None else {}
         top_k = top_k or Config.TOP_K_RETRIEVAL
         similarity_threshold = similarity_threshold or Config.SIMILARITY_THRESHOLD
+        hybrid = self._use_hybrid(hybrid)
+        candidates = top_k * Config.HYBRID_CANDIDATE_FACTOR if hybrid else top_k
 
         self.logger.info(f"Processing query: {query[:100]}...")
 
         # Generate query embedding
-        query_embedding = self.embedding_generator.encode_single(query)
+        if query_embedding is None:
+            with timed(timings, "embed"):
+                query_embedding = self.embedding_generator.encode_single(query)
 
         # Perform similarity search
-        results = self.vector_store.similarity_search(query_embedding, k=top_k)
+        with timed(timings, "search"):
+            results = self.vector_store.similarity_search(
+                query_embedding, k=candidates, similarity_threshold=similarity_threshold,
+                metadata_filter=metadata_filter
+            )
+
+        # The search already applied the threshold; this guards stores that do not
+        with timed(timings, "filter"):
+            filtered_results = self._filter_results(results, similarity_threshold)
+
+        # Keyword matches (part numbers, error codes, names) join the dense candidates
+        if hybrid:
+            with timed(timings, "lexical"):
+                lexical_results = self.vector_store.lexical_search_batch(
+                    [query], np.atleast_2d(query_embedding), k=candidates, metadata_filter=metadata_filter
+                )[0]
+                filtered_results = self._fuse(filtered_results, lexical_results, top_k)
+
+        self.logger.info(f"Found {len(filtered_results)} relevant chunks above threshold {similarity_threshold}")
+
+        return filtered_results
+
+    def process_queries(
+            self,
+            queries: List[str],
+            top_k: int = None,
+            similarity_threshold: float = None,
+            query_embeddings: np.ndarray = None,
+            timings: Dict[str, float] = None,
+            hybrid: bool = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Process many queries with one batched embedding pass and one matrix search, all under metadata_filter"""
+        timings = timings if timings is not None else {}
+        top_k = top_k or Config.TOP_K_RETRIEVAL
+        similarity_threshold = similarity_threshold or Config.SIMILARITY_THRESHOLD
+        hybrid = self._use_hybrid(hybrid)
+        candidates = top_k * Config.HYBRID_CANDIDATE_FACTOR if hybrid else top_k
+
+        if not queries:
+            return []
+
+        self.logger.info(f"Processing {len(queries)} queries in one batch")
+
+        # Generate all query embeddings in a single forward pass
+        if query_embeddings is None:
+            with timed(timings, "embed"):
+                query_embeddings = self.embedding_generator.encode_queries(queries)
+
+        # Perform one similarity search for the whole batch
+        with timed(timings, "search"):
+            batch_results = self.vector_store.similarity_search_batch(
+                query_embeddings, k=candidates, similarity_threshold=similarity_threshold,
+                metadata_filter=metadata_filter
+            )
+
+        with timed(timings, "filter"):
+            batch_results = [self._filter_results(results, similarity_threshold) for results in batch_results]
+
+        if hybrid:
+            with timed(timings, "lexical"):
+                lexical_batch = self.vector_store.lexical_search_batch(
+                    queries, query_embeddings, k=candidates, metadata_filter=metadata_filter
+                )
+                batch_results = [
+                    self._fuse(results, lexical_results, top_k)
+                    for results, lexical_results in zip(batch_results, lexical_batch)
+                ]
+
+        return batch_results
 
-        # Filter by similarity threshold
-        filtered_results = [
+    def _use_hybrid(self, hybrid: bool = None) -> bool:
+        """Whether to fuse in BM25 results: requested (HYBRID_SEARCH by default) and a BM25 index is loaded"""
+        hybrid = Config.HYBRID_SEARCH if hybrid is None else hybrid
+        return hybrid and self.vector_store.has_lexical_index()
+
+    def _fuse(
+            self,
+            dense_results: List[Dict[str, Any]],
+            lexical_results: List[Dict[str, Any]],
+            top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion: each ranking adds 1 / (RRF_K + rank) to a chunk's score"""
+        fused = {}
+        for retrieval, results in (("dense", dense_results), ("lexical", lexical_results)):
+            for rank, result in enumerate(results, start=1):
+                entry = fused.get(result['id'])
+                if entry is None:
+                    entry = fused[result['id']] = {**result, "retrieval": retrieval, "rrf_score": 0.0}
+                else:
+                    entry["retrieval"] = "hybrid"
+                    entry["bm25_score"] = result.get("bm25_score")
+                entry["rrf_score"] += 1 / (Config.RRF_K + rank)
+
+        return sorted(fused.values(), key=lambda result: result["rrf_score"], reverse=True)[:top_k]
+
+    def _filter_results(self, results: List[Dict[str, Any]], similarity_threshold: float) -> List[Dict[str, Any]]:
+        """Drop results below the similarity threshold"""
+        return [
             result for result in results
             if result['similarity_score'] >= similarity_threshold
         ]
 
-        self.logger.info(f"Found {len(filtered_results)} relevant chunks above threshold {similarity_threshold}")
+    def context_token_budget(self, prompt_overhead: str = "") -> int:
+        """Tokens left for context in the model window after the answer (MAX_TOKENS) and prompt_overhead.
 
-        return filtered_results
+        The budget is in CONTEXT_TOKENIZER tokens. The window is scaled down by
+        CONTEXT_TOKEN_SAFETY, so the prompt still fits when the model's own
+        tokenizer splits the same text into more tokens.
+        """
+        context_window = Config.LLM_CONTEXT_WINDOW or model_context_window(Config.GROQ_MODEL)
+        overhead_tokens = self.token_counter.count(prompt_overhead) if prompt_overhead else 0
+        prompt_window = (context_window - Config.MAX_TOKENS - PROMPT_TOKEN_MARGIN) / max(Config.CONTEXT_TOKEN_SAFETY, 1.0)
+        budget = int(prompt_window) - overhead_tokens
+        if Config.MAX_CONTEXT_TOKENS:
+            budget = min(budget, Config.MAX_CONTEXT_TOKENS)
+        return max(budget, 0)
 
     def prepare_context(
             self,
             retrieved_chunks: List[Dict[str, Any]],
-            max_context_length: int = None
+            max_context_tokens: int = None,
+            prompt_overhead: str = ""
     ) -> str:
-        """Prepare context string from retrieved chunks"""
-        max_context_length = max_context_length or Config.MAX_CONTEXT_LENGTH
+        """Pack retrieved chunks, in rank order, into a context string that fits a token budget.
+
+        The budget defaults to context_token_budget(prompt_overhead), where prompt_overhead is the rest
+        of the prompt (system prompt, template and question). Text a chunk shares with an already packed
+        chunk of the same source (the CHUNK_OVERLAP region) is dropped, and the chunk that overflows the
+        budget is cut at a sentence boundary. When the first chunk has no sentence boundary that fits, it is
+        cut between words (or, failing that, characters) so the prompt always carries some context.
+        """
+        if max_context_tokens is None:
+            max_context_tokens = self.context_token_budget(prompt_overhead)
 
         if not retrieved_chunks:
             return "No relevant context found."
 
         context_parts = []
-        total_length = 0
+        packed_by_source = {}
+        total_tokens = 0
+        overlap_chars = 0
 
         for i, chunk in enumerate(retrieved_chunks):
             content = chunk['content'].strip()
             source = chunk['metadata'].get('file_name', 'Unknown')
 
-            chunk_text = f"[Source {i + 1}: {source}]\n{content}\n"
+            # Drop text already in the context from neighbouring chunks of the same document
+            packed = packed_by_source.setdefault(chunk['metadata'].get('source', source), [])
+            deduped = self._remove_overlap(content, packed)
+            overlap_chars += len(content) - len(deduped)
+            if not deduped:
+                continue
+
+            header = f"[Source {i + 1}: {source}]\n"
+            header_tokens, content_tokens = self.token_counter.count_batch([header, deduped + "\n"])
+            separator_tokens = 1 if context_parts else 0
+            remaining = max_context_tokens - total_tokens - separator_tokens - header_tokens
 
-            # Check if adding this chunk would exceed max length
-            if total_length + len(chunk_text) > max_context_length:
-                # Try to fit a truncated version
-                remaining_space = max_context_length - total_length - 50  # Leave space for truncation notice
-                if remaining_space > 100:  # Only if we have meaningful space
-                    truncated = content[:remaining_space] + "..."
-                    chunk_text = f"[Source {i + 1}: {source}]\n{truncated}\n"
-                    context_parts.append(chunk_text)
+            if content_tokens > remaining:
+                # Keep the whole sentences that fit, then stop: later chunks rank lower
+                truncated = self._truncate_to_sentences(deduped, remaining)
+                if not truncated and not context_parts:
+                    truncated = self._truncate_to_words(deduped, remaining)
+                if truncated:
+                    context_parts.append(f"{header}{truncated}\n")
+                    total_tokens += separator_tokens + header_tokens + self.token_counter.count(truncated + "\n")
                 break
 
-            context_parts.append(chunk_text)
-            total_length += len(chunk_text)
+            context_parts.append(f"{header}{deduped}\n")
+            packed.append(content)
+            total_tokens += separator_tokens + header_tokens + content_tokens
+
+        if not context_parts:
+            self.logger.warning(f"No retrieved text fits the {max_context_tokens}-token context budget")
+            return "No relevant context found."
 
         context = "\n".join(context_parts)
 
-        self.logger.info(f"Prepared context with {len(context_parts)} chunks ({len(context)} characters)")
+        self.logger.info(
+            f"Prepared context with {len(context_parts)} chunks ({total_tokens}/{max_context_tokens} tokens, "
+            f"{overlap_chars} overlapping characters removed)"
+        )
 
         return context
 
+    @staticmethod
+    def _remove_overlap(content: str, packed: List[str]) -> str:
+        """Strip the part of content that repeats the start or end of an already packed chunk"""
+        for other in packed:
+            if content in other:
+                return ""
+
+            # The splitter repeats the tail of the previous chunk at the head of the next one
+            head = content[:MIN_OVERLAP_CHARS]
+            if len(head) == MIN_OVERLAP_CHARS:
+                start = other.find(head)
+                while start != -1:
+                    if content.startswith(other[start:]):
+                        content = content[len(other) - start:].lstrip()
+                        break
+                    start = other.find(head, start + 1)
+
+            # ... or the next chunk was packed first and this one ends where it starts
+            tail = other[:MIN_OVERLAP_CHARS]
+            if len(tail) == MIN_OVERLAP_CHARS:
+                start = content.find(tail)
+                while start != -1:
+                    if other.startswith(content[start:]):
+                        content = content[:start].rstrip()
+                        break
+                    start = content.find(tail, start + 1)
+
+        return content
+
+    def _truncate_to_sentences(self, content: str, max_tokens: int) -> str:
+        """Longest prefix of content that ends on a sentence boundary and fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+
+        return self._longest_prefix(content, [match.end() for match in _SENTENCE_END.finditer(content)], max_tokens)
+
+    def _truncate_to_words(self, content: str, max_tokens: int) -> str:
+        """Longest prefix of content that ends on a word (or, with no word fitting, any character) and fits"""
+        if max_tokens <= 0:
+            return ""
+
+        best = self._longest_prefix(content, [match.end() for match in _WORD_END.finditer(content)], max_tokens)
+        return best or self._longest_prefix(content, range(1, len(content) + 1), max_tokens)
+
+    def _longest_prefix(self, content: str, boundaries: Sequence[int], max_tokens: int) -> str:
+        """Longest content[:boundary] that fits in max_tokens, for ascending boundaries"""
+        # Token counts grow with the prefix, so binary search for the last boundary that fits
+        low, high, best = 0, len(boundaries) - 1, ""
+        while low <= high:
+            middle = (low + high) // 2
+            prefix = content[:boundaries[middle]].rstrip()
+            if self.token_counter.count(prefix + "\n") <= max_tokens:
+                best = prefix
+                low = middle + 1
+            else:
+                high = middle - 1
+
+        return best
+
     def get_query_stats(self, query: str, retrieved_chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get statistics about query processing"""
         return {
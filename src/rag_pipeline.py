@@ -1,10 +1,24 @@
+import asyncio
+import atexit
+import hashlib
 import logging
-from typing import Dict, Any, Optional, Iterator, List
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, List, Tuple
 import time
+import numpy as np
 from src.embeddings import EmbeddingGenerator
+from src.embedding_cache import QueryEmbeddingCache
+from src.answer_cache import SemanticAnswerCache
+from src.batching import RetrievalBatcher
 from src.vector_store import FAISSVectorStore
+from src.sharded_vector_store import ShardedVectorStore
 from src.query_processor import QueryProcessor
-from src.llm_client import GroqLLMClient
+from src.collection_manager import CollectionManager, collection_paths
+from src.reranker import CrossEncoderReranker
+from src.llm_client import BaseLLMClient, BaseAsyncLLMClient, create_llm_clients
+from src.metrics import MetricsHook, InProcessCollector, emit_metrics, timed
 from config.config import Config
 
 
@@ -14,129 +28,632 @@ class RAGPipeline:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.embedding_generator = None
-        self.vector_store = None
-        self.query_processor = None
+        self.collections = None
+        self.reranker = None
         self.llm_client = None
+        self._async_llm_client = None
+        self.answer_cache = None
+        self.executor = None
+        self.retrieval_batcher = None
+        self.metrics = InProcessCollector(window=Config.METRICS_WINDOW)
+        self.metrics_hooks: List[MetricsHook] = [self.metrics]
+
+    @property
+    def vector_store(self):
+        """Vector store of the default collection"""
+        return self.collections.get(Config.DEFAULT_COLLECTION).vector_store if self.collections else None
+
+    @property
+    def query_processor(self) -> Optional[QueryProcessor]:
+        """Query processor of the default collection"""
+        return self.collections.get(Config.DEFAULT_COLLECTION).query_processor if self.collections else None
+
+    @property
+    def async_llm_client(self) -> BaseAsyncLLMClient:
+        """Client for the async path, created for LLM_BACKEND on first use when initialize was not given one"""
+        if self._async_llm_client is None:
+            self._async_llm_client = create_llm_clients(Config.LLM_BACKEND)[1]
+        return self._async_llm_client
+
+    def add_metrics_hook(self, hook: MetricsHook):
+        """Also send per-query stage timings to hook (e.g. a PrometheusHistogramExporter)"""
+        self.metrics_hooks.append(hook)
+
+    def initialize(
+            self,
+            llm_client: BaseLLMClient = None,
+            async_llm_client: BaseAsyncLLMClient = None,
+            warmup: str = None,
+            check_connection: bool = None
+    ):
+        """Initialize all components; pass LLM clients to override the configured LLM_BACKEND.
+
+        warmup (EMBEDDING_WARMUP) loads the embedding model now ("eager"), in a
+        background thread ("background") or on the first query ("lazy").
+        check_connection (LLM_CONNECTION_CHECK) controls the LLM startup probe.
+        """
+        warmup = warmup or Config.EMBEDDING_WARMUP
+        check_connection = Config.LLM_CONNECTION_CHECK if check_connection is None else check_connection
+        if warmup not in ("eager", "background", "lazy"):
+            raise ValueError(f"Unsupported warm-up mode: {warmup}")
 
-    def initialize(self):
-        """Initialize all components"""
         self.logger.info("Initializing RAG pipeline...")
 
+        # Initialize query embedding cache
+        query_cache = None
+        if Config.QUERY_CACHE_SIZE > 0:
+            query_cache = QueryEmbeddingCache(
+                max_entries=Config.QUERY_CACHE_SIZE,
+                persist_path=Config.QUERY_CACHE_PATH if Config.QUERY_CACHE_PERSIST else None,
+                dtype=Config.QUERY_CACHE_DTYPE
+            )
+            if Config.QUERY_CACHE_PERSIST:
+                atexit.register(query_cache.save)
+
         # Initialize embedding generator
         self.embedding_generator = EmbeddingGenerator(
             model_name=Config.EMBEDDING_MODEL,
-            cache_dir=Config.MODELS_DIR
+            cache_dir=Config.MODELS_DIR,
+            query_cache=query_cache,
+            normalize=Config.FAISS_METRIC == "cosine",
+            backend=Config.EMBEDDING_BACKEND,
+            onnx_dir=Config.ONNX_MODELS_DIR,
+            onnx_quantize=Config.ONNX_QUANTIZE
         )
-        self.embedding_generator.initialize_model()
-
-        # Initialize vector store
-        dimension = self.embedding_generator.get_embedding_dimension()
-        self.vector_store = FAISSVectorStore(
-            dimension=dimension,
-            index_path=Config.FAISS_INDEX_PATH,
-            metadata_path=Config.METADATA_PATH
+        # Optional cross-encoder between retrieval and context assembly
+        if Config.RERANK_ENABLED:
+            self.reranker = CrossEncoderReranker(
+                model_name=Config.RERANK_MODEL,
+                batch_size=Config.RERANK_BATCH_SIZE,
+                max_length=Config.RERANK_MAX_LENGTH,
+                time_budget_ms=Config.RERANK_BUDGET_MS
+            )
+
+        if warmup == "eager":
+            self.embedding_generator.warm_up()
+            if self.reranker is not None:
+                self.reranker.warm_up()
+        elif warmup == "background":
+            # The model loads while the index is mapped and the LLM client is set up
+            threading.Thread(target=self._warm_up, name="embedding-warm-up", daemon=True).start()
+
+        # Collections share the embedding generator and load on first use; the default one is
+        # loaded now so a missing index fails at startup, and is never unloaded
+        self.collections = CollectionManager(
+            load_store=self._load_collection,
+            create_query_processor=lambda vector_store: QueryProcessor(
+                vector_store=vector_store,
+                embedding_generator=self.embedding_generator
+            ),
+            max_memory_mb=Config.COLLECTION_MEMORY_MB,
+            pinned=[Config.DEFAULT_COLLECTION]
         )
 
-        # Load existing index
+        # Load existing index; its dimension comes from the file, so this does not wait for the model
         try:
-            self.vector_store.load_index()
+            self.collections.get(Config.DEFAULT_COLLECTION)
             self.logger.info("Loaded existing vector index")
         except Exception as e:
             self.logger.error(f"Failed to load vector index: {e}")
             raise
 
-        # Initialize query processor
-        self.query_processor = QueryProcessor(
-            vector_store=self.vector_store,
-            embedding_generator=self.embedding_generator
-        )
+        # Initialize answer cache
+        if Config.ANSWER_CACHE_SIZE > 0:
+            self.answer_cache = SemanticAnswerCache(
+                max_entries=Config.ANSWER_CACHE_SIZE,
+                ttl_seconds=Config.ANSWER_CACHE_TTL,
+                similarity_threshold=Config.ANSWER_CACHE_SIMILARITY
+            )
+
+        # Initialize LLM clients for the configured backend
+        if llm_client is None:
+            llm_client, default_async_client = create_llm_clients(Config.LLM_BACKEND)
+            async_llm_client = async_llm_client or default_async_client
+
+            # Test LLM connection
+            if check_connection and not llm_client.check_connection():
+                raise Exception(f"Failed to connect to LLM backend: {Config.LLM_BACKEND}")
+        elif async_llm_client is None and isinstance(llm_client, BaseAsyncLLMClient):
+            # A client implementing both interfaces (e.g. StubLLMClient) answers both paths
+            async_llm_client = llm_client
+        self.llm_client = llm_client
+
+        # Async path: LLM calls stay on the event loop, embedding and FAISS run in a thread pool
+        self._async_llm_client = async_llm_client
+        self.executor = ThreadPoolExecutor(max_workers=Config.RETRIEVAL_WORKERS)
 
-        # Initialize LLM client
-        self.llm_client = GroqLLMClient()
+        self.logger.info("RAG pipeline initialized successfully")
 
-        # Test LLM connection
-        if not self.llm_client.check_connection():
-            raise Exception("Failed to connect to Groq API")
+    def _warm_up(self):
+        """Background thread target; a failure here resurfaces on the first query"""
+        try:
+            self.embedding_generator.warm_up()
+            if self.reranker is not None:
+                self.reranker.warm_up()
+        except Exception as e:
+            self.logger.warning(f"Model warm-up failed: {e}")
+
+    @staticmethod
+    def _load_store(index_path: str, metadata_path: str, first_id: int = 0) -> FAISSVectorStore:
+        """Open a saved index (or one shard of it) with the query-time search settings"""
+        return FAISSVectorStore.from_index(
+            index_path,
+            metadata_path,
+            nprobe=Config.IVF_NPROBE,
+            ef_search=Config.HNSW_EF_SEARCH,
+            rerank_factor=Config.RERANK_FACTOR,
+            lexical=Config.HYBRID_SEARCH,
+            bm25_k1=Config.BM25_K1,
+            bm25_b=Config.BM25_B,
+            first_id=first_id,
+            filter_fields=Config.FILTER_FIELDS
+        )
 
-        self.logger.info("RAG pipeline initialized successfully")
+    def _load_collection(self, name: str):
+        """Open a collection's index (its shards when NUM_SHARDS > 1)"""
+        paths = collection_paths(name)
+        if Config.NUM_SHARDS > 1:
+            vector_store = ShardedVectorStore.load(
+                paths.shards_dir,
+                self._load_store,
+                search_workers=Config.SHARD_SEARCH_WORKERS
+            )
+        elif os.path.exists(paths.index_path):
+            vector_store = self._load_store(paths.index_path, paths.metadata_path)
+        else:
+            raise FileNotFoundError(f"Collection '{name}' has no index at {paths.index_path}")
+
+        if name == Config.DEFAULT_COLLECTION:
+            self._match_index_metric(vector_store)
+        elif (vector_store.metric == "cosine") != self.embedding_generator.normalize:
+            # Query embeddings are shared, so every collection must expect the same normalization
+            vector_store.close()
+            raise ValueError(
+                f"Collection '{name}' uses the {vector_store.metric} metric, which does not match the default collection"
+            )
+        return vector_store
+
+    def _match_index_metric(self, vector_store):
+        """Embed queries the way the default index was built, whatever FAISS_METRIC says"""
+        normalize = vector_store.metric == "cosine"
+        if normalize != self.embedding_generator.normalize:
+            self.logger.warning(
+                f"Index uses the {vector_store.metric} metric but FAISS_METRIC is {Config.FAISS_METRIC}; "
+                f"following the index"
+            )
+            self.embedding_generator.normalize = normalize
 
     def answer_query(
             self,
             query: str,
             stream: bool = False,
-            include_sources: bool = True
+            include_sources: bool = True,
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
     ) -> Dict[str, Any]:
-        """Answer a query using the complete RAG pipeline"""
+        """Answer a query using the complete RAG pipeline over collection (DEFAULT_COLLECTION when None).
+
+        metadata_filter limits retrieval to chunks whose FILTER_FIELDS metadata
+        matches, e.g. {"file_name": ["a.pdf", "b.pdf"]} or {"tags": "hr", "file_type": "pdf"}.
+        """
         start_time = time.time()
+        collection = collection or Config.DEFAULT_COLLECTION
 
         try:
             # Step 1: Process query and retrieve context
-            retrieved_chunks = self.query_processor.process_query(query)
+            query_embedding, retrieved_chunks, timings = self._retrieve(query, collection, metadata_filter)
 
             if not retrieved_chunks:
+                return self._no_context_result(timings, start_time)
+
+            if stream and Config.ENABLE_STREAMING:
+                # Generation stats are filled into query_stats once the stream completes
+                query_stats = {**self.query_processor.get_query_stats(query, retrieved_chunks), "timings": timings}
                 return {
-                    "answer": "I couldn't find relevant information to answer your question.",
-                    "sources": [],
-                    "query_stats": {"processing_time": time.time() - start_time}
+                    "answer_stream": self._stream_answer(
+                        query, retrieved_chunks, query_embedding, timings, query_stats, start_time, collection
+                    ),
+                    "sources": self._format_sources(retrieved_chunks) if include_sources else [],
+                    "query_stats": query_stats
                 }
+            else:
+                return self._generate_answer(
+                    query, retrieved_chunks, query_embedding, include_sources, start_time, timings, collection
+                )
+
+        except Exception as e:
+            return self._error_result(e, start_time)
+
+    async def aanswer_query(
+            self,
+            query: str,
+            stream: bool = False,
+            include_sources: bool = True,
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Async version of answer_query; with stream=True, answer_stream is an async iterator"""
+        start_time = time.time()
+        collection = collection or Config.DEFAULT_COLLECTION
 
-            # Step 2: Prepare context
-            context = self.query_processor.prepare_context(retrieved_chunks)
+        try:
+            # Step 1: Process query and retrieve context off the event loop
+            if self.retrieval_batcher is not None:
+                query_embedding, retrieved_chunks, timings = await self.retrieval_batcher.retrieve(
+                    query, collection, metadata_filter
+                )
+            else:
+                loop = asyncio.get_running_loop()
+                query_embedding, retrieved_chunks, timings = await loop.run_in_executor(
+                    self.executor, self._retrieve, query, collection, metadata_filter
+                )
 
-            # Step 3: Create prompt
-            prompt = self._create_rag_prompt(query, context)
-            system_prompt = self._get_system_prompt()
+            if not retrieved_chunks:
+                return self._no_context_result(timings, start_time)
 
-            # Step 4: Generate response
             if stream and Config.ENABLE_STREAMING:
-                # Return iterator for streaming
-                def stream_with_metadata():
-                    response_chunks = []
-                    for chunk in self.llm_client.generate_response(
-                            prompt=prompt,
-                            system_prompt=system_prompt,
-                            stream=True
-                    ):
-                        response_chunks.append(chunk)
-                        yield chunk
-
-                    # After streaming is complete, you might want to log the full response
-                    full_response = ''.join(response_chunks)
-                    self.logger.info(f"Completed streaming response ({len(full_response)} chars)")
-
+                # Generation stats are filled into query_stats once the stream completes
+                query_stats = {**self.query_processor.get_query_stats(query, retrieved_chunks), "timings": timings}
                 return {
-                    "answer_stream": stream_with_metadata(),
+                    "answer_stream": self._astream_answer(
+                        query, retrieved_chunks, query_embedding, timings, query_stats, start_time, collection
+                    ),
                     "sources": self._format_sources(retrieved_chunks) if include_sources else [],
-                    "query_stats": self.query_processor.get_query_stats(query, retrieved_chunks)
+                    "query_stats": query_stats
                 }
             else:
+                answer = self._get_cached_answer(query_embedding, retrieved_chunks, collection)
+                cache_hit = answer is not None
+
+                if not cache_hit:
+                    # Steps 2-4: Prepare context, create prompt and generate response
+                    with timed(timings, "prepare_context"):
+                        context = self._prepare_context(query, retrieved_chunks)
+                    with timed(timings, "generation"):
+                        answer = await self.async_llm_client.agenerate_response(
+                            prompt=self._create_rag_prompt(query, context),
+                            system_prompt=self._get_system_prompt(),
+                            stream=False
+                        )
+                    self._cache_answer(query_embedding, retrieved_chunks, answer, collection)
+
+                return self._build_result(
+                    query, retrieved_chunks, answer, include_sources, start_time, cache_hit, timings
+                )
+
+        except Exception as e:
+            return self._error_result(e, start_time)
+
+    def answer_queries(
+            self,
+            queries: List[str],
+            include_sources: bool = True,
+            max_concurrency: int = None,
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """Answer many queries over one collection, and metadata_filter when given, returning results in input order.
+
+        Retrieval runs as one batched embedding pass and one matrix search; the
+        LLM calls then run concurrently, at most max_concurrency at a time.
+        processing_time of each result is measured from the start of the batch, and
+        the embed/search/filter timings of each result are those of the whole batch.
+        """
+        max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        collection = collection or Config.DEFAULT_COLLECTION
+        start_time = time.time()
+
+        try:
+            # Step 1: Process all queries and retrieve context in one batch
+            retrieved = self._retrieve_batch(queries, collection, metadata_filter)
+        except Exception as e:
+            return [self._error_result(e, start_time) for _ in queries]
+
+        def answer_one(query: str, retrieval: Tuple[np.ndarray, List[Dict[str, Any]], Dict[str, float]]):
+            query_embedding, retrieved_chunks, timings = retrieval
+            try:
+                if not retrieved_chunks:
+                    return self._no_context_result(timings, start_time)
+
+                return self._generate_answer(
+                    query, retrieved_chunks, query_embedding, include_sources, start_time, timings, collection
+                )
+            except Exception as e:
+                return self._error_result(e, start_time)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            results = list(executor.map(answer_one, queries, retrieved))
+
+        self.logger.info(f"Answered {len(queries)} queries in {time.time() - start_time:.2f}s")
+        return results
+
+    def _generate_answer(
+            self,
+            query: str,
+            retrieved_chunks: List[Dict[str, Any]],
+            query_embedding: np.ndarray,
+            include_sources: bool,
+            start_time: float,
+            timings: Dict[str, float],
+            collection: str
+    ) -> Dict[str, Any]:
+        """Generate a complete (non-streaming) answer and package it with sources and stats"""
+        answer = self._get_cached_answer(query_embedding, retrieved_chunks, collection)
+        cache_hit = answer is not None
+
+        if not cache_hit:
+            # Steps 2-4: Prepare context, create prompt and generate response
+            with timed(timings, "prepare_context"):
+                context = self._prepare_context(query, retrieved_chunks)
+            with timed(timings, "generation"):
                 answer = self.llm_client.generate_response(
-                    prompt=prompt,
-                    system_prompt=system_prompt,
+                    prompt=self._create_rag_prompt(query, context),
+                    system_prompt=self._get_system_prompt(),
                     stream=False
                 )
+            self._cache_answer(query_embedding, retrieved_chunks, answer, collection)
 
-                processing_time = time.time() - start_time
+        return self._build_result(query, retrieved_chunks, answer, include_sources, start_time, cache_hit, timings)
 
-                result = {
-                    "answer": answer,
-                    "sources": self._format_sources(retrieved_chunks) if include_sources else [],
-                    "query_stats": {
-                        **self.query_processor.get_query_stats(query, retrieved_chunks),
-                        "processing_time": processing_time
-                    }
-                }
+    def _build_result(
+            self,
+            query: str,
+            retrieved_chunks: List[Dict[str, Any]],
+            answer: str,
+            include_sources: bool,
+            start_time: float,
+            cache_hit: bool,
+            timings: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Package an answer with its sources and stats"""
+        query_stats = {**self.query_processor.get_query_stats(query, retrieved_chunks), "cache_hit": cache_hit}
+        self._finish_query_stats(query_stats, timings, start_time)
+
+        result = {
+            "answer": answer,
+            "sources": self._format_sources(retrieved_chunks) if include_sources else [],
+            "query_stats": query_stats
+        }
 
-                self.logger.info(f"Query answered in {processing_time:.2f}s")
-                return result
+        self.logger.info(f"Query answered in {query_stats['processing_time']:.2f}s")
+        return result
 
-        except Exception as e:
-            self.logger.error(f"Error in RAG pipeline: {str(e)}")
-            return {
-                "answer": f"I encountered an error while processing your question: {str(e)}",
-                "sources": [],
-                "query_stats": {"processing_time": time.time() - start_time, "error": str(e)}
-            }
+    def _no_context_result(self, timings: Dict[str, float], start_time: float) -> Dict[str, Any]:
+        """Build the result returned when no chunk passes the similarity threshold"""
+        return {
+            "answer": "I couldn't find relevant information to answer your question.",
+            "sources": [],
+            "query_stats": self._finish_query_stats({}, timings, start_time)
+        }
+
+    def _finish_query_stats(
+            self,
+            query_stats: Dict[str, Any],
+            timings: Dict[str, float],
+            start_time: float,
+            tokens: int = None
+    ) -> Dict[str, Any]:
+        """Add total time, stage timings and token rate to query_stats and emit them to the metrics hooks"""
+        processing_time = time.time() - start_time
+        timings["total"] = processing_time
+        query_stats["processing_time"] = processing_time
+        query_stats["timings"] = timings
+
+        if tokens is not None:
+            # Streamed chunks stand in for tokens; the rate excludes time-to-first-token
+            decode_time = timings.get("generation", 0.0) - timings.get("ttft", 0.0)
+            query_stats["tokens_generated"] = tokens
+            query_stats["tokens_per_second"] = (tokens - 1) / decode_time if tokens > 1 and decode_time > 0 else None
+
+        emit_metrics(self.metrics_hooks, timings, query_stats)
+        return query_stats
+
+    def _stream_answer(
+            self,
+            query: str,
+            retrieved_chunks: List[Dict[str, Any]],
+            query_embedding: np.ndarray,
+            timings: Dict[str, float],
+            query_stats: Dict[str, Any],
+            start_time: float,
+            collection: str
+    ) -> Iterator[str]:
+        """Stream an answer, replaying a cached one when available; query_stats is completed at the end"""
+        cached_answer = self._get_cached_answer(query_embedding, retrieved_chunks, collection)
+        if cached_answer is not None:
+            query_stats["cache_hit"] = True
+            yield cached_answer
+            self._finish_query_stats(query_stats, timings, start_time)
+            return
+
+        # Steps 2-4: Prepare context, create prompt and stream the response
+        with timed(timings, "prepare_context"):
+            context = self._prepare_context(query, retrieved_chunks)
+        response_chunks = []
+        llm_start = time.perf_counter()
+        for chunk in self.llm_client.generate_response(
+                prompt=self._create_rag_prompt(query, context),
+                system_prompt=self._get_system_prompt(),
+                stream=True
+        ):
+            if not response_chunks:
+                timings["ttft"] = time.perf_counter() - llm_start
+            response_chunks.append(chunk)
+            yield chunk
+        timings["generation"] = time.perf_counter() - llm_start
+
+        # Only cache answers that were streamed to completion
+        full_response = ''.join(response_chunks)
+        self._cache_answer(query_embedding, retrieved_chunks, full_response, collection)
+        query_stats["cache_hit"] = False
+        self._finish_query_stats(query_stats, timings, start_time, tokens=len(response_chunks))
+        self.logger.info(f"Completed streaming response ({len(full_response)} chars)")
+
+    async def _astream_answer(
+            self,
+            query: str,
+            retrieved_chunks: List[Dict[str, Any]],
+            query_embedding: np.ndarray,
+            timings: Dict[str, float],
+            query_stats: Dict[str, Any],
+            start_time: float,
+            collection: str
+    ) -> AsyncIterator[str]:
+        """Async version of _stream_answer"""
+        cached_answer = self._get_cached_answer(query_embedding, retrieved_chunks, collection)
+        if cached_answer is not None:
+            query_stats["cache_hit"] = True
+            yield cached_answer
+            self._finish_query_stats(query_stats, timings, start_time)
+            return
+
+        # Steps 2-4: Prepare context, create prompt and stream the response
+        with timed(timings, "prepare_context"):
+            context = self._prepare_context(query, retrieved_chunks)
+        response_chunks = []
+        llm_start = time.perf_counter()
+        stream = await self.async_llm_client.agenerate_response(
+            prompt=self._create_rag_prompt(query, context),
+            system_prompt=self._get_system_prompt(),
+            stream=True
+        )
+        async for chunk in stream:
+            if not response_chunks:
+                timings["ttft"] = time.perf_counter() - llm_start
+            response_chunks.append(chunk)
+            yield chunk
+        timings["generation"] = time.perf_counter() - llm_start
+
+        # Only cache answers that were streamed to completion
+        full_response = ''.join(response_chunks)
+        self._cache_answer(query_embedding, retrieved_chunks, full_response, collection)
+        query_stats["cache_hit"] = False
+        self._finish_query_stats(query_stats, timings, start_time, tokens=len(response_chunks))
+        self.logger.info(f"Completed streaming response ({len(full_response)} chars)")
+
+    def _retrieve(
+            self,
+            query: str,
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> Tuple[np.ndarray, List[Dict[str, Any]], Dict[str, float]]:
+        """Embed a query and retrieve its chunks (CPU-bound; runs in the executor on the async path)"""
+        timings = {}
+        with timed(timings, "embed"):
+            query_embedding = self.embedding_generator.encode_single(query)
+        with self.collections.acquire(collection or Config.DEFAULT_COLLECTION) as selected:
+            retrieved_chunks = selected.query_processor.process_query(
+                query, top_k=self._retrieval_k(), query_embedding=query_embedding, timings=timings,
+                metadata_filter=metadata_filter
+            )
+        return query_embedding, self._rerank(query, retrieved_chunks, timings), timings
+
+    def _retrieve_batch(
+            self,
+            queries: List[str],
+            collection: str = None,
+            metadata_filter: Dict[str, Any] = None
+    ) -> List[Tuple[np.ndarray, List[Dict[str, Any]], Dict[str, float]]]:
+        """Embed and retrieve many queries with one model pass and one matrix search"""
+        timings = {}
+        with timed(timings, "embed"):
+            query_embeddings = self.embedding_generator.encode_queries(queries)
+        with self.collections.acquire(collection or Config.DEFAULT_COLLECTION) as selected:
+            batch_chunks = selected.query_processor.process_queries(
+                queries, top_k=self._retrieval_k(), query_embeddings=query_embeddings, timings=timings,
+                metadata_filter=metadata_filter
+            )
+
+        results = []
+        for query, query_embedding, retrieved_chunks in zip(queries, query_embeddings, batch_chunks):
+            query_timings = dict(timings)
+            results.append((query_embedding, self._rerank(query, retrieved_chunks, query_timings), query_timings))
+        return results
+
+    def _retrieval_k(self) -> int:
+        """Chunks to retrieve: the final TOP_K_RETRIEVAL, or the wider RERANK_CANDIDATES pool when reranking"""
+        if self.reranker is None:
+            return Config.TOP_K_RETRIEVAL
+        return max(Config.RERANK_CANDIDATES, Config.TOP_K_RETRIEVAL)
+
+    def _rerank(
+            self,
+            query: str,
+            retrieved_chunks: List[Dict[str, Any]],
+            timings: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        """Cut the candidate pool to TOP_K_RETRIEVAL by cross-encoder score when reranking is enabled"""
+        if self.reranker is None:
+            return retrieved_chunks
+        with timed(timings, "rerank"):
+            return self.reranker.rerank(query, retrieved_chunks, Config.TOP_K_RETRIEVAL)
+
+    def enable_batching(self, max_batch_size: int = None, max_wait_ms: float = None):
+        """Micro-batch concurrent aanswer_query retrievals into shared embedding/FAISS calls"""
+        self.retrieval_batcher = RetrievalBatcher(
+            retrieve_batch=self._retrieve_batch,
+            executor=self.executor,
+            max_batch_size=max_batch_size or Config.BATCH_MAX_SIZE,
+            max_wait_ms=max_wait_ms if max_wait_ms is not None else Config.BATCH_MAX_WAIT_MS
+        )
+
+    def _answer_cache_bucket(self, retrieved_chunks: List[Dict[str, Any]], collection: str) -> tuple:
+        """Exact-match part of the answer cache key: collection, chunk ids and everything that shapes the prompt"""
+        prompt_template = self._get_system_prompt() + self._create_rag_prompt("{query}", "{context}")
+        params = (
+            collection,
+            self.llm_client.model,
+            Config.MAX_TOKENS,
+            Config.TEMPERATURE,
+            Config.LLM_CONTEXT_WINDOW,
+            Config.MAX_CONTEXT_TOKENS,
+            Config.CONTEXT_TOKENIZER,
+            hashlib.sha1(prompt_template.encode('utf-8')).hexdigest()
+        )
+        return SemanticAnswerCache.make_bucket([chunk['id'] for chunk in retrieved_chunks], params)
+
+    def _get_cached_answer(
+            self,
+            query_embedding: np.ndarray,
+            retrieved_chunks: List[Dict[str, Any]],
+            collection: str
+    ) -> Optional[str]:
+        """Look up a cached answer, or None when caching is disabled or nothing matches"""
+        index_version = self.collections.index_version(collection)
+        if self.answer_cache is None or index_version is None:
+            return None
+        return self.answer_cache.get(
+            query_embedding, self._answer_cache_bucket(retrieved_chunks, collection), index_version, namespace=collection
+        )
+
+    def _cache_answer(
+            self,
+            query_embedding: np.ndarray,
+            retrieved_chunks: List[Dict[str, Any]],
+            answer: str,
+            collection: str
+    ):
+        """Remember a generated answer (unless the collection has been unloaded meanwhile)"""
+        index_version = self.collections.index_version(collection)
+        if self.answer_cache is not None and index_version is not None:
+            self.answer_cache.put(
+                query_embedding, self._answer_cache_bucket(retrieved_chunks, collection), index_version, answer,
+                namespace=collection
+            )
+
+    def _error_result(self, error: Exception, start_time: float) -> Dict[str, Any]:
+        """Build the result returned when answering a query fails"""
+        self.logger.error(f"Error in RAG pipeline: {str(error)}")
+        return {
+            "answer": f"I encountered an error while processing your question: {str(error)}",
+            "sources": [],
+            "query_stats": {"processing_time": time.time() - start_time, "error": str(error)}
+        }
+
+    def _prepare_context(self, query: str, retrieved_chunks: List[Dict[str, Any]]) -> str:
+        """Pack chunks into the tokens the model window leaves after the answer, system prompt and question"""
+        prompt_overhead = self._get_system_prompt() + self._create_rag_prompt(query, "")
+        return self.query_processor.prepare_context(retrieved_chunks, prompt_overhead=prompt_overhead)
 
     def _create_rag_prompt(self, query: str, context: str) -> str:
         """Create the prompt for the LLM with context"""
@@ -187,10 +704,19 @@ Guidelines:
 
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """Get statistics about the pipeline"""
+        query_cache = self.embedding_generator.query_cache if self.embedding_generator else None
+
         return {
-            "vector_store_stats": self.vector_store.get_stats() if self.vector_store else {},
+            "vector_store_stats": self.vector_store.get_stats() if self.collections else {},
+            "collections": self.collections.get_stats() if self.collections else {},
+            "query_embedding_cache": query_cache.get_stats() if query_cache else {},
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else {},
+            "retrieval_batching": self.retrieval_batcher.get_stats() if self.retrieval_batcher else {},
+            "reranker": self.reranker.get_stats() if self.reranker else {},
+            "latency": self.metrics.get_stats(),
             "embedding_model": Config.EMBEDDING_MODEL,
-            "llm_model": Config.GROQ_MODEL,
+            "llm_backend": Config.LLM_BACKEND,
+            "llm_model": self.llm_client.model if self.llm_client else Config.GROQ_MODEL,
             "top_k_retrieval": Config.TOP_K_RETRIEVAL,
             "similarity_threshold": Config.SIMILARITY_THRESHOLD
         }
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from typing import List, Dict, Any
+
+
+class CrossEncoderReranker:
+    """Re-orders retrieved chunks with a CPU cross-encoder under a per-request time budget.
+
+    The cross-encoder reads query and chunk together, so it ranks far better than
+    embedding distance but costs a forward pass per candidate. Candidates are
+    scored in rank order, batch by batch, and scoring stops when the budget would
+    be exceeded. The number of candidates attempted is sized from a running
+    estimate of the per-candidate cost, so a slow host scores fewer candidates
+    instead of blowing its latency target.
+    """
+
+    # Weight of the newest batch in the running per-candidate cost estimate
+    COST_SMOOTHING = 0.2
+
+    def __init__(
+            self,
+            model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+            batch_size: int = 16,
+            max_length: int = 512,
+            time_budget_ms: float = 150,
+            num_threads: int = 0
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.time_budget_ms = time_budget_ms
+        # Intra-op threads for the model; 0 keeps the library default
+        self.num_threads = num_threads
+        self.logger = logging.getLogger(__name__)
+        self.model = None
+        self._model_lock = threading.Lock()
+        self._cost_lock = threading.Lock()
+        # Seconds per scored candidate, learned from completed batches
+        self._seconds_per_candidate = None
+        self._reranked = 0
+        self._truncated = 0
+
+    def initialize_model(self):
+        """Load the cross-encoder (once, even if called from several threads)"""
+        with self._model_lock:
+            if self.model is None:
+                self.logger.info(f"Loading cross-encoder: {self.model_name}")
+                # Imported here so pipelines without reranking never import sentence-transformers for it
+                from sentence_transformers import CrossEncoder
+                if self.num_threads:
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                self.logger.info("Cross-encoder loaded successfully")
+
+    def warm_up(self):
+        """Load the model and run one forward pass; too short to count towards the cost estimate"""
+        self.initialize_model()
+        self.model.predict([("warm-up", "warm-up")], show_progress_bar=False)
+
+    def rerank(
+            self,
+            query: str,
+            candidates: List[Dict[str, Any]],
+            top_k: int,
+            time_budget_ms: float = None
+    ) -> List[Dict[str, Any]]:
+        """Return the top_k candidates by cross-encoder score, each with a rerank_score.
+
+        Candidates the budget leaves unscored keep their retrieval order after the
+        scored ones and get rerank_score None.
+        """
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+
+        self.initialize_model()
+        budget = (self.time_budget_ms if time_budget_ms is None else time_budget_ms) / 1000
+        deadline = time.perf_counter() + budget
+        limit = self._candidate_limit(len(candidates), top_k, budget)
+
+        texts = [candidate['content'] for candidate in candidates[:limit]]
+        scores = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            # Always score the first batch; stop before a batch that would overrun the deadline
+            if scores and time.perf_counter() + self._estimated_seconds(len(batch)) > deadline:
+                break
+            scores.extend(self._score_batch(query, batch))
+
+        scored = [{**candidate, "rerank_score": float(score)} for candidate, score in zip(candidates, scores)]
+        scored.sort(key=lambda candidate: candidate["rerank_score"], reverse=True)
+        unscored = [{**candidate, "rerank_score": None} for candidate in candidates[len(scores):]]
+
+        with self._cost_lock:
+            self._reranked += 1
+            self._truncated += len(scores) < len(candidates)
+
+        return (scored + unscored)[:top_k]
+
+    def _candidate_limit(self, count: int, top_k: int, budget: float) -> int:
+        """How many candidates the budget allows at the current per-candidate cost (at least top_k)"""
+        with self._cost_lock:
+            seconds_per_candidate = self._seconds_per_candidate
+        if not seconds_per_candidate:
+            return count
+        return min(count, max(top_k, int(budget / seconds_per_candidate)))
+
+    def _estimated_seconds(self, count: int) -> float:
+        with self._cost_lock:
+            return (self._seconds_per_candidate or 0.0) * count
+
+    def _score_batch(self, query: str, texts: List[str]) -> List[float]:
+        """Score (query, text) pairs in one forward pass and update the cost estimate"""
+        start_time = time.perf_counter()
+        scores = self.model.predict(
+            [(query, text) for text in texts], batch_size=len(texts), show_progress_bar=False
+        )
+        seconds_per_candidate = (time.perf_counter() - start_time) / len(texts)
+
+        with self._cost_lock:
+            if self._seconds_per_candidate is None:
+                self._seconds_per_candidate = seconds_per_candidate
+            else:
+                self._seconds_per_candidate += self.COST_SMOOTHING * (
+                    seconds_per_candidate - self._seconds_per_candidate
+                )
+
+        return [float(score) for score in scores]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Reranking counters and the current cost estimate"""
+        with self._cost_lock:
+            return {
+                "model": self.model_name,
+                "time_budget_ms": self.time_budget_ms,
+                "ms_per_candidate": round(self._seconds_per_candidate * 1000, 3) if self._seconds_per_candidate else None,
+                "requests": self._reranked,
+                "budget_truncated": self._truncated
+            }
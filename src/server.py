@@ -0,0 +1,140 @@
+import json
+import asyncio
+import logging
+from functools import partial
+from typing import Any
+from aiohttp import web
+from src.collection_manager import collection_paths
+from src.metrics import PrometheusHistogramExporter
+from src.rag_pipeline import RAGPipeline
+
+
+def _to_json(value: Any):
+    """Serialize numpy scalars found in query stats"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+json_dumps = partial(json.dumps, default=_to_json, ensure_ascii=False)
+
+
+class RAGServer:
+    """HTTP front end for a shared RAGPipeline with JSON and Server-Sent Events endpoints"""
+
+    def __init__(self, pipeline: RAGPipeline, max_concurrency: int = 256):
+        self.pipeline = pipeline
+        self.max_concurrency = max_concurrency
+        self.logger = logging.getLogger(__name__)
+        self._semaphore = None
+        self.exporter = PrometheusHistogramExporter()
+        self.pipeline.add_metrics_hook(self.exporter)
+
+    def create_app(self) -> web.Application:
+        """Build the aiohttp application"""
+        app = web.Application()
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_post("/query", self.query)
+        app.router.add_post("/query/stream", self.query_stream)
+        app.on_startup.append(self._on_startup)
+        return app
+
+    async def _on_startup(self, app: web.Application):
+        # Created here so it binds to the server's event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.pipeline.get_pipeline_stats(), dumps=json_dumps)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Stage latency histograms in the Prometheus text format"""
+        return web.Response(text=self.exporter.render(), content_type="text/plain", charset="utf-8")
+
+    async def _read_query(self, request: web.Request):
+        """Parse and validate a query request body"""
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Request body must be a JSON object")
+
+        query = str(body.get("query", "")).strip()
+        if not query:
+            raise web.HTTPBadRequest(text="'query' is required")
+
+        collection = body.get("collection")
+        if collection is not None:
+            if not isinstance(collection, str):
+                raise web.HTTPBadRequest(text="'collection' must be a string")
+            try:
+                collection_paths(collection)
+            except ValueError as e:
+                raise web.HTTPBadRequest(text=str(e))
+
+        metadata_filter = body.get("filter")
+        if metadata_filter is not None and not isinstance(metadata_filter, dict):
+            raise web.HTTPBadRequest(text="'filter' must be an object mapping metadata fields to values")
+        for field, values in (metadata_filter or {}).items():
+            # JSON null, objects and nested lists cannot match an indexed metadata value
+            values = values if isinstance(values, list) else [values]
+            if not all(isinstance(value, (str, int, float)) for value in values):
+                raise web.HTTPBadRequest(text=f"'filter.{field}' must be a string, number, boolean or a list of them")
+
+        return query, bool(body.get("include_sources", True)), collection, metadata_filter
+
+    async def query(self, request: web.Request) -> web.Response:
+        """Answer a query and return the complete result as JSON"""
+        query, include_sources, collection, metadata_filter = await self._read_query(request)
+
+        async with self._semaphore:
+            result = await self.pipeline.aanswer_query(
+                query, stream=False, include_sources=include_sources, collection=collection,
+                metadata_filter=metadata_filter
+            )
+
+        return web.json_response(result, dumps=json_dumps)
+
+    async def query_stream(self, request: web.Request) -> web.StreamResponse:
+        """Answer a query as Server-Sent Events: sources, then tokens, then done with the final stats"""
+        query, include_sources, collection, metadata_filter = await self._read_query(request)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache"
+        })
+        await response.prepare(request)
+
+        async with self._semaphore:
+            result = await self.pipeline.aanswer_query(
+                query, stream=True, include_sources=include_sources, collection=collection,
+                metadata_filter=metadata_filter
+            )
+
+            await self._send_event(response, "sources", {
+                "sources": result.get("sources", []),
+                "query_stats": result.get("query_stats", {})
+            })
+
+            if "answer_stream" in result:
+                try:
+                    async for chunk in result["answer_stream"]:
+                        await self._send_event(response, "token", {"text": chunk})
+                except Exception as e:
+                    self.logger.error(f"Error while streaming answer: {str(e)}")
+                    await self._send_event(response, "error", {"error": str(e)})
+            else:
+                await self._send_event(response, "token", {"text": result["answer"]})
+
+        await self._send_event(response, "done", {"query_stats": result.get("query_stats", {})})
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def _send_event(response: web.StreamResponse, event: str, data: dict):
+        await response.write(f"event: {event}\ndata: {json_dumps(data)}\n\n".encode('utf-8'))
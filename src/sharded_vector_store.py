@@ -0,0 +1,234 @@
+import os
+import json
+import heapq
+import hashlib
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Tuple, TYPE_CHECKING
+from src.vector_store import FAISSVectorStore
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# Chunk ids of shard i start at i << SHARD_ID_BITS, so ids stay unique across shards without translation
+SHARD_ID_BITS = 40
+
+
+def shard_for_source(source: str, num_shards: int) -> int:
+    """Shard that owns a document; stable across runs and machines"""
+    return int(hashlib.sha1(source.encode('utf-8')).hexdigest()[:8], 16) % num_shards
+
+
+class ShardedVectorStore:
+    """N FAISSVectorStore shards partitioned by document, searched in parallel.
+
+    Every chunk of a document lives in the shard chosen by shard_for_source, and
+    each shard keeps its own index, metadata, BM25 postings and manifest in
+    shards_dir/shard_NNN/. A shard can therefore be rebuilt, or served from
+    another host, without touching the others.
+
+    Searches fan out to all shards on a thread pool (FAISS releases the GIL
+    while it searches), and the per-shard top-k lists are merged with a heap.
+    BM25 statistics are per shard, so lexical scores are merged as if they were
+    comparable; this is only used to rank candidates for fusion.
+    """
+
+    LAYOUT_FILE = "shards.json"
+
+    def __init__(self, shards_dir: str, shards: List[FAISSVectorStore], search_workers: int = 0):
+        if not shards:
+            raise ValueError("A sharded store needs at least one shard")
+
+        self.shards_dir = shards_dir
+        self.shards = shards
+        self.num_shards = len(shards)
+        self.logger = logging.getLogger(__name__)
+        self.executor = ThreadPoolExecutor(
+            max_workers=search_workers or self.num_shards, thread_name_prefix="shard-search"
+        )
+
+    # Layout
+
+    @staticmethod
+    def shard_paths(shards_dir: str, shard: int) -> Tuple[str, str, str]:
+        """(index, metadata, manifest) paths of one shard"""
+        shard_dir = os.path.join(shards_dir, f"shard_{shard:03d}")
+        return (
+            os.path.join(shard_dir, "faiss_index.bin"),
+            os.path.join(shard_dir, "faiss_metadata.bin"),
+            os.path.join(shard_dir, "index_manifest.json")
+        )
+
+    @staticmethod
+    def first_id(shard: int) -> int:
+        """Smallest chunk id of a shard"""
+        return shard << SHARD_ID_BITS
+
+    @staticmethod
+    def shard_of_id(item_id: int) -> int:
+        """Shard that owns a chunk id"""
+        return int(item_id) >> SHARD_ID_BITS
+
+    def shard_for(self, source: str) -> int:
+        return shard_for_source(source, self.num_shards)
+
+    @classmethod
+    def read_layout(cls, shards_dir: str) -> Dict[str, Any]:
+        """The layout written by save_layout, or None when there is none"""
+        layout_path = os.path.join(shards_dir, cls.LAYOUT_FILE)
+        if not os.path.exists(layout_path):
+            return None
+        with open(layout_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # Store interface shared with FAISSVectorStore
+
+    @property
+    def dimension(self) -> int:
+        return self.shards[0].dimension
+
+    @property
+    def metric(self) -> str:
+        return self.shards[0].metric
+
+    @property
+    def index_version(self) -> int:
+        return sum(shard.index_version for shard in self.shards)
+
+    def has_lexical_index(self) -> bool:
+        return any(shard.has_lexical_index() for shard in self.shards)
+
+    def add_embeddings(self, embeddings: np.ndarray, documents: List["Document"]) -> List[int]:
+        """Route each chunk to the shard of its document and return the ids in input order"""
+        if len(embeddings) != len(documents):
+            raise ValueError("Number of embeddings must match number of documents")
+
+        rows_by_shard: Dict[int, List[int]] = {}
+        for row, doc in enumerate(documents):
+            rows_by_shard.setdefault(self.shard_for(doc.metadata.get("source", "")), []).append(row)
+
+        ids = [0] * len(documents)
+        for shard, rows in rows_by_shard.items():
+            shard_ids = self.shards[shard].add_embeddings(embeddings[rows], [documents[row] for row in rows])
+            for row, item_id in zip(rows, shard_ids):
+                ids[row] = item_id
+        return ids
+
+    def remove_ids(self, ids: List[int]) -> int:
+        """Remove chunks by id from the shards that own them"""
+        ids_by_shard: Dict[int, List[int]] = {}
+        for item_id in ids:
+            ids_by_shard.setdefault(self.shard_of_id(item_id), []).append(item_id)
+        return sum(self.shards[shard].remove_ids(shard_ids) for shard, shard_ids in ids_by_shard.items())
+
+    def flush(self):
+        for shard in self.shards:
+            shard.flush()
+
+    def similarity_search(self, query_embedding: np.ndarray, k: int = 5, **kwargs) -> List[Dict]:
+        """Top-k results over all shards for one query"""
+        return self.similarity_search_batch(query_embedding.reshape(1, -1), k, **kwargs)[0]
+
+    def similarity_search_batch(self, query_embeddings: np.ndarray, k: int = 5, **kwargs) -> List[List[Dict]]:
+        """Search every shard in parallel and keep the k best results per query"""
+        per_shard = self._fan_out(lambda shard: shard.similarity_search_batch(query_embeddings, k, **kwargs))
+        return self._merge(per_shard, k, "similarity_score")
+
+    def lexical_search_batch(
+            self,
+            queries: List[str],
+            query_embeddings: np.ndarray,
+            k: int = 5,
+            metadata_filter: Dict[str, Any] = None
+    ) -> List[List[Dict]]:
+        """BM25 top-k per query over all shards"""
+        per_shard = self._fan_out(
+            lambda shard: shard.lexical_search_batch(queries, query_embeddings, k, metadata_filter)
+        )
+        return self._merge(per_shard, k, "bm25_score")
+
+    def _fan_out(self, search: Callable[[FAISSVectorStore], List[List[Dict]]]) -> List[List[List[Dict]]]:
+        """Run search on every shard concurrently; results in shard order"""
+        if self.num_shards == 1:
+            return [search(self.shards[0])]
+        return list(self.executor.map(search, self.shards))
+
+    @staticmethod
+    def _merge(per_shard: List[List[List[Dict]]], k: int, score_key: str) -> List[List[Dict]]:
+        """Per query, the k highest-scoring results across the shard lists"""
+        return [
+            heapq.nlargest(k, (result for shard_results in query_results for result in shard_results),
+                           key=lambda result: result[score_key])
+            for query_results in zip(*per_shard)
+        ]
+
+    def save_index(self):
+        """Save every shard and the layout that ties them together"""
+        for shard in range(self.num_shards):
+            self.save_shard(shard)
+
+    def save_shard(self, shard: int):
+        """Save one shard (and the layout), leaving the other shards' files untouched"""
+        index_path, metadata_path, _ = self.shard_paths(self.shards_dir, shard)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.shards[shard].save_index(index_path, metadata_path)
+        self.save_layout()
+
+    def save_layout(self):
+        """Record the shard count, which fixes how documents map to shards"""
+        os.makedirs(self.shards_dir, exist_ok=True)
+        layout = {"num_shards": self.num_shards, "dimension": self.dimension, "metric": self.metric}
+        with open(os.path.join(self.shards_dir, self.LAYOUT_FILE), 'w', encoding='utf-8') as f:
+            json.dump(layout, f, indent=2)
+
+    def replace_shard(self, shard: int, store: FAISSVectorStore):
+        """Swap in a rebuilt shard while the others keep serving"""
+        self.shards[shard] = store
+
+    @classmethod
+    def load(
+            cls,
+            shards_dir: str,
+            load_shard: Callable[[str, str, int], FAISSVectorStore],
+            search_workers: int = 0
+    ) -> "ShardedVectorStore":
+        """Open a sharded store saved by save_index, with as many shards as it was built with"""
+        layout = cls.read_layout(shards_dir)
+        if layout is None:
+            raise FileNotFoundError(f"No sharded index in {shards_dir}")
+
+        shards = [
+            load_shard(*cls.shard_paths(shards_dir, shard)[:2], cls.first_id(shard))
+            for shard in range(layout["num_shards"])
+        ]
+        store = cls(shards_dir, shards, search_workers)
+        metrics = {shard.metric for shard in store.shards}
+        if len(metrics) > 1:
+            raise ValueError(f"Shards in {shards_dir} were built with different metrics: {sorted(metrics)}")
+
+        store.logger.info(
+            f"Loaded {store.num_shards} shards with {sum(shard.index.ntotal for shard in store.shards)} vectors"
+        )
+        return store
+
+    def memory_bytes(self) -> int:
+        return sum(shard.memory_bytes() for shard in self.shards)
+
+    def close(self):
+        """Stop the search threads and close every shard"""
+        self.executor.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals over all shards plus each shard's own statistics"""
+        shard_stats = [shard.get_stats() for shard in self.shards]
+        return {
+            "total_vectors": sum(stats["total_vectors"] for stats in shard_stats),
+            "total_metadata": sum(stats["total_metadata"] for stats in shard_stats),
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "num_shards": self.num_shards,
+            "shards": shard_stats
+        }
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Iterable, Iterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
@@ -24,20 +24,26 @@ class OptimizedTextSplitter:
         """Split documents into optimized chunks for Q&A"""
         self.logger.info(f"Splitting {len(documents)} documents...")
 
-        chunks = self.text_splitter.split_documents(documents)
-
-        # Add chunk-specific metadata
-        for i, chunk in enumerate(chunks):
-            chunk.metadata.update({
-                "chunk_id": i,
-                "chunk_size": len(chunk.page_content),
-                "chunk_index": i
-            })
+        chunks = list(self.iter_split_documents(documents))
 
         self.logger.info(f"Created {len(chunks)} chunks (avg size: {self._get_average_chunk_size(chunks)} chars)")
 
         return chunks
 
+    def iter_split_documents(self, documents: Iterable[Document], start_id: int = 0) -> Iterator[Document]:
+        """Lazily split documents one at a time, numbering chunks across the whole stream"""
+        chunk_id = start_id
+        for document in documents:
+            for chunk in self.text_splitter.split_documents([document]):
+                # Add chunk-specific metadata
+                chunk.metadata.update({
+                    "chunk_id": chunk_id,
+                    "chunk_size": len(chunk.page_content),
+                    "chunk_index": chunk_id
+                })
+                chunk_id += 1
+                yield chunk
+
     def _get_average_chunk_size(self, chunks: List[Document]) -> int:
         """Calculate average chunk size"""
         if not chunks:
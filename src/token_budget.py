@@ -0,0 +1,68 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import List
+
+CHARS_PER_TOKEN = 4  # Rough English average, used only when no tokenizer can be loaded
+DEFAULT_CONTEXT_WINDOW = 8192
+PROMPT_TOKEN_MARGIN = 64  # Chat template tokens and drift between our tokenizer and the model's
+
+_WINDOW_SUFFIX = re.compile(r'-(\d{4,7})$')
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """Counts prompt tokens with a fast tokenizer.
+
+    tokenizer_name is either "tiktoken:<encoding>" or a Hugging Face tokenizer name loaded with `tokenizers`.
+    When neither can be loaded, counts fall back to a characters-per-token estimate.
+    """
+
+    def __init__(self, tokenizer_name: str):
+        self.tokenizer_name = tokenizer_name
+        self.exact = True
+        self._encode_batch = None
+
+        try:
+            if tokenizer_name.startswith("tiktoken:"):
+                import tiktoken
+                encoding = tiktoken.get_encoding(tokenizer_name.split(":", 1)[1])
+                self._encode_batch = lambda texts: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+            else:
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+                self._encode_batch = lambda texts: [
+                    len(encoding.ids) for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)
+                ]
+        except Exception as e:
+            self.exact = False
+            logger.warning(
+                f"Could not load tokenizer '{tokenizer_name}' ({str(e)}); "
+                f"estimating {CHARS_PER_TOKEN} characters per token"
+            )
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """Number of tokens in each text, encoded in one call"""
+        if not texts:
+            return []
+        if self._encode_batch is None:
+            return [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+        return self._encode_batch(texts)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer_name: str) -> TokenCounter:
+    """Shared TokenCounter per tokenizer, loaded once per process"""
+    return TokenCounter(tokenizer_name)
+
+
+def model_context_window(model_name: str, default: int = DEFAULT_CONTEXT_WINDOW) -> int:
+    """Context window of a model, read from a size suffix such as llama3-8b-8192"""
+    match = _WINDOW_SUFFIX.search(model_name or "")
+    return int(match.group(1)) if match else default
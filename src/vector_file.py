@@ -0,0 +1,162 @@
+import os
+import mmap
+import struct
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import List, Dict
+
+
+class VectorFile:
+    """Full-precision float32 vectors by id in a memory-mapped file.
+
+    Compressed indexes (float16, int8, PQ) keep these on disk so a search can
+    re-score its candidates exactly; only the pages of the candidates read are
+    brought into memory.
+
+    File layout (little endian)::
+
+        magic    8 bytes   b"RAGVEC01"
+        count    uint64
+        dim      uint64
+        ids      int64[count]          sorted ascending
+        vectors  float32[count, dim]   row i belongs to ids[i]
+
+    Like MetadataStore, vectors added after opening are spilled to a temporary
+    file until the next save.
+    """
+
+    MAGIC = b"RAGVEC01"
+    HEADER = struct.Struct("<8sQQ")
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._mmap = None
+        self._ids = np.empty(0, dtype='<i8')
+        self._vectors = np.empty((0, dimension), dtype='<f4')
+        self._deleted = set()
+        self._spill = None
+        self._spill_lock = threading.Lock()
+        self._spill_rows = 0
+        self._added: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        base = len(self._ids) - sum(1 for item_id in self._deleted if self._find(item_id) is not None)
+        return base + len(self._added)
+
+    def ids(self) -> List[int]:
+        """All live ids in ascending order"""
+        base = self._ids[~np.isin(self._ids, list(self._deleted))] if self._deleted else self._ids
+        added = np.fromiter(self._added, dtype='<i8', count=len(self._added))
+        return np.union1d(base, added).tolist()
+
+    def get_many(self, item_ids: np.ndarray) -> np.ndarray:
+        """Vectors for item_ids as a (len, dim) float32 array; unknown ids (and -1) give NaN rows"""
+        item_ids = np.asarray(item_ids, dtype='int64')
+        vectors = np.full((len(item_ids), self.dimension), np.nan, dtype='float32')
+
+        if len(self._ids):
+            positions = np.minimum(np.searchsorted(self._ids, item_ids), len(self._ids) - 1)
+            in_base = self._ids[positions] == item_ids
+            if self._deleted:
+                in_base &= ~np.isin(item_ids, list(self._deleted))
+            vectors[in_base] = self._vectors[positions[in_base]]
+
+        # Vectors added since the last save take precedence over the mapped file
+        if self._added:
+            rows = np.array([self._added.get(int(item_id), -1) for item_id in item_ids], dtype='int64')
+            in_spill = rows >= 0
+            if in_spill.any():
+                vectors[in_spill] = self._spill_view()[rows[in_spill]]
+
+        return vectors
+
+    def add(self, item_ids: np.ndarray, vectors: np.ndarray):
+        """Add vectors, appending them to the spill file"""
+        vectors = np.ascontiguousarray(vectors, dtype='<f4')
+        with self._spill_lock:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile()
+            self._spill.seek(0, os.SEEK_END)
+            self._spill.write(vectors.tobytes())
+            for item_id in item_ids:
+                item_id = int(item_id)
+                self._added[item_id] = self._spill_rows
+                self._deleted.discard(item_id)
+                self._spill_rows += 1
+
+    def remove(self, item_ids: List[int]):
+        """Remove vectors by id"""
+        for item_id in item_ids:
+            item_id = int(item_id)
+            if self._added.pop(item_id, None) is None:
+                self._deleted.add(item_id)
+
+    def save(self, path: str, block_size: int = 65536):
+        """Write all live vectors to path and reopen it memory-mapped"""
+        ids = np.asarray(self.ids(), dtype='<i8')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(ids), self.dimension))
+            f.write(ids.tobytes())
+            for start in range(0, len(ids), block_size):
+                f.write(self.get_many(ids[start:start + block_size]).astype('<f4').tobytes())
+
+        self.close()
+        os.replace(tmp_path, path)
+        self.open(path)
+
+        self.logger.info(f"Saved {len(ids)} full-precision vectors to {path}")
+
+    def open(self, path: str):
+        """Map a vector file written by save"""
+        self.close()
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, dimension = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or dimension != self.dimension:
+            self.close()
+            raise ValueError(f"{path} is not a {self.dimension}-dimensional vector file")
+
+        ids_start = self.HEADER.size
+        vectors_start = ids_start + 8 * count
+        self._ids = np.frombuffer(self._mmap, dtype='<i8', count=count, offset=ids_start)
+        self._vectors = np.frombuffer(
+            self._mmap, dtype='<f4', count=count * dimension, offset=vectors_start
+        ).reshape(count, dimension)
+
+    def close(self):
+        """Release the mapping and discard any unsaved overlay"""
+        # Drop numpy views before closing the mmap they point into
+        self._ids = np.empty(0, dtype='<i8')
+        self._vectors = np.empty((0, self.dimension), dtype='<f4')
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spill_rows = 0
+        self._added = {}
+        self._deleted = set()
+
+    def _find(self, item_id: int):
+        position = int(np.searchsorted(self._ids, item_id))
+        if position < len(self._ids) and self._ids[position] == item_id:
+            return position
+        return None
+
+    def _spill_view(self) -> np.ndarray:
+        with self._spill_lock:
+            self._spill.flush()
+            return np.memmap(self._spill, dtype='<f4', mode='r', shape=(self._spill_rows, self.dimension))
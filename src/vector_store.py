@@ -1,72 +1,685 @@
-import json
+import os
 import logging
+import threading
 import numpy as np
 import faiss
-from typing import List, Dict, Any, Tuple
-from langchain.schema import Document
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
+from src.metadata_store import MetadataStore
+from src.vector_file import VectorFile
+from src.bm25_index import BM25Index
+from src.attribute_index import AttributeIndex, FilterValue
+
+if TYPE_CHECKING:
+    # Only needed for annotations; importing langchain costs more than the rest of query startup
+    from langchain.schema import Document
 
 
 class FAISSVectorStore:
     """FAISS-based vector store for similarity search"""
 
-    def __init__(self, dimension: int, index_path: str = None, metadata_path: str = None):
+    INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+    # How vectors are encoded inside the index: raw, half precision, 8-bit scalar quantized or product quantized
+    STORAGE_TYPES = ("float32", "float16", "int8", "pq")
+    # l2 ranks by Euclidean distance; cosine ranks by inner product over unit-length vectors
+    METRICS = ("l2", "cosine")
+    # Scalar and product quantizers are trained on at least this many vectors when available
+    MIN_TRAIN_SIZE = 10000
+    # Filters matching at most this many chunks are scored exactly instead of searched through the index
+    EXACT_FILTER_MAX_IDS = 1024
+    # ID selectors kept for recently used filters
+    FILTER_SELECTOR_CACHE_SIZE = 64
+
+    def __init__(
+            self,
+            dimension: int,
+            index_path: str = None,
+            metadata_path: str = None,
+            index_type: str = "flat",
+            nlist: int = 1024,
+            pq_m: int = 16,
+            pq_nbits: int = 8,
+            hnsw_m: int = 32,
+            ef_construction: int = 40,
+            nprobe: int = 16,
+            ef_search: int = 64,
+            train_size: int = None,
+            storage: str = "float32",
+            rerank_factor: int = 0,
+            metric: str = "l2",
+            lexical: bool = False,
+            bm25_k1: float = 1.2,
+            bm25_b: float = 0.75,
+            first_id: int = 0,
+            filter_fields: List[str] = None
+    ):
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type}")
+        if storage not in self.STORAGE_TYPES:
+            raise ValueError(f"Unsupported storage type: {storage}")
+        if metric not in self.METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        if metric == "cosine" and index_type == "hnsw" and storage == "pq":
+            # FAISS builds HNSW over PQ codes with L2 only
+            raise ValueError("The cosine metric is not supported for HNSW indexes with PQ storage")
+
         self.dimension = dimension
         self.index_path = index_path
         self.metadata_path = metadata_path
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.metric = metric
+        # ivf_pq is IVF with PQ codes whatever storage says
+        self.storage = "pq" if index_type == "ivf_pq" else storage
+        # Search rerank_factor * k candidates and re-score them exactly (0 or 1 disables)
+        self.rerank_factor = rerank_factor
+        # FAISS recommends at least 39 training points per IVF or PQ centroid
+        self.train_size = train_size or max(40 * self._min_training_points(), self.MIN_TRAIN_SIZE)
         self.logger = logging.getLogger(__name__)
 
-        # Initialize FAISS index
-        self.index = faiss.IndexFlatL2(dimension)
-        self.metadata = []
-        self.id_to_metadata = {}
+        # Initialize FAISS index (flat and HNSW are wrapped in an id map so vectors can be removed by id)
+        self.index = self._create_index(self.index_type)
+        self.metadata_store = MetadataStore()
+        # Compressed indexes keep full-precision vectors on disk for reranking
+        self.full_precision = VectorFile(dimension) if self.storage != "float32" else None
+        # BM25 postings over the chunk text for hybrid (lexical + dense) retrieval
+        self.lexical = lexical
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self.lexical_index = BM25Index(bm25_k1, bm25_b) if lexical else None
+        # Metadata value -> chunk ids postings for filtered search
+        self.filter_fields = tuple(filter_fields or ())
+        self.attribute_index = AttributeIndex(self.filter_fields) if self.filter_fields else None
+        self._selectors: "OrderedDict[tuple, faiss.IDSelector]" = OrderedDict()
+        self._selector_lock = threading.Lock()
+        # Ids are assigned from first_id up; shards of a ShardedVectorStore use disjoint ranges
+        self.first_id = first_id
+        self.next_id = first_id
+        # Bumped on every change so caches derived from search results can be invalidated
+        self.index_version = 0
+
+        # Vectors added before an IVF index is trained are buffered here
+        self._pending_vectors = []
+        self._pending_ids = []
+
+    def _create_index(self, index_type: str) -> faiss.Index:
+        """Build an empty index of the given type with the configured vector storage"""
+        codes = {
+            "float32": "Flat",
+            "float16": "SQfp16",
+            "int8": "SQ8",
+            "pq": f"PQ{self.pq_m}x{self.pq_nbits}"
+        }[self.storage]
+
+        if index_type in ("ivf_flat", "ivf_pq"):
+            # IVF stores ids itself; an IDMap2 wrapper would lose track of them on removal
+            description = f"IVF{self.nlist},{codes}"
+        elif index_type == "hnsw":
+            description = f"IDMap2,HNSW{self.hnsw_m},{codes}"
+        else:
+            description = f"IDMap2,{codes}"
+
+        metric_type = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+        index = faiss.index_factory(self.dimension, description, metric_type)
+        if index_type == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efConstruction = self.ef_construction
+        return index
+
+    @staticmethod
+    def _detect_index_type(index: faiss.Index) -> str:
+        """Infer the index type of an index read from disk"""
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(inner, faiss.IndexIVFPQ):
+            return "ivf_pq"
+        if isinstance(inner, faiss.IndexIVF):
+            return "ivf_flat"
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+
+    @staticmethod
+    def _detect_storage(index: faiss.Index) -> str:
+        """Infer how an index read from disk encodes its vectors"""
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(inner, faiss.IndexHNSW):
+            inner = faiss.downcast_index(inner.storage)
+
+        if isinstance(inner, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+            return "pq"
+        if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+            return "float16" if inner.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+        return "float32"
+
+    @staticmethod
+    def _detect_metric(index: faiss.Index) -> str:
+        """Infer the metric of an index read from disk"""
+        return "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+    @staticmethod
+    def full_precision_path(index_path: str) -> str:
+        """Where the full-precision vectors of a compressed index are saved"""
+        return os.path.splitext(index_path)[0] + "_vectors.bin"
 
-    def add_embeddings(self, embeddings: np.ndarray, documents: List[Document]):
+    @staticmethod
+    def lexical_index_path(index_path: str) -> str:
+        """Where the BM25 index over the chunk text is saved"""
+        return os.path.splitext(index_path)[0] + "_bm25.bin"
+
+    @staticmethod
+    def attribute_index_path(index_path: str) -> str:
+        """Where the metadata attribute postings used by filtered search are saved"""
+        return os.path.splitext(index_path)[0] + "_attrs.bin"
+
+    def add_embeddings(self, embeddings: np.ndarray, documents: List["Document"]) -> List[int]:
         """Add embeddings and their corresponding metadata to the vector store"""
         if len(embeddings) != len(documents):
             raise ValueError("Number of embeddings must match number of documents")
 
+        self._ensure_id_map()
+
         # Add vectors to FAISS index
-        self.index.add(embeddings.astype('float32'))
+        start_id = self.next_id
+        ids = np.arange(start_id, start_id + len(documents), dtype='int64')
+        vectors = self._prepare_vectors(embeddings)
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self._pending_vectors.append(vectors)
+            self._pending_ids.append(ids)
+            if sum(len(batch) for batch in self._pending_ids) >= self.train_size:
+                self.flush()
+        self.next_id = start_id + len(documents)
+        self.index_version += 1
+
+        if self.full_precision is not None:
+            self.full_precision.add(ids, vectors)
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, [doc.page_content for doc in documents])
+        if self.attribute_index is not None:
+            self.attribute_index.add(ids, [doc.metadata for doc in documents])
 
         # Store metadata
-        start_id = len(self.metadata)
         for i, doc in enumerate(documents):
-            doc_metadata = {
-                "id": start_id + i,
-                "content": doc.page_content,
-                "metadata": doc.metadata
-            }
-            self.metadata.append(doc_metadata)
-            self.id_to_metadata[start_id + i] = doc_metadata
+            self.metadata_store.add(start_id + i, doc.page_content, doc.metadata)
 
         self.logger.info(f"Added {len(embeddings)} embeddings. Total vectors: {self.index.ntotal}")
 
-    def similarity_search(self, query_embedding: np.ndarray, k: int = 5) -> List[Dict]:
-        """Perform similarity search and return top-k results"""
+        return ids.tolist()
+
+    def remove_ids(self, ids: List[int]) -> int:
+        """Remove vectors and their metadata by id"""
+        if not ids:
+            return 0
+
+        self._ensure_id_map()
+
+        id_set = set(ids)
+        removed = self._remove_pending(id_set)
+        if self.index_type == "hnsw":
+            removed += self._rebuild_without(id_set)
+        else:
+            removed += self.index.remove_ids(np.asarray(ids, dtype='int64'))
+
+        self.metadata_store.remove(list(id_set))
+        if self.full_precision is not None:
+            self.full_precision.remove(list(id_set))
+        if self.lexical_index is not None:
+            self.lexical_index.remove(list(id_set))
+        if self.attribute_index is not None:
+            self.attribute_index.remove(list(id_set))
+        self.index_version += 1
+
+        self.logger.info(f"Removed {removed} embeddings. Total vectors: {self.index.ntotal}")
+
+        return removed
+
+    def train(self, embeddings: np.ndarray):
+        """Train the index (IVF coarse quantizer, scalar quantizer ranges, PQ codebooks) on sample vectors"""
+        if self.index.is_trained:
+            return
+
+        self.logger.info(f"Training {self.index_type} index on {len(embeddings)} vectors...")
+        self.index.train(self._prepare_vectors(embeddings))
+        self.logger.info("Index training complete")
+
+    def flush(self):
+        """Train the index on buffered vectors if needed and add them to it"""
+        if not self._pending_ids:
+            return
+
+        vectors = np.concatenate(self._pending_vectors)
+        ids = np.concatenate(self._pending_ids)
+        self._pending_vectors, self._pending_ids = [], []
+
+        if not self.index.is_trained:
+            if len(vectors) < self._min_training_points():
+                # Too few vectors to train the quantizers; an exact index is fast enough here
+                self.logger.warning(
+                    f"Only {len(vectors)} vectors available to train a {self.index_type} ({self.storage}) index, "
+                    f"falling back to a flat float32 index"
+                )
+                self.index_type = "flat"
+                self.storage = "float32"
+                self.full_precision = None
+                self.index = self._create_index(self.index_type)
+            else:
+                self.train(vectors)
+
+        self.index.add_with_ids(vectors, ids)
+
+    def _min_training_points(self) -> int:
+        """Smallest training set FAISS accepts for the configured index"""
+        points = self.nlist if self.index_type in ("ivf_flat", "ivf_pq") else 1
+        if self.storage == "pq":
+            points = max(points, 2 ** self.pq_nbits)
+        return points
+
+    def _remove_pending(self, id_set: set) -> int:
+        """Drop ids from the not-yet-trained buffer"""
+        removed = 0
+        for i, ids in enumerate(self._pending_ids):
+            keep = ~np.isin(ids, list(id_set))
+            removed += int((~keep).sum())
+            self._pending_ids[i] = ids[keep]
+            self._pending_vectors[i] = self._pending_vectors[i][keep]
+        return removed
+
+    def _rebuild_without(self, id_set: set) -> int:
+        """Rebuild an index type without native removal (HNSW) minus the given ids"""
+        if self.index.ntotal == 0:
+            return 0
+
+        all_ids = faiss.vector_to_array(self.index.id_map)
+        keep = ~np.isin(all_ids, list(id_set))
+        # Rebuild from the exact vectors when the index only holds compressed ones
+        if self.full_precision is not None:
+            vectors = self.full_precision.get_many(all_ids[keep])
+        else:
+            vectors = faiss.downcast_index(self.index.index).reconstruct_n(0, self.index.ntotal)[keep]
+
+        self.index = self._create_index(self.index_type)
+        if keep.any():
+            self.train(vectors[:self.train_size])
+            self.index.add_with_ids(vectors, all_ids[keep])
+
+        return int((~keep).sum())
+
+    @staticmethod
+    def _unwrap_ivf(index: faiss.Index) -> faiss.Index:
+        """Convert an IDMap2-wrapped IVF index from older builds into a bare IVF index holding the real ids"""
+        if not isinstance(index, faiss.IndexIDMap):
+            return index
+        inner = faiss.downcast_index(index.index)
+        if not isinstance(inner, faiss.IndexIVF):
+            return index
+
+        id_map = faiss.vector_to_array(index.id_map)
+        invlists = inner.invlists
+        for list_no in range(inner.nlist):
+            list_size = invlists.list_size(list_no)
+            if list_size:
+                list_ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), list_size)
+                list_ids[:] = id_map[list_ids]
+
+        return faiss.clone_index(inner)
+
+    def _ensure_id_map(self):
+        """Wrap indexes saved before id support so their positional ids become explicit"""
+        if not isinstance(self.index, faiss.IndexFlat):
+            return
+
+        legacy_index = self.index
+        self.index = faiss.IndexIDMap2(faiss.IndexFlat(self.dimension, legacy_index.metric_type))
+        if legacy_index.ntotal > 0:
+            vectors = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+            self.index.add_with_ids(vectors, np.arange(legacy_index.ntotal, dtype='int64'))
+
+    def _search_params(self, nprobe: int = None, ef_search: int = None, selector: faiss.IDSelector = None):
+        """Build per-query search parameters for approximate index types, restricted to selector's ids when given"""
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            params = faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        elif self.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        elif selector is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    def _prepare_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """Cast to a float32 matrix, scaled to unit length for the cosine metric"""
+        vectors = np.array(np.atleast_2d(vectors), dtype='float32')
+        if self.metric == "cosine":
+            # A no-op for embeddings the generator already normalized, but keeps scores true cosines
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _to_similarity(self, distances: np.ndarray) -> np.ndarray:
+        """Map raw FAISS scores to similarity scores where higher is better"""
+        if self.metric == "cosine":
+            return distances
+        return 1 / (1 + distances)
+
+    def _to_radius(self, similarity_threshold: float) -> float:
+        """Map a similarity threshold to the raw FAISS range search radius"""
+        if self.metric == "cosine":
+            return similarity_threshold
+        return 1 / similarity_threshold - 1
+
+    def search_vectors(
+            self,
+            query_vectors: np.ndarray,
+            k: int = 5,
+            nprobe: int = None,
+            ef_search: int = None,
+            rerank_factor: int = None,
+            selector: faiss.IDSelector = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Search a matrix of query vectors and return raw (distances, ids).
+
+        Distances are squared L2 distances, or inner products (cosines) for the
+        cosine metric. nprobe (IVF), ef_search (HNSW) and rerank_factor override
+        the store defaults for this call only; selector restricts the search to its ids.
+        """
+        query_vectors = self._prepare_vectors(query_vectors)
+        k = min(k, self.index.ntotal)
+        rerank_factor = self.rerank_factor if rerank_factor is None else rerank_factor
+
+        if rerank_factor > 1 and self.full_precision is not None:
+            distances, ids = self.index.search(
+                query_vectors,
+                min(k * rerank_factor, self.index.ntotal),
+                params=self._search_params(nprobe, ef_search, selector)
+            )
+            return self._rerank(query_vectors, distances, ids, k)
+
+        return self.index.search(query_vectors, k, params=self._search_params(nprobe, ef_search, selector))
+
+    def range_search_vectors(
+            self,
+            query_vectors: np.ndarray,
+            similarity_threshold: float,
+            k: int = 5,
+            nprobe: int = None,
+            ef_search: int = None,
+            rerank_factor: int = None,
+            selector: faiss.IDSelector = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Return raw (distances, ids) per query for every vector scoring at least similarity_threshold.
+
+        The threshold is applied by FAISS range search inside the index; each
+        query's matches are ordered best first and capped at k. When compressed
+        vectors are reranked, approximate scores would drop true matches before
+        the rerank could see them, so rerank_factor * k nearest candidates are
+        re-scored exactly and then thresholded instead.
+        """
+        query_vectors = self._prepare_vectors(query_vectors)
+        rerank_factor = self.rerank_factor if rerank_factor is None else rerank_factor
+        reranked = rerank_factor > 1 and self.full_precision is not None
+
+        # Every L2 match scores above zero, so a non-positive threshold has no radius to search within
+        if reranked or (similarity_threshold <= 0 and self.metric == "l2"):
+            distances, ids = self.search_vectors(query_vectors, k, nprobe, ef_search, rerank_factor, selector)
+            keep = (ids >= 0) & (self._to_similarity(distances) >= similarity_threshold)
+            return [
+                (row_distances[row_keep], row_ids[row_keep])
+                for row_distances, row_ids, row_keep in zip(distances, ids, keep)
+            ]
+
+        lims, distances, ids = self.index.range_search(
+            query_vectors, self._to_radius(similarity_threshold), params=self._search_params(nprobe, ef_search, selector)
+        )
+
+        results = []
+        for i in range(len(query_vectors)):
+            row_distances, row_ids = distances[lims[i]:lims[i + 1]], ids[lims[i]:lims[i + 1]]
+            order = self._best_first(row_distances[None])[0]
+            results.append((row_distances[order][:k], row_ids[order][:k]))
+
+        return results
+
+    def _best_first(self, distances: np.ndarray) -> np.ndarray:
+        """Per-row ordering of raw scores, best match first"""
+        return np.argsort(-distances if self.metric == "cosine" else distances, axis=1, kind='stable')
+
+    def _rerank(
+            self,
+            query_vectors: np.ndarray,
+            distances: np.ndarray,
+            ids: np.ndarray,
+            k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score candidates exactly against their full-precision vectors and keep the top k"""
+        candidates = self.full_precision.get_many(ids.ravel()).reshape(ids.shape + (self.dimension,))
+        if self.metric == "cosine":
+            exact = (candidates * query_vectors[:, None, :]).sum(axis=-1)
+        else:
+            exact = ((candidates - query_vectors[:, None, :]) ** 2).sum(axis=-1)
+
+        # Candidates without a stored vector keep their approximate distance
+        exact = np.where(np.isnan(exact), distances, exact)
+        exact[ids < 0] = -np.inf if self.metric == "cosine" else np.inf
+
+        order = self._best_first(exact)[:, :k]
+        return (
+            np.take_along_axis(exact, order, axis=1).astype('float32'),
+            np.take_along_axis(ids, order, axis=1)
+        )
+
+    def similarity_search(
+            self,
+            query_embedding: np.ndarray,
+            k: int = 5,
+            nprobe: int = None,
+            ef_search: int = None,
+            rerank_factor: int = None,
+            similarity_threshold: float = None,
+            metadata_filter: Dict[str, FilterValue] = None
+    ) -> List[Dict]:
+        """Perform similarity search and return top-k results, scoring at least similarity_threshold when given.
+
+        metadata_filter restricts results to chunks whose metadata matches, e.g.
+        {"file_type": "pdf", "file_name": ["a.pdf", "b.pdf"]}: every field must
+        match one of its values (see similarity_search_batch).
+        """
         if self.index.ntotal == 0:
             return []
 
         # Ensure query_embedding is the right shape and type
         query_vector = query_embedding.reshape(1, -1).astype('float32')
 
+        return self.similarity_search_batch(
+            query_vector, k, nprobe=nprobe, ef_search=ef_search, rerank_factor=rerank_factor,
+            similarity_threshold=similarity_threshold, metadata_filter=metadata_filter
+        )[0]
+
+    def similarity_search_batch(
+            self,
+            query_embeddings: np.ndarray,
+            k: int = 5,
+            nprobe: int = None,
+            ef_search: int = None,
+            rerank_factor: int = None,
+            similarity_threshold: float = None,
+            metadata_filter: Dict[str, FilterValue] = None
+    ) -> List[List[Dict]]:
+        """Search many queries with a single matrix search and return top-k results per query.
+
+        With a similarity_threshold the search is a range search, so weak matches
+        are dropped inside the index instead of after a fixed-k fetch. A
+        metadata_filter is resolved to chunk ids through the attribute index and
+        applied inside the search as a FAISS ID selector, so k results come back
+        whenever k chunks match; filters matching only a few chunks score them exactly.
+        """
+        if self.index.ntotal == 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        selector = None
+        if metadata_filter:
+            selected = self.select_ids(metadata_filter)
+            if len(selected) <= self.EXACT_FILTER_MAX_IDS and self._has_vectors():
+                return self._search_selected(query_embeddings, selected, k, similarity_threshold)
+            selector = self._id_selector(metadata_filter, selected)
+
+        if similarity_threshold is not None:
+            matches = self.range_search_vectors(
+                query_embeddings, similarity_threshold, k, nprobe=nprobe, ef_search=ef_search,
+                rerank_factor=rerank_factor, selector=selector
+            )
+            return [self._build_results(row_distances, row_indices) for row_distances, row_indices in matches]
+
         # Search
-        distances, indices = self.index.search(query_vector, min(k, self.index.ntotal))
+        distances, indices = self.search_vectors(
+            query_embeddings, k, nprobe=nprobe, ef_search=ef_search, rerank_factor=rerank_factor, selector=selector
+        )
+
+        return [self._build_results(row_distances, row_indices) for row_distances, row_indices in zip(distances, indices)]
 
-        # Prepare results
+    def select_ids(self, metadata_filter: Dict[str, FilterValue]) -> np.ndarray:
+        """Sorted ids of the chunks matching metadata_filter"""
+        if self.attribute_index is None:
+            raise ValueError("Filtered search needs an attribute index; set FILTER_FIELDS and rebuild the index")
+        return self.attribute_index.select(metadata_filter)
+
+    def _id_selector(self, metadata_filter: Dict[str, FilterValue], selected: np.ndarray) -> faiss.IDSelector:
+        """FAISS selector over the selected ids, reused while the filter and the index stay the same"""
+        key = (repr(sorted(metadata_filter.items())), self.index_version)
+        with self._selector_lock:
+            selector = self._selectors.get(key)
+            if selector is None:
+                selector = self._selectors[key] = faiss.IDSelectorBatch(selected)
+                while len(self._selectors) > self.FILTER_SELECTOR_CACHE_SIZE:
+                    self._selectors.popitem(last=False)
+            else:
+                self._selectors.move_to_end(key)
+            return selector
+
+    def _has_vectors(self) -> bool:
+        """Whether stored vectors can be read back by id for exact scoring"""
+        return self.full_precision is not None or isinstance(self.index, (faiss.IndexIDMap2, faiss.IndexFlat))
+
+    def _search_selected(
+            self,
+            query_embeddings: np.ndarray,
+            selected: np.ndarray,
+            k: int,
+            similarity_threshold: float = None
+    ) -> List[List[Dict]]:
+        """Exact top-k among a small set of ids, bypassing the index"""
+        results = []
+        for query_vector in self._prepare_vectors(query_embeddings):
+            scores = self._score_ids(query_vector, selected)
+            order = self._best_first(scores[None])[0][:k]
+            row_distances, row_ids = scores[order], selected[order]
+            if similarity_threshold is not None:
+                keep = self._to_similarity(row_distances) >= similarity_threshold
+                row_distances, row_ids = row_distances[keep], row_ids[keep]
+            results.append(self._build_results(row_distances, row_ids))
+        return results
+
+    def _build_results(self, distances: np.ndarray, indices: np.ndarray) -> List[Dict]:
+        """Prepare results for one query, reading metadata only for the returned ids"""
+        similarities = self._to_similarity(np.asarray(distances, dtype='float32'))
         results = []
-        for i, idx in enumerate(indices[0]):
+        for i, idx in enumerate(indices):
             if idx != -1:  # -1 indicates no match found
+                item = self.metadata_store.get(idx)
                 result = {
                     "id": int(idx),
-                    "distance": float(distances[0][i]),
-                    "similarity_score": 1 / (1 + distances[0][i]),  # Convert distance to similarity
-                    "content": self.metadata[idx]["content"],
-                    "metadata": self.metadata[idx]["metadata"]
+                    # Cosine distance for the cosine metric, squared L2 otherwise
+                    "distance": float(1 - similarities[i]) if self.metric == "cosine" else float(distances[i]),
+                    "similarity_score": float(similarities[i]),
+                    "content": item["content"],
+                    "metadata": item["metadata"]
                 }
                 results.append(result)
 
         return results
 
+    def build_lexical_index(self, batch_size: int = 1024):
+        """(Re)build the BM25 index from the stored chunk text, e.g. for an index built without one"""
+        self.lexical_index = BM25Index(self.bm25_k1, self.bm25_b)
+        ids, texts = [], []
+        for item in self.metadata_store.items():
+            ids.append(item["id"])
+            texts.append(item["content"])
+            if len(ids) >= batch_size:
+                self.lexical_index.add(ids, texts)
+                ids, texts = [], []
+        self.lexical_index.add(ids, texts)
+        self.logger.info(f"Indexed {len(self.lexical_index)} chunks for BM25")
+
+    def build_attribute_index(self, batch_size: int = 1024):
+        """(Re)build the attribute index for filter_fields from the stored chunk metadata"""
+        self.attribute_index = AttributeIndex(self.filter_fields)
+        ids, metadatas = [], []
+        for item in self.metadata_store.items():
+            ids.append(item["id"])
+            metadatas.append(item["metadata"])
+            if len(ids) >= batch_size:
+                self.attribute_index.add(ids, metadatas)
+                ids, metadatas = [], []
+        self.attribute_index.add(ids, metadatas)
+        self.logger.info(f"Indexed {self.filter_fields} of {len(self.metadata_store)} chunks for filtering")
+
+    def has_lexical_index(self) -> bool:
+        """Whether BM25 postings are available for hybrid search"""
+        return self.lexical_index is not None
+
+    def lexical_search_batch(
+            self,
+            queries: List[str],
+            query_embeddings: np.ndarray,
+            k: int = 5,
+            metadata_filter: Dict[str, FilterValue] = None
+    ) -> List[List[Dict]]:
+        """BM25 top-k per query, as results carrying a bm25_score and their dense similarity to the query"""
+        if self.lexical_index is None:
+            return [[] for _ in queries]
+
+        allowed_ids = self.select_ids(metadata_filter) if metadata_filter else None
+        query_vectors = self._prepare_vectors(query_embeddings)
+        batch_results = []
+        lexical_matches = self.lexical_index.search_batch(queries, k, allowed_ids)
+        for query_vector, (bm25_scores, ids) in zip(query_vectors, lexical_matches):
+            results = self._build_results(self._score_ids(query_vector, ids), ids)
+            for result, bm25_score in zip(results, bm25_scores):
+                result["bm25_score"] = float(bm25_score)
+            batch_results.append(results)
+        return batch_results
+
+    def _score_ids(self, query_vector: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Raw FAISS scores of query_vector against specific ids; ids that cannot be scored get the worst score"""
+        worst = -1.0 if self.metric == "cosine" else float(np.finfo('float32').max)
+        if len(ids) == 0:
+            return np.empty(0, dtype='float32')
+
+        if self._has_vectors():
+            if self.full_precision is not None:
+                vectors = self.full_precision.get_many(ids)
+            else:
+                # Flat and HNSW indexes map ids to their stored vectors (legacy flat ids are positions)
+                vectors = np.stack([self.index.reconstruct(int(item_id)) for item_id in ids])
+            if self.metric == "cosine":
+                scores = vectors @ query_vector
+            else:
+                scores = ((vectors - query_vector) ** 2).sum(axis=1)
+            return np.where(np.isnan(scores), worst, scores).astype('float32')
+
+        # IVF without stored vectors: search only these ids in the probed lists
+        params = faiss.SearchParametersIVF(nprobe=self.nprobe, sel=faiss.IDSelectorBatch(np.asarray(ids, dtype='int64')))
+        distances, found = self.index.search(query_vector[None], len(ids), params=params)
+        scores = dict(zip(found[0].tolist(), distances[0].tolist()))
+        return np.array([scores.get(int(item_id), worst) for item_id in ids], dtype='float32')
+
     def save_index(self, index_path: str = None, metadata_path: str = None):
         """Save FAISS index and metadata to disk"""
         index_path = index_path or self.index_path
@@ -75,37 +688,129 @@ class FAISSVectorStore:
         if not index_path or not metadata_path:
             raise ValueError("Index path and metadata path must be provided")
 
+        # Make sure buffered vectors are trained and indexed before writing
+        self.flush()
+
         # Save FAISS index
         faiss.write_index(self.index, index_path)
 
         # Save metadata
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+        self.metadata_store.save(metadata_path)
+
+        if self.full_precision is not None:
+            self.full_precision.save(self.full_precision_path(index_path))
+        if self.lexical_index is not None:
+            self.lexical_index.save(self.lexical_index_path(index_path))
+        if self.attribute_index is not None:
+            self.attribute_index.save(self.attribute_index_path(index_path))
 
         self.logger.info(f"Saved index to {index_path} and metadata to {metadata_path}")
 
+    @classmethod
+    def from_index(cls, index_path: str, metadata_path: str, **kwargs) -> "FAISSVectorStore":
+        """Load a saved store, taking its dimension from the index so no embedding model is needed"""
+        index = cls._unwrap_ivf(faiss.read_index(index_path))
+        store = cls(index.d, index_path, metadata_path, **kwargs)
+        store._load(index, index_path, metadata_path)
+        return store
+
     def load_index(self, index_path: str = None, metadata_path: str = None):
         """Load FAISS index and metadata from disk"""
         index_path = index_path or self.index_path
         metadata_path = metadata_path or self.metadata_path
 
-        # Load FAISS index
-        self.index = faiss.read_index(index_path)
+        index = self._unwrap_ivf(faiss.read_index(index_path))
+        if index.d != self.dimension:
+            raise ValueError(f"{index_path} holds {index.d}-dimensional vectors, expected {self.dimension}")
+        self._load(index, index_path, metadata_path)
+
+    def _load(self, index: faiss.Index, index_path: str, metadata_path: str):
+        """Adopt an index read from index_path and map its metadata and full-precision vectors"""
+        self.index = index
+        self.index_type = self._detect_index_type(self.index)
+        self.storage = self._detect_storage(self.index)
+        self.metric = self._detect_metric(self.index)
 
-        # Load metadata
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
+        # Full-precision vectors of a compressed index are mapped, not read
+        self.full_precision = None
+        vectors_path = self.full_precision_path(index_path)
+        if self.storage != "float32":
+            if os.path.exists(vectors_path):
+                self.full_precision = VectorFile(self.dimension)
+                self.full_precision.open(vectors_path)
+            else:
+                self.logger.warning(f"No full-precision vectors at {vectors_path}; reranking is disabled")
 
-        # Rebuild id_to_metadata mapping
-        self.id_to_metadata = {item["id"]: item for item in self.metadata}
+        # BM25 postings are mapped too; indexes built without them search dense only
+        if self.lexical:
+            lexical_path = self.lexical_index_path(index_path)
+            if os.path.exists(lexical_path):
+                self.lexical_index = BM25Index(self.bm25_k1, self.bm25_b)
+                self.lexical_index.open(lexical_path)
+            else:
+                self.lexical_index = None
+                self.logger.warning(f"No BM25 index at {lexical_path}; hybrid search is disabled")
 
-        self.logger.info(f"Loaded index with {self.index.ntotal} vectors and {len(self.metadata)} metadata entries")
+        # Attribute postings for filtered search; indexes built without them cannot be filtered
+        if self.filter_fields:
+            attribute_path = self.attribute_index_path(index_path)
+            if os.path.exists(attribute_path):
+                self.attribute_index = AttributeIndex(self.filter_fields)
+                try:
+                    self.attribute_index.open(attribute_path)
+                except ValueError as e:
+                    # Written by an older version; --incremental rebuilds it
+                    self.attribute_index = None
+                    self.logger.warning(f"{e}; filtered search is disabled")
+            else:
+                self.attribute_index = None
+                self.logger.warning(f"No attribute index at {attribute_path}; filtered search is disabled")
+
+        # Fall back to metadata written by older versions as faiss_metadata.json
+        legacy_metadata_path = os.path.splitext(metadata_path)[0] + '.json'
+        if not os.path.exists(metadata_path) and os.path.exists(legacy_metadata_path):
+            metadata_path = legacy_metadata_path
+
+        # Map metadata; rows are read lazily by similarity_search
+        self.metadata_store.open(metadata_path)
+        self.next_id = max(self.metadata_store.max_id() + 1, self.first_id)
+        self.index_version += 1
+
+        self.logger.info(f"Loaded index with {self.index.ntotal} vectors and {len(self.metadata_store)} metadata entries")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         return {
             "total_vectors": self.index.ntotal,
             "dimension": self.dimension,
-            "total_metadata": len(self.metadata),
-            "index_type": type(self.index).__name__
-        }
\ No newline at end of file
+            "total_metadata": len(self.metadata_store),
+            "index_type": self.index_type,
+            "storage": self.storage,
+            "metric": self.metric,
+            "rerank_factor": self.rerank_factor if self.full_precision is not None else 0,
+            "lexical_index": self.lexical_index.get_stats() if self.lexical_index is not None else None,
+            "attribute_index": self.attribute_index.get_stats() if self.attribute_index is not None else None,
+            "is_trained": self.index.is_trained
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory of a loaded store: the index held in RAM plus the memory-mapped files it pages in"""
+        paths = [self.index_path, self.metadata_path]
+        if self.full_precision is not None:
+            paths.append(self.full_precision_path(self.index_path))
+        if self.lexical_index is not None:
+            paths.append(self.lexical_index_path(self.index_path))
+        if self.attribute_index is not None:
+            paths.append(self.attribute_index_path(self.index_path))
+        return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+    def close(self):
+        """Release the memory-mapped files and the index; the store cannot be searched afterwards"""
+        self.metadata_store.close()
+        if self.full_precision is not None:
+            self.full_precision.close()
+        if self.lexical_index is not None:
+            self.lexical_index.close()
+        if self.attribute_index is not None:
+            self.attribute_index.close()
+        self.index = None